@@ -0,0 +1,134 @@
+"""Микробенчмарки функций цикла опроса.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_cycle --output bench_results.json
+    python -m benchmarks.bench_cycle --compare bench_results.json
+
+Запросы к API и Telegram подменяются тестовыми `MockResponseGET`
+и `MockTelegramBot`, поэтому измеряется только код бота.
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'tests')]
+
+import requests  # noqa: E402
+from mocks import MockResponseGET, MockTelegramBot  # noqa: E402
+
+import homework  # noqa: E402
+from benchmarks.common import add_arguments, report  # noqa: E402
+
+SIZES = (1, 100, 10_000)
+TIMESTAMP = 1_000_000_000
+STATUSES = tuple(homework.HOMEWORK_STATUSES)
+
+
+def make_payload(size):
+    """Ответ API с `size` домашними работами."""
+    return {
+        'homeworks': [
+            {
+                'id': i,
+                'status': STATUSES[i % len(STATUSES)],
+                'homework_name': f'student__hw{i:05}.zip',
+                'reviewer_comment': 'Всё нравится' * 5,
+                'date_updated': '2022-02-13T14:40:57Z',
+                'lesson_name': f'Спринт {i % 20}',
+            }
+            for i in range(size)
+        ],
+        'current_date': TIMESTAMP,
+    }
+
+
+def patch_requests(payload):
+    """Подменяет requests.get ответом с `payload`."""
+    def mock_get(*args, **kwargs):
+        response = MockResponseGET(
+            *args, random_timestamp=TIMESTAMP,
+            current_timestamp=TIMESTAMP, **kwargs
+        )
+        response.json = lambda: payload
+        return response
+
+    requests.get = mock_get
+
+
+def silence_logging():
+    """Оставляет форматирование логов, но пишет их в /dev/null."""
+    homework.init_logger(homework.__name__)
+    devnull = open(os.devnull, 'w')
+    for handler in homework.logger.handlers:
+        handler.setStream(devnull)
+
+
+def measure(func, repeat=5):
+    """Время одного вызова (лучшее и среднее, мкс) и пик памяти (байт)."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = [t / number for t in timer.repeat(repeat, number)]
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'best_us': min(timings) * 1e6,
+        'mean_us': sum(timings) / len(timings) * 1e6,
+        'peak_bytes': peak,
+        'loops': number,
+    }
+
+
+def cases(size, bot):
+    """Измеряемые функции для ответа с `size` работами."""
+    payload = make_payload(size)
+    homeworks = payload['homeworks']
+
+    def cycle():
+        response = homework.get_api_answer(TIMESTAMP)
+        for work in homework.check_response(response):
+            homework.send_message(bot, homework.parse_status(work))
+
+    return {
+        'get_api_answer': lambda: homework.get_api_answer(TIMESTAMP),
+        'check_response': lambda: homework.check_response(payload),
+        'parse_status': lambda: [homework.parse_status(w) for w in homeworks],
+        'send_message': lambda: homework.send_message(bot, 'message'),
+        'cycle': cycle,
+    }, payload
+
+
+def run(sizes):
+    """Запускает все бенчмарки; возвращает результаты по именам."""
+    homework.TELEGRAM_CHAT_ID = 1
+    bot = MockTelegramBot(token='token')
+    results = {}
+    for size in sizes:
+        functions, payload = cases(size, bot)
+        patch_requests(payload)
+        for name, func in functions.items():
+            key = f'{name}[{size}]'
+            results[key] = measure(func)
+            print(f'{key}: {results[key]["best_us"]:.1f} мкс')
+    return results
+
+
+def main():
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+
+    silence_logging()
+    report(args, run(args.sizes))
+
+
+if __name__ == '__main__':
+    main()
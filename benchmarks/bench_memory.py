@@ -0,0 +1,159 @@
+"""Память на аккаунт при большом числе аккаунтов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_memory --output memory.json
+    python -m benchmarks.bench_memory --accounts 100000 --budget 1024
+
+Каждый аккаунт проходит один цикл опроса через настоящий `Poller`
+с локальной заменой API практикума, поэтому в памяти оказывается то же
+состояние, что у работающего бота: аккаунты, очередь движка, индекс
+статусов, курсоры и история для /history. Память по компонентам считает
+tracemalloc; команда завершается с ошибкой, если на аккаунт ушло больше
+`--budget` байт. tracemalloc сам удваивает потребление памяти, поэтому
+пиковый RSS для оценки размера контейнера меряется отдельно:
+    python -m benchmarks.bench_memory --rss
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import secrets
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import homework  # noqa: E402
+from benchmarks.common import add_arguments, report  # noqa: E402
+from homework_bot.accounts import Account  # noqa: E402
+from homework_bot.engine import PollingEngine  # noqa: E402
+from homework_bot.homework_cache import HomeworkCache  # noqa: E402
+from homework_bot.recording import ReplayResponse  # noqa: E402
+from homework_bot.scheduler import POLICIES  # noqa: E402
+from homework_bot.storage import StateStore  # noqa: E402
+
+# Бюджет из README: сколько байт в памяти может занимать один аккаунт.
+BUDGET = 1536
+CURRENT_DATE = 1_650_000_000
+STATUSES = tuple(homework.HOMEWORK_STATUSES)
+
+
+class StubApi:
+    """API практикума, отвечающее каждому аккаунту одной работой."""
+
+    def get(self, url=None, headers=None, params=None, **kwargs):
+        """Ответ с работой, статус которой зависит от токена."""
+        token = headers['Authorization'].split(' ', 1)[-1]
+        body = json.dumps({
+            'homeworks': [{
+                'id': hash(token) % 1_000_000,
+                'homework_name': f'{token[:8]}__hw05.zip',
+                'status': STATUSES[hash(token) % len(STATUSES)],
+                'reviewer_comment': 'Всё нравится',
+                'date_updated': '2022-02-13T14:40:57Z',
+                'lesson_name': 'Спринт 5',
+            }],
+            'current_date': CURRENT_DATE,
+        })
+        return ReplayResponse(200, body)
+
+
+def make_accounts(count):
+    """Аккаунты с токенами и чатами реалистичной длины."""
+    return [
+        Account(f'y0_{secrets.token_urlsafe(42)}', 100_000_000 + i)
+        for i in range(count)
+    ]
+
+
+def traced():
+    """Текущий объём памяти под tracemalloc после сборки мусора."""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def peak_rss():
+    """Пиковый RSS процесса в МиБ."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(count, workdir, trace=True):
+    """Строит состояние `count` аккаунтов; байты по компонентам."""
+    homework.http_client = StubApi()
+    store = StateStore(os.path.join(workdir, 'state.db'))
+    homework_cache = HomeworkCache(store)
+    poller = homework.make_poller(
+        store, lambda chat_id, text, key=None: None, homework_cache
+    )
+    policy = POLICIES['adaptive'](homework.RETRY_TIME)
+    engine = PollingEngine(poller, policy)
+    accounts = []
+
+    def load():
+        accounts.extend(make_accounts(count))
+        for account in accounts:
+            homework_cache.register(account)
+
+    def schedule():
+        for position, account in enumerate(accounts):
+            engine.add_account(account, policy.initial_delay(position, count))
+
+    def poll():
+        for account in accounts:
+            account.from_date = CURRENT_DATE - 600
+            poller(account)
+        store.flush()
+
+    # Ленивые импорты первого опроса не должны попасть в замер.
+    poller(Account('warmup', 0, from_date=CURRENT_DATE))
+    sizes = {}
+    if trace:
+        tracemalloc.start()
+    for name, step in (
+        ('accounts', load), ('engine_queue', schedule), ('poll_state', poll)
+    ):
+        start = traced() if trace else 0
+        step()
+        if trace:
+            sizes[name] = traced() - start
+    tracemalloc.stop()
+
+    store.close()
+    homework.http_client = None
+    return sizes
+
+
+def main():
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=100_000)
+    parser.add_argument('--budget', type=int, default=BUDGET,
+                        help='допустимые байты на аккаунт')
+    parser.add_argument('--rss', action='store_true',
+                        help='только пиковый RSS, без tracemalloc')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sizes = run(args.accounts, workdir, trace=not args.rss)
+    if args.rss:
+        print(f'Пиковый RSS процесса: {peak_rss():.0f} МиБ')
+        return
+    total = sum(sizes.values())
+    results = {}
+    for name, size in {**sizes, 'total': total}.items():
+        per_account = size / args.accounts
+        results[f'{name}_per_account'] = {'bytes': per_account}
+        print(f'{name}: {size / 2 ** 20:.1f} МиБ, '
+              f'{per_account:.0f} байт на аккаунт')
+    report(args, results)
+    if total / args.accounts > args.budget:
+        sys.exit(f'Превышен бюджет: {total / args.accounts:.0f} > '
+                 f'{args.budget} байт на аккаунт')
+
+
+if __name__ == '__main__':
+    main()
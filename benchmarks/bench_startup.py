@@ -0,0 +1,116 @@
+"""Время холодного старта бота.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup --output bench_startup.json
+    python -m benchmarks.bench_startup --compare bench_startup.json
+
+Измеряются два значения, каждое в отдельном процессе интерпретатора:
+`import` модуля homework (за вычетом запуска пустого интерпретатора)
+и время от запуска `python homework.py` до первого запроса к API.
+API практикума и Bot API Telegram заменяет локальный сервер: бот
+получает его адреса через PRACTICUM_ENDPOINT и TELEGRAM_API_URL.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT, add_arguments, report
+
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from mocks import FakeApi  # noqa: E402
+
+
+def summarize(timings):
+    """Лучшее и среднее время в микросекундах."""
+    return {
+        'best_us': min(timings) * 1e6,
+        'mean_us': sum(timings) / len(timings) * 1e6,
+        'runs': len(timings),
+    }
+
+
+def run_python(code):
+    """Время выполнения `code` в новом интерпретаторе, секунды."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def import_time(repeat):
+    """Время `import homework` без учёта запуска интерпретатора."""
+    timings = []
+    for _ in range(repeat):
+        timings.append(run_python('import homework') - run_python('pass'))
+    return summarize(timings)
+
+
+def first_poll_env(workdir, url):
+    """Окружение бота, работающего с локальным сервером."""
+    accounts = os.path.join(workdir, 'accounts.json')
+    with open(accounts, 'w', encoding='utf-8') as file:
+        json.dump([{'token': 'benchmark', 'chat_id': 1}], file)
+    env = dict(os.environ)
+    env.pop('TELEGRAM_CHAT_ID', None)
+    env.update({
+        'TOKEN_TELEGRAM': '123456:benchmark',
+        'PRACTICUM_ENDPOINT': url,
+        'TELEGRAM_API_URL': f'{url}bot',
+        'ACCOUNTS_FILE': accounts,
+        'STATE_DB': os.path.join(workdir, 'state.db'),
+        'METRICS_PORT': '0',
+        'WORKERS': '1',
+        'LOG_LEVEL': 'WARNING',
+    })
+    return env
+
+
+def first_poll_time(timeout):
+    """Время от запуска `python homework.py` до первого запроса к API."""
+    with FakeApi() as server, tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'homework.py')],
+            cwd=workdir, env=first_poll_env(workdir, server.url),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not server.first_request.wait(timeout):
+                sys.exit('Бот не обратился к API за отведённое время')
+        finally:
+            process.kill()
+            process.wait()
+        return server.first_request_at - start
+
+
+def run(repeat, timeout):
+    """Запускает все измерения; возвращает результаты по именам."""
+    results = {
+        'import_homework': import_time(repeat),
+        'first_poll': summarize(
+            [first_poll_time(timeout) for _ in range(repeat)]
+        ),
+    }
+    for name, result in results.items():
+        print(f'{name}: {result["best_us"] / 1000:.1f} мс')
+    return results
+
+
+def main():
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='сколько ждать первого запроса, секунд')
+    args = parser.parse_args()
+
+    report(args, run(args.repeat, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
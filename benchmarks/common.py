@@ -0,0 +1,65 @@
+"""Общие функции бенчмарков: метаданные запуска и сравнение результатов."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit():
+    """Хэш текущего коммита или None вне git."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results, threshold):
+    """Печатает отношение к базовым результатам; True при регрессии.
+
+    Сравнивается время `best_us`, а у замеров памяти - `bytes`.
+    """
+    regressed = False
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        metric = 'best_us' if 'best_us' in result else 'bytes'
+        ratio = result[metric] / baseline[name][metric]
+        mark = ''
+        if ratio > threshold:
+            mark = '  <-- регрессия'
+            regressed = True
+        print(f'{name}: x{ratio:.2f}{mark}')
+    return regressed
+
+
+def add_arguments(parser):
+    """Общие аргументы командной строки: --output, --compare, --threshold."""
+    parser.add_argument('--output', help='куда сохранить результаты (JSON)')
+    parser.add_argument('--compare', help='файл с результатами для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='допустимое замедление при сравнении')
+
+
+def report(args, results):
+    """Сохраняет результаты и сравнивает с базовыми по аргументам `args`."""
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+            }, file, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,70 @@
+"""Воспроизведение записанного трафика через цикл опроса бота.
+
+Запись делает сам бот, если задан RECORD_FILE (с WORKERS > 1 - по файлу
+на воркер с суффиксом номера). Запуск из корня проекта:
+    python -m benchmarks.replay traffic.jsonl.gz --speed 100
+    python -m benchmarks.replay traffic.jsonl.gz --speed 0 --output r.json
+
+API практикума и Telegram подменяются записью, поэтому сеть
+не нужна, а прогоны с одной записью воспроизводимы и сравнимы.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import homework  # noqa: E402
+from benchmarks.common import add_arguments, report  # noqa: E402
+from homework_bot.homework_cache import HomeworkCache  # noqa: E402
+from homework_bot.recording import (ReplayBot, ReplayClient,  # noqa: E402
+                                    Replayer, read_recording)
+from homework_bot.storage import StateStore  # noqa: E402
+
+
+def replay(path, speed):
+    """Воспроизводит запись; возвращает статистику и отправленное."""
+    client = ReplayClient()
+    bot = ReplayBot()
+    store = StateStore(':memory:')
+    previous, homework.http_client = homework.http_client, client
+    try:
+        poller = homework.make_poller(
+            store,
+            lambda chat_id, text, key=None: bot.send_message(
+                chat_id=chat_id, text=text
+            ),
+            HomeworkCache(store),
+        )
+        replayer = Replayer(read_recording(path), client, poller, speed)
+        stats = replayer.run()
+    finally:
+        homework.http_client = previous
+        store.close()
+    stats['sent_messages'] = len(bot.sent)
+    return stats, bot.sent, replayer.recorded_messages
+
+
+def main():
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording', help='файл записи RECORD_FILE')
+    parser.add_argument('--speed', type=float, default=1,
+                        help='ускорение относительно записи, 0 - без пауз')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    stats, _, _ = replay(args.recording, args.speed)
+    for name, value in stats.items():
+        print(f'{name}: {value:.6g}')
+    report(args, {
+        'replay_poll': {
+            'best_us': stats['elapsed'] / max(stats['polls'], 1) * 1e6,
+            'polls_per_second': stats['polls_per_second'],
+        },
+    })
+
+
+if __name__ == '__main__':
+    main()
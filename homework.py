@@ -1,25 +1,93 @@
+import contextlib
+import functools
 import json
 import logging
 import os
+import queue
+import signal
 import sys
+import threading
 import time
 from http import HTTPStatus
+from logging.handlers import QueueListener
+
+from homework_bot import metrics
+from homework_bot.accounts import Account, load_accounts
+from homework_bot.breaker import CircuitBreaker
+from homework_bot.dedup import ErrorDeduplicator
+from homework_bot.fingerprint import ResponseCache
+from homework_bot.health import Health, percentiles
+from homework_bot.homework_cache import HomeworkCache
+from homework_bot.logs import JsonFormatter, LazyQueueHandler
+from homework_bot.outbox import Outbox
+from homework_bot.poller import Poller
+from homework_bot.recording import Recorder, RecordingBot, RecordingClient
+from homework_bot.scheduler import POLICIES
+from homework_bot.shutdown import Shutdown
+from homework_bot.status_index import StatusIndex
+from homework_bot.storage import StateStore
+from homework_bot.streaming import HomeworkStream
+
+# Импорт модуля не должен иметь побочных эффектов и тянуть тяжёлые
+# зависимости: telegram, requests и asyncio импортируются там, где
+# используются, - после того как check_tokens() проверил токены.
+if __name__ == '__main__':
+    from dotenv import load_dotenv
 
-import requests
-import telegram
-from dotenv import load_dotenv
-from telegram.ext import MessageHandler, Updater
-
-load_dotenv()
+    load_dotenv()
 
 PRACTICUM_TOKEN = os.getenv('TOKEN_YANDEX')
 TELEGRAM_TOKEN = os.getenv('TOKEN_TELEGRAM')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE')
+ACCOUNTS_RELOAD_INTERVAL = float(os.getenv('ACCOUNTS_RELOAD_INTERVAL', 1))
+STATE_DB = os.getenv('STATE_DB', 'state.db')
+STATUS_INDEX_SIZE = int(os.getenv('STATUS_INDEX_SIZE', 100_000))
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 10))
+METRICS_PORT = int(os.getenv('METRICS_PORT', 8000))
+WORKERS = int(os.getenv('WORKERS', 1))
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+REPORT_INTERVAL = float(os.getenv('REPORT_INTERVAL', 10))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
 
 RETRY_TIME = 60 * 10
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 64))
+POLL_POLICY = os.getenv('POLL_POLICY', 'adaptive')
+STREAM_CHUNK_SIZE = 64 * 1024
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+CIRCUIT_FAILURES = int(os.getenv('CIRCUIT_FAILURES', 5))
+CIRCUIT_RECOVERY_TIME = float(os.getenv('CIRCUIT_RECOVERY_TIME', 30))
+CIRCUIT_PROBES = int(os.getenv('CIRCUIT_PROBES', 1))
+ERROR_WINDOW = int(os.getenv('ERROR_WINDOW', 60 * 60))
+OUTBOX_SIZE = int(os.getenv('OUTBOX_SIZE', 10_000))
+OUTBOX_ATTEMPTS = int(os.getenv('OUTBOX_ATTEMPTS', 10))
+OUTBOX_LEASE_TIMEOUT = float(os.getenv('OUTBOX_LEASE_TIMEOUT', 5 * 60))
+RECORD_FILE = os.getenv('RECORD_FILE')
+HEALTH_STALL_TIMEOUT = float(os.getenv('HEALTH_STALL_TIMEOUT', 120))
+HEALTH_MAX_LAG = float(os.getenv('HEALTH_MAX_LAG', 60))
+HEALTH_MAX_SILENCE = float(os.getenv('HEALTH_MAX_SILENCE', 60 * 40))
+HEALTH_MAX_QUEUE = int(os.getenv('HEALTH_MAX_QUEUE', 1000))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 100))
+PROFILE_SNAPSHOT_INTERVAL = float(os.getenv('PROFILE_SNAPSHOT_INTERVAL', 60))
+TELEGRAM_API_URL = os.getenv(
+    'TELEGRAM_API_URL', 'https://api.telegram.org/bot'
+)
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+)
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
+# Общий пул соединений; создаётся в poll_accounts(), до этого запросы
+# идут через requests.get.
+http_client = None
+# Автомат защиты API практикума; создаётся вместе с пулом соединений.
+circuit_breaker = None
+
 
 HOMEWORK_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -28,31 +96,59 @@ HOMEWORK_STATUSES = {
 }
 
 
-def init_logger(name):
-    """Инициализация логгера и хендлеров."""
+def init_logger(name, level=logging.DEBUG, json_format=False,
+                use_queue=False):
+    """Инициализация логгера и хендлеров.
+
+    С `use_queue` запись в поток вывода и форматирование выполняются в
+    отдельном потоке; возвращается запущенный `QueueListener`.
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(level)
+    logger.handlers.clear()
     format = '%(asctime)s - %(levelname)s - %(name)s:%(lineno)s - %(message)s'
 
     stream_handler = logging.StreamHandler(stream=sys.stdout)
-    stream_handler.setLevel(logging.DEBUG)
-    stream_handler.setFormatter(logging.Formatter(format))
-    logger.addHandler(stream_handler)
+    stream_handler.setLevel(level)
+    if json_format:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(format))
+
+    listener = None
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(LazyQueueHandler(log_queue))
+        listener = QueueListener(
+            log_queue, stream_handler, respect_handler_level=True
+        )
+        listener.start()
+    else:
+        logger.addHandler(stream_handler)
 
     logger.debug('Логгер инициализирован')
+    return listener
 
 
-init_logger(__name__)
 logger = logging.getLogger(__name__)
 
 
 def send_message(bot, message):
     """Отправляет сообщение в Telegram."""
+    send_message_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_message_to_chat(bot, chat_id, message):
+    """Отправляет сообщение в указанный чат Telegram."""
+    import telegram
+
     try:
-        bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
-            text=message,
-        )
+        with metrics.TELEGRAM_LATENCY.time():
+            bot.send_message(
+                chat_id=chat_id,
+                text=message,
+            )
+        metrics.MESSAGES_SENT.inc()
 
         logger.info('Сообщение в Telegram успешно отправлено')
 
@@ -62,20 +158,16 @@ def send_message(bot, message):
 
 def get_api_answer(current_timestamp):
     """Запрос к API практикума."""
-    timestamp = current_timestamp or int(time.time() - RETRY_TIME)
-    params = {'from_date': timestamp}
+    return request_homework_statuses(PRACTICUM_TOKEN, current_timestamp)
 
-    try:
-        response = requests.get(url=ENDPOINT, headers=HEADERS, params=params)
-        if response.status_code != HTTPStatus.OK:
-            raise requests.RequestException(
-                f'Ошибка {response.status_code} при запросе к {ENDPOINT}'
-            )
 
-        response_json = response.json()
+def request_homework_statuses(token, current_timestamp):
+    """Запрос к API практикума от имени указанного токена."""
+    response = send_api_request(token, current_timestamp)
 
-    except ConnectionError:
-        raise ConnectionError(f'Не удалось выполнить запрос к {ENDPOINT}')
+    try:
+        with metrics.DECODE_LATENCY.time():
+            response_json = response.json()
 
     except json.decoder.JSONDecodeError:
         raise ValueError('Не удалось преобразовать данные JSON')
@@ -84,6 +176,90 @@ def get_api_answer(current_timestamp):
     return response_json
 
 
+def fetch_homework_statuses(token, current_timestamp):
+    """Запрос к API практикума; возвращает тело ответа без разбора."""
+    response = send_api_request(token, current_timestamp)
+    logger.info('Ответ от практикума получен')
+    return response.content
+
+
+def decode_response(body):
+    """Преобразует тело ответа API практикума из JSON."""
+    try:
+        with metrics.DECODE_LATENCY.time():
+            return json.loads(body)
+
+    except json.decoder.JSONDecodeError:
+        raise ValueError('Не удалось преобразовать данные JSON')
+
+
+def stream_homework_statuses(token, current_timestamp):
+    """Запрос к API практикума с разбором работ по мере чтения ответа."""
+    response = send_api_request(token, current_timestamp, stream=True)
+    logger.info('Ответ от практикума получен, читается потоково')
+    return HomeworkStream(
+        response.iter_content(STREAM_CHUNK_SIZE), close=response.close
+    )
+
+
+def send_api_request(token, current_timestamp, stream=False):
+    """GET-запрос к API практикума с проверкой кода ответа."""
+    import requests
+
+    timestamp = current_timestamp
+    if timestamp is None:
+        timestamp = int(time.time() - RETRY_TIME)
+    params = {'from_date': timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+
+    guard = contextlib.nullcontext()
+    if circuit_breaker is not None:
+        guard = circuit_breaker.guard()
+
+    response = None
+    try:
+        with guard, metrics.PRACTICUM_LATENCY.time():
+            response = (http_client or requests).get(
+                url=ENDPOINT,
+                headers=headers,
+                params=params,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                stream=stream,
+            )
+            if response.status_code != HTTPStatus.OK:
+                raise requests.RequestException(
+                    f'Ошибка {response.status_code} при запросе к {ENDPOINT}',
+                    response=response,
+                )
+
+    except Exception as error:
+        # Потоковый ответ возвращает соединение в общий пул, только когда
+        # прочитан до конца или закрыт.
+        if response is not None:
+            response.close()
+        if isinstance(error, ConnectionError):
+            raise ConnectionError(f'Не удалось выполнить запрос к {ENDPOINT}')
+        raise
+
+    return response
+
+
+def is_upstream_failure(error):
+    """Сбой на стороне API: нет соединения, таймаут, 5xx или 429."""
+    import requests
+
+    if isinstance(error, (ConnectionError, requests.ConnectionError,
+                          requests.Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    if response is None:
+        return False
+    return (
+        response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+        or response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    )
+
+
 def check_response(response):
     """Проверяет ответ API практикума."""
     if type(response) is not dict:
@@ -96,7 +272,7 @@ def check_response(response):
         raise TypeError('Неверный тип данных')
 
     homeworks = response.get('homeworks')
-    logger.debug(f'homeworks: {homeworks}')
+    logger.debug('homeworks: %s', homeworks)
 
     if type(homeworks) is list:
         logger.info('Ответ от практикума проверен - ОК')
@@ -113,14 +289,14 @@ def parse_status(homework):
         raise KeyError('Отсутствие ожидаемых ключей')
 
     homework_name = homework.get('homework_name')
-    logger.debug(f'homework_name: {homework_name}')
+    logger.debug('homework_name: %s', homework_name)
 
     homework_status = homework.get('status')
-    logger.debug(f'homework_status: {homework_status}')
+    logger.debug('homework_status: %s', homework_status)
 
     if homework_status in HOMEWORK_STATUSES:
         verdict = HOMEWORK_STATUSES[homework_status]
-        logger.info(f'Статус работы "{homework_name}" получен')
+        logger.info('Статус работы "%s" получен', homework_name)
 
         return f'Изменился статус проверки работы "{homework_name}". {verdict}'
     raise KeyError('Обнаружен недокументированный статус домашней работы')
@@ -128,13 +304,13 @@ def parse_status(homework):
 
 def check_tokens():
     """Проверка наличия токенов."""
-    if not PRACTICUM_TOKEN:
+    if not PRACTICUM_TOKEN and not ACCOUNTS_FILE:
         logger.critical('Отсутствует токен практикума')
         return False
     if not TELEGRAM_TOKEN:
         logger.critical('Отсутствует токен Telegram')
         return False
-    if not TELEGRAM_CHAT_ID:
+    if not TELEGRAM_CHAT_ID and not ACCOUNTS_FILE:
         logger.critical('Отсутствует id чата Telegram')
         return False
 
@@ -143,49 +319,633 @@ def check_tokens():
     return True
 
 
-def main():
-    """Основная логика работы бота."""
-    if not check_tokens():
-        sys.exit('Ошибка авторизации')
+def format_statuses(statuses):
+    """Текст ответа на /status."""
+    if not statuses:
+        return 'Пока нет данных о ваших работах'
+    return '\n'.join(
+        f'"{name}": {HOMEWORK_STATUSES.get(status, status)}'
+        for name, status, _ in statuses
+    )
 
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
 
-    updater = Updater(TELEGRAM_TOKEN, use_context=True)
-    updater.dispatcher.add_handler(
+def format_history(history):
+    """Текст ответа на /history."""
+    if not history:
+        return 'Изменений статусов пока не было'
+    return '\n'.join(
+        f'{date_updated or ""} "{name}": '
+        f'{HOMEWORK_STATUSES.get(status, status)}'
+        for name, status, date_updated in history
+    )
+
+
+def add_handlers(dispatcher, homework_cache):
+    """Команды /status и /history отвечают из кэша, без запроса к API.
+
+    Остальные сообщения возвращаются эхом в чат отправителя.
+    """
+    from telegram.ext import CommandHandler, MessageHandler
+
+    dispatcher.add_handler(CommandHandler(
+        'status',
+        lambda update, context: update.message.reply_text(
+            format_statuses(homework_cache.statuses(update.effective_chat.id))
+        ),
+    ))
+    dispatcher.add_handler(CommandHandler(
+        'history',
+        lambda update, context: update.message.reply_text(
+            format_history(homework_cache.history(update.effective_chat.id))
+        ),
+    ))
+    dispatcher.add_handler(
         MessageHandler(
             None,
-            lambda *args: send_message(bot, args[0].message.text)
+            lambda update, context: update.message.reply_text(
+                update.message.text
+            ),
         )
     )
-    updater.start_polling()
 
-    current_timestamp = int(time.time() - RETRY_TIME)
-    log_history = []
 
-    send_message(bot, 'bot started')
+def get_accounts():
+    """Список аккаунтов: из ACCOUNTS_FILE или из переменных окружения."""
+    if ACCOUNTS_FILE:
+        return load_accounts(ACCOUNTS_FILE)
+    return [Account(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)]
+
+
+def restore_cursor(account, cursors):
+    """Курсор аккаунта: сохранённый, из файла или RETRY_TIME назад."""
+    account.from_date = cursors.get(account.key, account.from_date)
+    if account.from_date is None:
+        account.from_date = int(time.time() - RETRY_TIME)
+
+
+def rebind_chats(homework_cache, added, removed, updated):
+    """Привязывает чаты к аккаунтам после перечитывания ACCOUNTS_FILE."""
+    for account in removed:
+        homework_cache.unregister(account)
+    for account, chat_id in updated:
+        homework_cache.unregister(account, chat_id)
+        homework_cache.register(account)
+    for account in added:
+        homework_cache.register(account)
+
+
+def account_changes(engine, store, homework_cache, policy):
+    """Функция, применяющая изменения списка аккаунтов к движку опроса."""
+    def apply(added, removed, updated):
+        engine.remove_accounts(account.key for account in removed)
+        if removed:
+            # Убранный аккаунт может переехать в другой воркер, который
+            # прочитает его курсор с диска.
+            store.flush()
+        rebind_chats(homework_cache, added, removed, updated)
+        cursors = store.load_cursors() if added else {}
+        for position, account in enumerate(added):
+            restore_cursor(account, cursors)
+            engine.add_account(
+                account, policy.initial_delay(position, len(added))
+            )
+
+    return apply
+
+
+def accounts_watcher(accounts, apply):
+    """Наблюдатель за ACCOUNTS_FILE или None, если перечитывать нечего."""
+    from homework_bot.reload import AccountsWatcher
+
+    if not ACCOUNTS_FILE or not ACCOUNTS_RELOAD_INTERVAL:
+        return None
+    return AccountsWatcher(
+        ACCOUNTS_FILE, accounts, apply, ACCOUNTS_RELOAD_INTERVAL
+    )
+
+
+def register_metrics(http_client, outbound, cache, engine, breaker):
+    """Регистрирует метрики компонентов опроса."""
+    registry = metrics.REGISTRY
+    registry.gauge(
+        'outbox_messages', 'Недоставленные сообщения на диске.',
+        outbound.outbox.stats, label='state',
+    )
+    registry.gauge(
+        'circuit_state', 'Состояние цепи к API практикума (1 - текущее).',
+        breaker.states, label='state',
+    )
+    registry.gauge(
+        'circuit_failures', 'Сбои запросов к API практикума подряд.',
+        lambda: breaker.failures,
+    )
+    registry.gauge('accounts', 'Аккаунты в очереди опроса.', engine.__len__)
+    registry.gauge(
+        'outbound_queue_depth', 'Сообщения, ожидающие отправки.',
+        outbound.depth,
+    )
+    registry.counter(
+        'response_cache_hits_total', 'Ответы API, совпавшие с предыдущими.',
+        lambda: cache.hits,
+    )
+    registry.counter(
+        'response_cache_misses_total', 'Ответы API, потребовавшие разбора.',
+        lambda: cache.misses,
+    )
+    registry.counter(
+        'http_new_connections_total', 'Открытые соединения с API практикума.',
+        lambda: http_client.stats()['new_connections'],
+    )
+    registry.counter(
+        'http_reused_connections_total',
+        'Запросы по уже открытым соединениям.',
+        lambda: http_client.stats()['reused_connections'],
+    )
+
+
+def register_health(health, engine, outbound, breaker):
+    """Проверки живости и готовности цикла опроса."""
+    def silence():
+        if engine.last_success is None:
+            return None
+        return time.time() - engine.last_success
+
+    health.live('engine', lambda: engine.running)
+    health.live(
+        'polls_not_stuck',
+        lambda: engine.longest_poll() < HEALTH_STALL_TIMEOUT,
+    )
+    health.ready(
+        'recent_success',
+        lambda: silence() is not None and silence() < HEALTH_MAX_SILENCE,
+    )
+    health.ready(
+        'poll_lag', lambda: percentiles(engine.lags())['p99'] < HEALTH_MAX_LAG
+    )
+    health.ready(
+        'outbound_queue', lambda: outbound.depth() < HEALTH_MAX_QUEUE
+    )
+    health.detail('last_success', lambda: engine.last_success)
+    health.detail('last_success_age', silence)
+    health.detail('poll_lag', lambda: percentiles(engine.lags()))
+    health.detail('longest_poll', engine.longest_poll)
+    health.detail('accounts', lambda: len(engine.accounts()))
+    health.detail('outbound_depth', outbound.depth)
+    health.detail('circuit', lambda: breaker.state)
+
+
+def worker_status(engine, outbound):
+    """Показатели воркера для отчёта главному процессу."""
+    return {
+        'polls': engine.polls,
+        'accounts': len(engine),
+        'poll_lag_p99': percentiles(engine.lags())['p99'],
+        'outbound_depth': outbound.depth(),
+        'last_success': engine.last_success,
+    }
+
+
+def register_worker_health(health, supervisor):
+    """Проверки воркеров по их отчётам для /healthz и /readyz.
+
+    Готовность та же, что у одного процесса: каждый воркер недавно
+    отчитался и успешно опрашивал (если ему достались аккаунты), худший
+    p99 задержки и суммарная очередь отправки в пределах.
+    """
+    def reported(name):
+        return {worker_id: status[name]
+                for worker_id, status in supervisor.statuses.items()}
+
+    def silence():
+        now = time.time()
+        return {worker_id: None if last is None else now - last
+                for worker_id, last in reported('last_success').items()}
+
+    def polling():
+        idle = {worker_id for worker_id, accounts
+                in reported('accounts').items() if not accounts}
+        return {worker_id: age for worker_id, age in silence().items()
+                if worker_id not in idle}
+
+    health.live('workers', supervisor.alive)
+    health.ready('worker_reports', lambda: all(
+        age < REPORT_INTERVAL * 3
+        for age in supervisor.report_ages().values()
+    ))
+    health.ready('recent_success', lambda: all(
+        age is not None and age < HEALTH_MAX_SILENCE
+        for age in polling().values()
+    ))
+    health.ready('poll_lag', lambda: max(
+        reported('poll_lag_p99').values(), default=0
+    ) < HEALTH_MAX_LAG)
+    health.ready('outbound_queue', lambda: sum(
+        reported('outbound_depth').values()
+    ) < HEALTH_MAX_QUEUE)
+    health.detail('worker_report_ages', supervisor.report_ages)
+    health.detail('workers_polls_per_second', lambda: dict(
+        supervisor.throughput
+    ))
+    health.detail('last_success', lambda: reported('last_success'))
+    health.detail('last_success_age', silence)
+    health.detail('poll_lag_p99', lambda: reported('poll_lag_p99'))
+    health.detail('outbound_depth', lambda: sum(
+        reported('outbound_depth').values()
+    ))
+
+
+def updater_alive(updater):
+    """Живы ли потоки Updater, принимающие и обрабатывающие апдейты."""
+    prefix = f'Bot:{updater.bot.id}:'
+    names = {thread.name for thread in threading.enumerate()}
+    return updater.running and {
+        prefix + 'updater', prefix + 'dispatcher'
+    } <= names
+
+
+def start_metrics_server(profiler=None, health=None, port=None,
+                         registry=metrics.REGISTRY):
+    """Запускает /metrics; с `profiler` - /profile, с `health` - /healthz.
+
+    По умолчанию сервер слушает METRICS_PORT и отдаёт общий реестр.
+    """
+    from homework_bot.server import EmbeddedServer
+
+    server = EmbeddedServer(port=port or METRICS_PORT)
+    server.route('GET', '/metrics', lambda body: (
+        HTTPStatus.OK,
+        'text/plain; version=0.0.4; charset=utf-8',
+        registry.render().encode(),
+    ))
+    if profiler is not None:
+        server.route('GET', '/profile', lambda body: profile_command(
+            profiler, b'status'
+        ))
+        server.route('POST', '/profile', functools.partial(
+            profile_command, profiler
+        ))
+    if health is not None:
+        server.route('GET', '/healthz', health.healthz)
+        server.route('GET', '/readyz', health.readyz)
+    server.start()
+    return server
+
+
+def profile_command(profiler, body):
+    """Управляющая команда профилировщика: on, off, toggle или status."""
+    command = body.decode().strip() or 'toggle'
+    actions = {
+        'on': profiler.enable,
+        'off': profiler.disable,
+        'toggle': profiler.toggle,
+        'status': lambda: None,
+    }
+    if command not in actions:
+        return (HTTPStatus.BAD_REQUEST, 'text/plain; charset=utf-8',
+                f'Неизвестная команда: {command}'.encode())
+    actions[command]()
+    return (HTTPStatus.OK, 'application/json',
+            json.dumps(profiler.state()).encode())
+
+
+def setup_logging():
+    """Настраивает логгеры бота; возвращает слушателей очередей логов."""
+    return [
+        init_logger(
+            name,
+            level=LOG_LEVEL,
+            json_format=LOG_FORMAT == 'json',
+            use_queue=True,
+        )
+        for name in (__name__, 'homework_bot')
+    ]
+
+
+def main():
+    """Основная логика работы бота."""
+    listeners = setup_logging()
+    shutdown = Shutdown(SHUTDOWN_TIMEOUT)
+    shutdown.install()
+    try:
+        run_bot(shutdown)
+    finally:
+        if shutdown.requested_at is not None:
+            logger.info('Остановка по %s заняла %.2f с',
+                        shutdown.reason, shutdown.elapsed())
+        for listener in listeners:
+            listener.stop()
+
+
+def stop_updater(updater, shutdown):
+    """Ждёт запроса остановки и останавливает потоки Updater."""
+    shutdown.requested.wait()
+    updater.stop()
+
+
+def run_bot(shutdown):
+    """Запуск бота в одном процессе или с воркерами по WORKERS.
+
+    Работает до запроса остановки `shutdown`, после чего за отведённый
+    срок досылает сообщения, сохраняет состояние и останавливает Updater.
+    """
+    if not check_tokens():
+        sys.exit('Ошибка авторизации')
 
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
+    import telegram
+    from telegram.ext import Updater
+
+    from homework_bot.profiling import SIGNAL
+    from homework_bot.sharding import Supervisor
+
+    accounts = get_accounts()
+    logger.info('Аккаунтов: %s', len(accounts))
+    recover_outbox()
+    # Всё, что запущено до ошибки старта, останавливается в finally:
+    # иначе воркеры и потоки Updater продолжили бы работу без бота.
+    supervisor = None
+    store = None
+    receiver = None
+    updater_stopper = None
+    try:
+        if WORKERS > 1:
+            supervisor = Supervisor(
+                accounts, WORKERS, run_worker, REPORT_INTERVAL,
+                SHUTDOWN_TIMEOUT,
+            )
+            supervisor.start()
+            # Профилирование переключается в каждом воркере.
+            signal.signal(
+                SIGNAL, lambda signum, frame: supervisor.send_signal(signum)
+            )
 
-            for work in homeworks:
-                message = parse_status(work)
-                send_message(bot, message)
+        store = StateStore(STATE_DB)
+        homework_cache = HomeworkCache(store)
+        for account in accounts:
+            homework_cache.register(account)
 
-            current_timestamp = response.get(
-                'current_date',
-                int(time.time() - RETRY_TIME)
+        bot = telegram.Bot(token=TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL)
+        updater = Updater(
+            TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL, use_context=True
+        )
+        add_handlers(updater.dispatcher, homework_cache)
+        # Updater останавливается параллельно с досылкой очереди: его
+        # поток ждёт завершения долгого опроса getUpdates.
+        updater_stopper = threading.Thread(
+            target=stop_updater, args=(updater, shutdown),
+            name='updater-stop',
+        )
+        updater_stopper.start()
+        health = Health()
+        if WEBHOOK_URL:
+            from homework_bot.webhook import WebhookReceiver, webhook_path
+
+            receiver = WebhookReceiver(
+                updater.bot, updater.dispatcher,
+                webhook_path(TELEGRAM_TOKEN), port=WEBHOOK_PORT,
             )
-            log_history = []
+            receiver.start(WEBHOOK_URL)
+            health.live('telegram', receiver.server.alive)
+        else:
+            updater.start_polling()
+            health.live('telegram', lambda: updater_alive(updater))
+
+        if TELEGRAM_CHAT_ID:
+            send_message(bot, 'bot started')
+
+        if supervisor is not None:
+            supervise(supervisor, shutdown, homework_cache, health)
+        else:
+            poll_accounts(
+                bot, accounts, store, homework_cache, shutdown,
+                metrics_port=METRICS_PORT, record_file=RECORD_FILE,
+                watch_accounts=True, health=health,
+            )
+    finally:
+        shutdown.request()
+        if receiver is not None:
+            receiver.stop()
+        if supervisor is not None:
+            supervisor.stop(shutdown.remaining())
+        if store is not None:
+            store.close()
+        if updater_stopper is not None:
+            updater_stopper.join(shutdown.remaining())
+            if updater_stopper.is_alive():
+                logger.error('Updater не остановился за отведённое время')
+
+
+def recover_outbox():
+    """Возвращает к отправке сообщения, не доставленные прошлым запуском."""
+    outbox = Outbox(STATE_DB)
+    try:
+        count = outbox.recover()
+    finally:
+        outbox.close()
+    if count:
+        logger.info('Недоставленных сообщений с прошлого запуска: %s', count)
+
+
+def supervise(supervisor, shutdown, homework_cache, health):
+    """Следит за воркерами до запроса остановки.
+
+    Изменения ACCOUNTS_FILE применяются здесь же, между проверками
+    воркеров: каждый воркер получает разницу со своей долей и применяет
+    её сам, не прерывая опрос остальных аккаунтов.
+    """
+    def apply(added, removed, updated):
+        rebind_chats(homework_cache, added, removed, updated)
+        supervisor.reload(watcher.accounts.values())
+
+    watcher = accounts_watcher(supervisor.accounts, apply)
+    server = None
+    if METRICS_PORT:
+        # Опрос идёт в воркерах, и их метрики отдаются на их портах;
+        # здесь - только то, что измеряет главный процесс.
+        registry = metrics.Registry()
+        registry.gauge(
+            'worker_polls_per_second', 'Опросы в секунду по воркерам.',
+            lambda: dict(supervisor.throughput), label='worker',
+        )
+        registry.register(metrics.RELOADS)
+        registry.register(metrics.RELOAD_LATENCY)
+        register_worker_health(health, supervisor)
+        server = start_metrics_server(health=health, registry=registry)
+    try:
+        # Короткий интервал, чтобы запрос остановки замечался быстро;
+        # отчёты воркеров при этом приходят раз в REPORT_INTERVAL.
+        while not shutdown.requested.is_set():
+            supervisor.monitor(1)
+            if watcher is not None:
+                watcher.check()
+    finally:
+        if server is not None:
+            server.stop()
+
+
+def run_worker(worker_id, accounts, reports, control):
+    """Процесс-воркер: опрашивает свою долю аккаунтов.
+
+    Изменения доли приходят от главного процесса в очередь `control`.
+    Метрики, /profile и проверки воркера отдаются на порту
+    METRICS_PORT + 1 + `worker_id`.
+    """
+    import telegram
+
+    from homework_bot.profiling import SIGNAL
+    from homework_bot.sharding import report_status
+
+    # Обработчик пересылки сигнала унаследован от главного процесса.
+    signal.signal(SIGNAL, signal.SIG_IGN)
+    listeners = setup_logging()
+    shutdown = Shutdown(SHUTDOWN_TIMEOUT)
+    shutdown.install()
+    store = StateStore(STATE_DB)
+    try:
+        poll_accounts(
+            telegram.Bot(token=TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL),
+            accounts,
+            store,
+            HomeworkCache(store),
+            shutdown,
+            on_start=lambda engine, outbound: report_status(
+                worker_id, reports, REPORT_INTERVAL,
+                functools.partial(worker_status, engine, outbound),
+            ),
+            metrics_port=METRICS_PORT and METRICS_PORT + 1 + worker_id,
+            record_file=RECORD_FILE and f'{RECORD_FILE}.{worker_id}',
+            health=Health(),
+            control=control,
+        )
+    finally:
+        store.close()
+        for listener in listeners:
+            listener.stop()
+
+
+def make_poller(store, notify, homework_cache):
+    """Цикл опроса аккаунта на функциях этого модуля."""
+    return Poller(
+        fetch=fetch_homework_statuses,
+        stream=stream_homework_statuses,
+        decode=decode_response,
+        check=check_response,
+        parse=parse_status,
+        notify=notify,
+        store=store,
+        index=StatusIndex(store, STATUS_INDEX_SIZE),
+        cache=ResponseCache(),
+        homework_cache=homework_cache,
+        errors=ErrorDeduplicator(ERROR_WINDOW),
+        retry_time=RETRY_TIME,
+    )
+
 
-        except Exception as error:
-            logger.error(error)
-            if error.args not in log_history:
-                log_history.append(error.args)
-                send_message(bot, str(error))
+def poll_accounts(bot, accounts, store, homework_cache, shutdown,
+                  metrics_port=None, on_start=None, record_file=None,
+                  watch_accounts=False, health=None, control=None):
+    """Опрашивает аккаунты в текущем процессе до запроса остановки.
+
+    С `metrics_port` на этом порту отдаются метрики, /profile, /healthz
+    и /readyz. С `record_file` ответы API и сообщения записываются для
+    воспроизведения через `benchmarks.replay`. С `watch_accounts`
+    изменения ACCOUNTS_FILE применяются без перезапуска, а `health`
+    получает проверки цикла опроса для /healthz и /readyz. Из очереди
+    `control` приходят изменения доли воркера от главного процесса.
+    `on_start(engine, outbound)` вызывается, когда всё готово к опросу.
+    """
+    import asyncio
+
+    from homework_bot.engine import PollingEngine
+    from homework_bot.http_client import HttpClient
+    from homework_bot.outbound import OutboundQueue
+    from homework_bot.profiling import Profiler
+    from homework_bot.sharding import receive_changes
+
+    global http_client, circuit_breaker
+
+    http_client = HttpClient(
+        pool_size=POLL_CONCURRENCY,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+    )
+    recorder = None
+    if record_file:
+        recorder = Recorder(record_file)
+        recorder.accounts(accounts)
+        http_client = RecordingClient(http_client, recorder)
+        bot = RecordingBot(bot, recorder)
+    circuit_breaker = CircuitBreaker(
+        failure_threshold=CIRCUIT_FAILURES,
+        recovery_timeout=CIRCUIT_RECOVERY_TIME,
+        probes=CIRCUIT_PROBES,
+        is_failure=is_upstream_failure,
+    )
+    outbox = Outbox(
+        STATE_DB, max_pending=OUTBOX_SIZE, max_attempts=OUTBOX_ATTEMPTS,
+        lease_timeout=OUTBOX_LEASE_TIMEOUT,
+    )
+    outbound = OutboundQueue(bot, outbox=outbox)
+    outbound.start()
+    cursors = store.load_cursors()
+    poller = make_poller(store, outbound.put, homework_cache)
+    policy = POLICIES[POLL_POLICY](RETRY_TIME)
+    engine = PollingEngine(
+        poller, policy, POLL_CONCURRENCY, breaker=circuit_breaker
+    )
+    for position, account in enumerate(accounts):
+        restore_cursor(account, cursors)
+        engine.add_account(
+            account, policy.initial_delay(position, len(accounts))
+        )
 
-        time.sleep(RETRY_TIME)
+    apply = account_changes(engine, store, homework_cache, policy)
+    watcher = accounts_watcher(accounts, apply) if watch_accounts else None
+    if watcher is not None:
+        watcher.start()
+    if control is not None:
+        receive_changes(control, engine, apply)
+
+    profiler = Profiler(
+        engine, PROFILE_DIR, PROFILE_KEEP, PROFILE_SNAPSHOT_INTERVAL
+    )
+    profiler.install()
+
+    register_metrics(
+        http_client, outbound, poller.cache, engine, circuit_breaker
+    )
+    if health is not None:
+        register_health(health, engine, outbound, circuit_breaker)
+    server = None
+    if metrics_port:
+        server = start_metrics_server(profiler, health, metrics_port)
+    if on_start is not None:
+        on_start(engine, outbound)
+    logger.info('Опрашивается аккаунтов: %s', len(accounts))
+    shutdown.on_request(lambda: engine.stop(shutdown.remaining()))
+
+    try:
+        asyncio.run(engine.run())
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        profiler.disable()
+        if server is not None:
+            server.stop()
+        unsent = outbound.stop(shutdown.remaining())
+        if unsent:
+            logger.warning('Не отправлено сообщений: %s, они сохранены '
+                           'и будут отправлены при следующем запуске', unsent)
+        logger.info('Очередь отправки: %s', outbound.stats())
+        logger.info('Кэш ответов: %s', poller.cache.stats())
+        store.flush()
+        logger.info('Соединения с API: %s', http_client.stats())
+        http_client.close()
+        # Поток отправки, не успевший остановиться, ещё отметит
+        # доставку в outbox; база закроется вместе с процессом.
+        if not outbound.alive():
+            outbox.close()
+        if recorder is not None:
+            recorder.close()
 
 
 if __name__ == '__main__':
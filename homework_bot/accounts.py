@@ -0,0 +1,68 @@
+"""Аккаунты студентов, которые опрашивает бот."""
+import hashlib
+import json
+import sys
+
+
+def intern_status(status):
+    """Общий для всех аккаунтов экземпляр строки статуса.
+
+    Ключи `HOMEWORK_STATUSES` - строковые литералы, которые интерпретатор
+    интернирует сам, поэтому статусы из ответов API становятся ссылками
+    на них, а не отдельной строкой в каждом аккаунте и записи индекса.
+    """
+    return sys.intern(status) if type(status) is str else status
+
+
+class Account:
+    """Состояние одного аккаунта: токен, чат, курсор и счётчики опроса.
+
+    Аккаунтов в одном процессе - до сотен тысяч, поэтому у объекта нет
+    `__dict__`, статус интернирован, а ключ вычисляется один раз и
+    разделяется всеми структурами, где аккаунт встречается.
+    """
+
+    __slots__ = (
+        'token', 'chat_id', 'from_date', 'status', 'failures', 'idle',
+        'fingerprint', '_key',
+    )
+
+    def __init__(self, token, chat_id, from_date=None):
+        """Аккаунт с токеном практикума и чатом для уведомлений."""
+        self.token = token
+        self.chat_id = chat_id
+        self.from_date = from_date
+        self.status = None
+        self.failures = 0
+        self.idle = 0
+        self.fingerprint = None
+        self._key = None
+
+    @property
+    def key(self):
+        """Устойчивый идентификатор аккаунта, не раскрывающий токен."""
+        if self._key is None:
+            self._key = hashlib.sha256(self.token.encode()).hexdigest()[:16]
+        return self._key
+
+    def __repr__(self):
+        """Представление без токена, чтобы он не попадал в логи."""
+        return f'Account(chat_id={self.chat_id!r})'
+
+
+def load_accounts(path):
+    """Читает список аккаунтов из JSON-файла."""
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+
+    if type(data) is not list:
+        raise TypeError('Файл аккаунтов должен содержать список')
+
+    accounts = []
+    for item in data:
+        if 'token' not in item or 'chat_id' not in item:
+            raise KeyError('Отсутствие ожидаемых ключей в описании аккаунта')
+        accounts.append(
+            Account(item['token'], item['chat_id'], item.get('from_date'))
+        )
+    return accounts
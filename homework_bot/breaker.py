@@ -0,0 +1,142 @@
+"""Автомат защиты (circuit breaker) для запросов к API практикума."""
+import contextlib
+import logging
+import threading
+import time
+
+from .metrics import CIRCUIT_REJECTED, CIRCUIT_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATES = (CLOSED, HALF_OPEN, OPEN)
+
+
+class CircuitOpenError(Exception):
+    """Запрос не отправлен: цепь разомкнута."""
+
+    def __init__(self, retry_after):
+        """Ошибка с временем до следующей попытки."""
+        super().__init__(
+            f'API практикума недоступно, повтор через {retry_after:.0f} с'
+        )
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Общий для всех запросов автомат с состояниями closed/open/half-open.
+
+    После `failure_threshold` сбоев подряд цепь размыкается, и запросы
+    не отправляются `recovery_timeout` секунд. Затем пропускается не больше
+    `probes` пробных запросов: успех замыкает цепь, сбой снова размыкает.
+    Сбоем считается исключение, для которого `is_failure` вернул True;
+    остальные исключения (например, неверный токен) считаются ответом API.
+    Запрос оборачивается в `with breaker.guard():`.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, probes=1,
+                 is_failure=None, clock=time.monotonic):
+        """Автомат в замкнутом состоянии."""
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probes = probes
+        self.is_failure = is_failure or (lambda error: True)
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def guard(self):
+        """Выполняет запрос в блоке `with` и учитывает его результат."""
+        probe = self.acquire()
+        try:
+            yield
+        except Exception as error:
+            if self.is_failure(error):
+                self.record_failure(probe)
+            else:
+                self.record_success(probe)
+            raise
+        self.record_success(probe)
+
+    def acquire(self):
+        """Разрешение на запрос; CircuitOpenError, если цепь разомкнута.
+
+        Возвращает True, если запрос пробный.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                wait = self._opened_at + self.recovery_timeout - self.clock()
+                if wait > 0:
+                    CIRCUIT_REJECTED.inc()
+                    raise CircuitOpenError(wait)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    CIRCUIT_REJECTED.inc()
+                    raise CircuitOpenError(0)
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record_success(self, probe=False):
+        """API ответило: цепь замыкается, счётчик сбоев сбрасывается."""
+        with self._lock:
+            self.failures = 0
+            if probe:
+                self._probes_in_flight -= 1
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self, probe=False):
+        """Сбой запроса: при достижении порога цепь размыкается."""
+        with self._lock:
+            self.failures += 1
+            if probe:
+                self._probes_in_flight -= 1
+            if self.state == HALF_OPEN:
+                self._open()
+            elif (
+                self.state == CLOSED
+                and self.failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def retry_after(self):
+        """Через сколько секунд можно отправлять запросы.
+
+        0 - можно сейчас, None - ждать завершения пробных запросов.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return 0
+            if self.state == HALF_OPEN:
+                return 0 if self._probes_in_flight < self.probes else None
+            return max(
+                self._opened_at + self.recovery_timeout - self.clock(), 0
+            )
+
+    def states(self):
+        """Текущее состояние в виде {состояние: 0 или 1} для метрик."""
+        return {state: int(state == self.state) for state in STATES}
+
+    def _open(self):
+        self._opened_at = self.clock()
+        self._transition(OPEN)
+
+    def _transition(self, state):
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(label=state)
+        if state == OPEN:
+            logger.warning(
+                'Цепь к API практикума разомкнута после %s сбоев, '
+                'опрос приостановлен на %s с',
+                self.failures, self.recovery_timeout,
+            )
+        else:
+            logger.info('Цепь к API практикума: %s', state)
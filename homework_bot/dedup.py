@@ -0,0 +1,102 @@
+"""Дедупликация уведомлений об ошибках с окном по времени."""
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import ERRORS_SUPPRESSED
+
+# Окно, в котором ошибка одного класса отправляется в чат один раз.
+WINDOW = 60 * 60
+
+
+class _Entry:
+    __slots__ = ('message', 'sent_at', 'suppressed')
+
+    def __init__(self, message, sent_at):
+        self.message = message
+        self.sent_at = sent_at
+        self.suppressed = 0
+
+
+class ErrorDeduplicator:
+    """Ограничивает уведомления об ошибках: одно на класс ошибки за окно.
+
+    Первая ошибка класса отправляется сразу, повторы в течение `window`
+    секунд только подсчитываются. После окна вместо очередного сообщения
+    отправляется сводка «ошибка повторилась N раз», а успешный опрос
+    досылает сводки по истёкшим окнам. Успех не сбрасывает окно, поэтому
+    мигающая ошибка не засыпает чат. Хранится не больше `max_size`
+    аккаунтов, давно не ошибавшиеся вытесняются первыми. Один экземпляр
+    общий для потоков опроса, поэтому кэш меняется под блокировкой.
+    """
+
+    def __init__(self, window=WINDOW, max_size=10_000, clock=time.monotonic):
+        """Пустой кэш ошибок с окном `window` секунд."""
+        self.window = window
+        self.max_size = max_size
+        self.clock = clock
+        self._accounts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Количество аккаунтов с запомненными ошибками."""
+        return len(self._accounts)
+
+    def report(self, account_key, error):
+        """Учитывает ошибку; возвращает текст для отправки или None."""
+        with self._lock:
+            return self._report(account_key, error)
+
+    def resolved(self, account_key):
+        """Опрос успешен: сводки по истёкшим окнам с подавленными ошибками."""
+        with self._lock:
+            return self._resolved(account_key)
+
+    def _report(self, account_key, error):
+        now = self.clock()
+        entries = self._accounts.get(account_key)
+        if entries is None:
+            entries = self._accounts[account_key] = {}
+            if len(self._accounts) > self.max_size:
+                self._accounts.popitem(last=False)
+        else:
+            self._accounts.move_to_end(account_key)
+
+        name = type(error).__name__
+        message = str(error)
+        entry = entries.get(name)
+        if entry is not None and now - entry.sent_at < self.window:
+            entry.message = message
+            entry.suppressed += 1
+            ERRORS_SUPPRESSED.inc()
+            return None
+
+        entries[name] = _Entry(message, now)
+        if entry is None or not entry.suppressed:
+            return message
+        entry.message = message
+        entry.suppressed += 1
+        return self._summary(entry)
+
+    def _resolved(self, account_key):
+        entries = self._accounts.get(account_key)
+        if entries is None:
+            return []
+
+        now = self.clock()
+        summaries = []
+        for name, entry in list(entries.items()):
+            if now - entry.sent_at < self.window:
+                continue
+            if entry.suppressed:
+                summaries.append(self._summary(entry))
+            del entries[name]
+        if not entries:
+            del self._accounts[account_key]
+        return summaries
+
+    def _summary(self, entry):
+        return (
+            f'Ошибка «{entry.message}» повторилась {entry.suppressed} раз '
+            f'за последние {self.window / 60:.0f} мин.'
+        )
@@ -0,0 +1,237 @@
+"""Асинхронный движок опроса API практикума для множества аккаунтов."""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import CYCLE_LATENCY, ERRORS
+from .scheduler import CHANGED, ERROR, IDLE, SUSPENDED
+
+logger = logging.getLogger(__name__)
+
+
+class PollingEngine:
+    """Планирует опросы аккаунтов и выполняет их с ограниченным параллелизмом.
+
+    Очередь опросов хранится в куче по времени следующего запуска,
+    поэтому на аккаунт приходится одна запись, а не отдельная задача.
+    Блокирующий `poll(account)` выполняется в пуле потоков и возвращает
+    результат опроса, по которому `policy` выбирает время следующего.
+    Пока автомат защиты `breaker` не пропускает запросы, новые опросы
+    не запускаются ни для одного аккаунта. Аккаунты можно добавлять
+    и убирать на ходу из любого потока: очередь защищена блокировкой,
+    а опросы остальных аккаунтов при этом не прерываются.
+    """
+
+    def __init__(self, poll, policy, concurrency=64, breaker=None):
+        """Движок без аккаунтов; опрос выполняет `poll`."""
+        self.poll = poll
+        self.policy = policy
+        self.concurrency = concurrency
+        self.breaker = breaker
+        self._queue = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        # Опрашиваемые сейчас аккаунты: {аккаунт: (назначено, начато)},
+        # и убранные во время опроса: им новый опрос не назначается.
+        self._polling = {}
+        self._dropped = set()
+        self._loop = None
+        self._loop_thread = None
+        self._wakeup = None
+        self._stopping = False
+        self._drain_timeout = None
+        self.polls = 0
+        self.last_success = None
+
+    def __len__(self):
+        """Количество аккаунтов в очереди опроса."""
+        return len(self._queue)
+
+    def add_account(self, account, delay=0):
+        """Ставит аккаунт в очередь опроса через `delay` секунд."""
+        with self._lock:
+            heapq.heappush(
+                self._queue,
+                (time.monotonic() + delay, next(self._counter), account)
+            )
+        self._wake()
+
+    def remove_accounts(self, keys):
+        """Убирает аккаунты с ключами `keys`; возвращает число убранных.
+
+        Идущий опрос такого аккаунта доводится до конца, но следующий
+        не назначается.
+        """
+        keys = set(keys)
+        with self._lock:
+            size = len(self._queue)
+            self._queue = [
+                entry for entry in self._queue if entry[2].key not in keys
+            ]
+            heapq.heapify(self._queue)
+            removed = size - len(self._queue)
+            for account in self._polling:
+                if account.key in keys:
+                    self._dropped.add(account)
+                    removed += 1
+        return removed
+
+    @property
+    def running(self):
+        """Работает ли основной цикл."""
+        return self._loop is not None and not self._stopping
+
+    def lags(self):
+        """Опоздание опроса каждого аккаунта, с.
+
+        Для аккаунтов в очереди - насколько просрочен их опрос, для
+        опрашиваемых сейчас - сколько прошло с назначенного времени.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [entry[0] for entry in self._queue]
+            due.extend(scheduled for scheduled, _ in self._polling.values())
+        return [max(now - scheduled, 0) for scheduled in due]
+
+    def longest_poll(self):
+        """Сколько секунд идёт самый долгий из текущих опросов."""
+        now = time.monotonic()
+        with self._lock:
+            return max(
+                (now - started for _, started in self._polling.values()),
+                default=0,
+            )
+
+    def accounts(self):
+        """Аккаунты в очереди и в опросе."""
+        with self._lock:
+            return [entry[2] for entry in self._queue] + [
+                account for account in self._polling
+                if account not in self._dropped
+            ]
+
+    def stop(self, timeout=None):
+        """Останавливает движок после завершения текущих опросов.
+
+        Опросы, не завершившиеся за `timeout` секунд, не ожидаются.
+        Можно вызывать из любого потока и из обработчика сигнала.
+        """
+        self._drain_timeout = timeout
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self):
+        """Основной цикл: запускает опросы по мере наступления их времени."""
+        self._wakeup = asyncio.Event()
+        self._loop_thread = threading.get_ident()
+        loop = self._loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        in_flight = set()
+
+        executor = ThreadPoolExecutor(self.concurrency)
+        try:
+            while not self._stopping:
+                while not self._stopping and self._suspended_for() == 0:
+                    account = self._pop_due()
+                    if account is None:
+                        break
+                    await semaphore.acquire()
+                    task = loop.create_task(
+                        self._poll(loop, executor, semaphore, account)
+                    )
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+
+                await self._sleep()
+
+            if in_flight:
+                await self._drain(in_flight)
+        finally:
+            executor.shutdown(wait=not in_flight, cancel_futures=True)
+            self._loop = None
+        logger.info('Движок опроса остановлен')
+
+    def _pop_due(self):
+        """Аккаунт, которому пора на опрос, или None."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._queue or self._queue[0][0] > now:
+                return None
+            due, _, account = heapq.heappop(self._queue)
+            self._polling[account] = (due, now)
+        return account
+
+    def _wake(self):
+        """Будит основной цикл; из чужого потока - через call_soon."""
+        loop = self._loop
+        if loop is None:
+            return
+        if threading.get_ident() == self._loop_thread:
+            self._wakeup.set()
+        else:
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _drain(self, in_flight):
+        """Ждёт текущие опросы, но не дольше срока из `stop()`."""
+        _, pending = await asyncio.wait(
+            set(in_flight), timeout=self._drain_timeout
+        )
+        if pending:
+            logger.warning('Не дождались завершения опросов: %s', len(pending))
+
+    def _suspended_for(self):
+        """Сколько ещё опросы приостановлены; None - до пробуждения."""
+        if self.breaker is None:
+            return 0
+        return self.breaker.retry_after()
+
+    async def _sleep(self):
+        """Ждёт ближайшего опроса или внешнего пробуждения."""
+        timeout = self._suspended_for()
+        if timeout == 0:
+            with self._lock:
+                due = self._queue[0][0] if self._queue else None
+            timeout = None if due is None else max(due - time.monotonic(), 0)
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _poll(self, loop, executor, semaphore, account):
+        outcome = ERROR
+        started = time.perf_counter()
+        try:
+            outcome = await loop.run_in_executor(
+                executor, self.poll, account
+            )
+            if outcome in (CHANGED, IDLE):
+                self.last_success = time.time()
+        except Exception as error:
+            ERRORS.inc(label=type(error).__name__)
+            logger.error('Ошибка опроса %r: %s', account, error)
+        finally:
+            CYCLE_LATENCY.observe(time.perf_counter() - started)
+            self.polls += 1
+            semaphore.release()
+            if not self._stopping:
+                self._reschedule(account, outcome)
+
+    def _reschedule(self, account, outcome):
+        """Следующий опрос; отложенный из-за цепи - сразу после замыкания."""
+        with self._lock:
+            self._polling.pop(account, None)
+            if account in self._dropped:
+                self._dropped.discard(account)
+                return
+        if outcome == SUSPENDED:
+            self.add_account(account)
+        else:
+            self.add_account(
+                account, self.policy.next_delay(account, outcome)
+            )
@@ -0,0 +1,44 @@
+"""Отпечатки ответов API для пропуска неизменившихся тел."""
+import hashlib
+import re
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(\d+)')
+
+
+class ResponseCache:
+    """Сравнивает тело ответа с последним обработанным для аккаунта.
+
+    Отпечаток - хэш сырых байтов без поля `current_date`, которое меняется
+    при каждом запросе. Сам отпечаток хранится в `Account.fingerprint`,
+    здесь - только счётчики попаданий и промахов.
+    """
+
+    def __init__(self):
+        """Пустой кэш ответов."""
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(body):
+        """Отпечаток тела ответа, не зависящий от `current_date`."""
+        return hashlib.blake2b(
+            CURRENT_DATE.sub(b'', body), digest_size=16
+        ).digest()
+
+    @staticmethod
+    def current_date(body):
+        """Значение `current_date` из тела без разбора JSON."""
+        match = CURRENT_DATE.search(body)
+        return int(match.group(1)) if match else None
+
+    def hit(self, account, digest):
+        """Совпадает ли отпечаток с последним обработанным ответом."""
+        if account.fingerprint == digest:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def stats(self):
+        """Счётчики попаданий и промахов."""
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,84 @@
+"""Проверки живости и готовности бота для оркестратора."""
+import json
+import logging
+import math
+from http import HTTPStatus
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentiles(values, points=PERCENTILES):
+    """Перцентили по ближайшему рангу: {'p50': ..., 'max': ...}."""
+    values = sorted(values)
+    if not values:
+        return {**{f'p{point}': 0 for point in points}, 'max': 0}
+    result = {
+        f'p{point}': values[max(math.ceil(point / 100 * len(values)), 1) - 1]
+        for point in points
+    }
+    result['max'] = values[-1]
+    return result
+
+
+class Health:
+    """Отчёт о состоянии бота для /healthz и /readyz.
+
+    Проверки живости (`live`) отвечают, поможет ли перезапуск: завис
+    цикл опроса или умер поток Telegram. Проверки готовности (`ready`) -
+    выполняет ли бот работу вовремя, по ним удобно настраивать алерты;
+    /readyz включает и проверки живости. Проверка - функция без
+    аргументов, исключение в ней считается провалом. Ответ - JSON
+    с результатами проверок и сведениями `detail`, код 200 или 503.
+    """
+
+    def __init__(self):
+        """Отчёт без проверок."""
+        self.liveness = {}
+        self.readiness = {}
+        self.details = {}
+
+    def live(self, name, check):
+        """Добавляет проверку живости."""
+        self.liveness[name] = check
+
+    def ready(self, name, check):
+        """Добавляет проверку готовности."""
+        self.readiness[name] = check
+
+    def detail(self, name, func):
+        """Добавляет сведения, которые попадают в ответ без проверки."""
+        self.details[name] = func
+
+    def report(self, checks):
+        """Результаты проверок `checks`: (всё ли в порядке, тело ответа)."""
+        results = {}
+        for name, check in checks.items():
+            try:
+                results[name] = bool(check())
+            except Exception as error:
+                logger.error('Проверка %s не выполнена: %s', name, error)
+                results[name] = False
+        healthy = all(results.values())
+        payload = {'status': 'ok' if healthy else 'fail', 'checks': results}
+        for name, func in self.details.items():
+            try:
+                payload[name] = func()
+            except Exception as error:
+                payload[name] = None
+                logger.error('Сведения %s не получены: %s', name, error)
+        return healthy, payload
+
+    def healthz(self, body=b''):
+        """Ответ эндпоинта /healthz."""
+        return self._response(self.liveness)
+
+    def readyz(self, body=b''):
+        """Ответ эндпоинта /readyz."""
+        return self._response({**self.liveness, **self.readiness})
+
+    def _response(self, checks):
+        healthy, payload = self.report(checks)
+        status = HTTPStatus.OK if healthy else HTTPStatus.SERVICE_UNAVAILABLE
+        return status, 'application/json', json.dumps(payload).encode()
@@ -0,0 +1,53 @@
+"""Локальный кэш статусов работ для команд /status и /history."""
+
+
+class HomeworkCache:
+    """Статусы работ и история их изменений по чатам.
+
+    Чаты идентифицируются строкой: в .env и в апдейтах Telegram id чата
+    приходит разными типами.
+
+    Данные пополняются из обычного цикла опроса, поэтому команды отвечают
+    без запросов к API практикума. Последние статусы и история хранятся
+    в `store`: её записывает процесс, опрашивающий аккаунт, а читает
+    любой, в том числе главный процесс при работе с воркерами. В памяти
+    остаётся только привязка чатов к аккаунтам.
+    """
+
+    def __init__(self, store):
+        """Кэш поверх хранилища состояния `store`."""
+        self.store = store
+        self._accounts = {}
+
+    def register(self, account):
+        """Связывает чат с аккаунтом."""
+        self._accounts[str(account.chat_id)] = account.key
+
+    def unregister(self, account, chat_id=None):
+        """Отвязывает от аккаунта его чат или прежний чат `chat_id`."""
+        chat_id = str(account.chat_id if chat_id is None else chat_id)
+        if self._accounts.get(chat_id) == account.key:
+            del self._accounts[chat_id]
+
+    def update(self, account, homework):
+        """Запоминает изменение статуса работы."""
+        self.store.save_history(
+            account.key,
+            homework['homework_name'],
+            homework['status'],
+            homework.get('date_updated'),
+        )
+
+    def statuses(self, chat_id):
+        """Список (работа, статус, date_updated) для чата."""
+        key = self._accounts.get(str(chat_id))
+        if key is None:
+            return []
+        return sorted(self.store.load_statuses(key))
+
+    def history(self, chat_id):
+        """Последние изменения статусов в чате, от старых к новым."""
+        key = self._accounts.get(str(chat_id))
+        if key is None:
+            return []
+        return self.store.load_history(key)
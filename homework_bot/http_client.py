@@ -0,0 +1,80 @@
+"""Общий пул HTTP-соединений для запросов к API практикума."""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CountingAdapter(HTTPAdapter):
+    """Адаптер, который считает установленные TCP/TLS-соединения."""
+
+    def __init__(self, **kwargs):
+        """Адаптер со счётчиком новых соединений."""
+        self.new_connections = 0
+        self._lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def get_connection(self, url, proxies=None):
+        """Возвращает пул хоста, подменяя в нём класс соединения."""
+        pool = super().get_connection(url, proxies)
+        if not getattr(pool, 'counted', False):
+            pool.ConnectionCls = self._counting(pool.ConnectionCls)
+            pool.counted = True
+        return pool
+
+    def _counting(self, connection_cls):
+        adapter = self
+
+        class CountingConnection(connection_cls):
+            def connect(self):
+                with adapter._lock:
+                    adapter.new_connections += 1
+                super().connect()
+
+        return CountingConnection
+
+
+class HttpClient:
+    """Сессия requests с пулом keep-alive соединений и таймаутами.
+
+    Соединения (и TLS-сессии поверх них) переиспользуются между опросами,
+    поэтому рукопожатие выполняется только при открытии нового соединения.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30,
+                 keep_alive=True, pool_block=True, retries=0):
+        """Сессия с пулом на `pool_size` соединений."""
+        self.timeout = (connect_timeout, read_timeout)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self._adapter = CountingAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=pool_block,
+            max_retries=retries,
+        )
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def get(self, url, **kwargs):
+        """GET-запрос через пул; таймаут по умолчанию берётся из клиента."""
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self.requests += 1
+        return self.session.get(url, **kwargs)
+
+    def stats(self):
+        """Счётчики запросов, новых и переиспользованных соединений."""
+        new_connections = self._adapter.new_connections
+        return {
+            'requests': self.requests,
+            'new_connections': new_connections,
+            'reused_connections': max(self.requests - new_connections, 0),
+        }
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        self.session.close()
@@ -0,0 +1,35 @@
+"""Форматтеры и обработчики для неблокирующего логирования."""
+import json
+import logging
+from logging.handlers import QueueHandler
+
+
+class JsonFormatter(logging.Formatter):
+    """Компактный JSON: одна запись - одна строка."""
+
+    def format(self, record):
+        """Сериализует запись в JSON."""
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'line': record.lineno,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler, который не форматирует сообщение в потоке вызова.
+
+    Стандартный `QueueHandler.prepare` подставляет аргументы в сообщение
+    до постановки в очередь. Здесь запись уходит в очередь как есть, и
+    форматирование выполняет поток `QueueListener`. Поэтому аргументы
+    логирования не должны изменяться после вызова.
+    """
+
+    def prepare(self, record):
+        """Возвращает запись без форматирования."""
+        return record
@@ -0,0 +1,228 @@
+"""Метрики бота в текстовом формате Prometheus."""
+import bisect
+import threading
+import time
+
+PREFIX = 'homework_bot_'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+
+
+class Counter:
+    """Монотонный счётчик, опционально с одной меткой."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label=None):
+        """Счётчик с нулевым значением."""
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, label=''):
+        """Увеличивает счётчик (для метки `label`)."""
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def value(self, label=''):
+        """Текущее значение счётчика."""
+        return self._values.get(label, 0)
+
+    def samples(self):
+        """Строки значений для экспорта."""
+        if not self._values:
+            return [f'{self.name} 0']
+        return [
+            f'{self.name}{self._labels(label)} {value}'
+            for label, value in sorted(self._values.items())
+        ]
+
+    def _labels(self, label):
+        if self.label is None:
+            return ''
+        return f'{{{self.label}="{label}"}}'
+
+
+class Gauge:
+    """Значение, которое вычисляется функцией в момент экспорта.
+
+    С меткой `label` функция возвращает словарь {значение метки: число}.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, func, label=None):
+        """Показатель, значение которого возвращает `func`."""
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.func = func
+        self.label = label
+
+    def samples(self):
+        """Строки значений для экспорта."""
+        if self.label is None:
+            return [f'{self.name} {self.func()}']
+        return [
+            f'{self.name}{{{self.label}="{label}"}} {value}'
+            for label, value in sorted(self.func().items())
+        ]
+
+
+class ComputedCounter(Gauge):
+    """Монотонный счётчик, который ведёт сам компонент.
+
+    Значение по-прежнему берётся у функции в момент экспорта, но тип
+    `counter` позволяет Prometheus учитывать сброс при перезапуске
+    в `rate()` и `increase()`.
+    """
+
+    kind = 'counter'
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        """Пустая гистограмма с границами `buckets`."""
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Учитывает одно наблюдение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self):
+        """Контекстный менеджер, замеряющий длительность блока."""
+        return Timer(self)
+
+    def count(self):
+        """Количество наблюдений."""
+        return sum(self._counts)
+
+    def samples(self):
+        """Строки значений для экспорта (накопительные корзины)."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+
+class Timer:
+    """Замер длительности блока `with` в гистограмму."""
+
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        """Замер для гистограммы `histogram`."""
+        self.histogram = histogram
+
+    def __enter__(self):
+        """Начинает замер."""
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Записывает длительность замера в гистограмму."""
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Registry:
+    """Набор метрик, который отдаётся на /metrics."""
+
+    def __init__(self):
+        """Пустой реестр."""
+        self._metrics = {}
+
+    def register(self, metric):
+        """Добавляет (или заменяет одноимённую) метрику."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name, documentation, func, label=None):
+        """Регистрирует вычисляемую метрику."""
+        return self.register(Gauge(name, documentation, func, label))
+
+    def counter(self, name, documentation, func, label=None):
+        """Регистрирует вычисляемый счётчик; имя оканчивается на _total."""
+        return self.register(
+            ComputedCounter(name, documentation, func, label)
+        )
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+PRACTICUM_LATENCY = REGISTRY.register(Histogram(
+    'practicum_request_seconds', 'Длительность запроса к API практикума.'
+))
+DECODE_LATENCY = REGISTRY.register(Histogram(
+    'json_decode_seconds', 'Длительность разбора JSON ответа API.'
+))
+TELEGRAM_LATENCY = REGISTRY.register(Histogram(
+    'telegram_send_seconds', 'Длительность отправки сообщения в Telegram.'
+))
+CYCLE_LATENCY = REGISTRY.register(Histogram(
+    'poll_cycle_seconds', 'Длительность полного цикла опроса аккаунта.'
+))
+ERRORS = REGISTRY.register(Counter(
+    'errors_total', 'Ошибки по типу исключения.', label='type'
+))
+MESSAGES_SENT = REGISTRY.register(Counter(
+    'messages_sent_total', 'Отправленные сообщения Telegram.'
+))
+CIRCUIT_TRANSITIONS = REGISTRY.register(Counter(
+    'circuit_transitions_total',
+    'Переходы автомата защиты API практикума по новому состоянию.',
+    label='state',
+))
+CIRCUIT_REJECTED = REGISTRY.register(Counter(
+    'circuit_rejected_total',
+    'Запросы к API практикума, не отправленные из-за открытой цепи.',
+))
+ERRORS_SUPPRESSED = REGISTRY.register(Counter(
+    'errors_suppressed_total',
+    'Повторные ошибки, не отправленные в чат из-за дедупликации.',
+))
+ITEM_ERRORS = REGISTRY.register(Counter(
+    'homework_item_errors_total',
+    'Работы, пропущенные из-за ошибки разбора, по типу исключения.',
+    label='type',
+))
+RELOADS = REGISTRY.register(Counter(
+    'accounts_reloads_total', 'Применённые изменения файла аккаунтов.'
+))
+RELOAD_LATENCY = REGISTRY.register(Histogram(
+    'accounts_reload_latency_seconds',
+    'Время от записи файла аккаунтов до применения изменений.',
+))
+REFETCHES = REGISTRY.register(Counter(
+    'poll_refetches_total',
+    'Опросы, после которых курсор не сдвинулся и окно запросится снова.',
+))
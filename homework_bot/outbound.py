@@ -0,0 +1,309 @@
+"""Очередь исходящих сообщений Telegram с ограничением скорости."""
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+import telegram
+
+from .metrics import ERRORS, MESSAGES_SENT, TELEGRAM_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Ограничения Telegram: около 30 сообщений в секунду на бота
+# и не чаще одного сообщения в секунду в один чат.
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+CHAT_BURST = 3
+# Ошибки, при которых повтор отправки бесполезен.
+PERMANENT_ERRORS = (
+    telegram.error.BadRequest,
+    telegram.error.ChatMigrated,
+    telegram.error.Unauthorized,
+)
+
+
+class TokenBucket:
+    """Ведро токенов: `rate` токенов в секунду, не больше `capacity`."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        """Полное ведро на `capacity` токенов."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_time(self, now):
+        """Сколько секунд ждать до появления токена."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        """Забирает один токен."""
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now):
+        """Ведро заполнено - его состояние можно не хранить."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class OutboundQueue:
+    """Неблокирующая очередь отправки с общим и початовым лимитами.
+
+    `put` только кладёт сообщение в очередь; отправляет отдельный поток.
+    Сообщения одного чата уходят по порядку, чаты с исчерпанным лимитом не
+    задерживают остальные. На `RetryAfter` отправка приостанавливается на
+    указанное Telegram время, а сообщение возвращается в начало очереди.
+    С `outbox` каждое сообщение сначала записывается на диск, а неудачные
+    отправки раз в `retry_interval` секунд повторяются пачками по
+    `retry_batch`, тогда же продлевается аренда сообщений в очереди;
+    сообщение с уже доставленным ключом `key` повторно не ставится.
+    """
+
+    def __init__(self, bot, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 chat_burst=CHAT_BURST, max_size=100_000, outbox=None,
+                 retry_interval=5, retry_batch=100):
+        """Очередь отправки через `bot`; запускается `start()`."""
+        self.bot = bot
+        self.outbox = outbox
+        self.retry_interval = retry_interval
+        self.retry_batch = retry_batch
+        self._retry_at = 0
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_size = max_size
+        self._global = TokenBucket(global_rate, global_rate, time.monotonic())
+        self._buckets = {}
+        self._chats = {}
+        self._ready = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._paused_until = 0
+        self._pending = 0
+        # Сообщение, взятое из очереди и отправляемое прямо сейчас.
+        self._sending = 0
+        self._stopping = False
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.redelivered = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def put(self, chat_id, text, key=None):
+        """Ставит сообщение в очередь, не дожидаясь отправки."""
+        if self.outbox is not None:
+            key = key or uuid.uuid4().hex
+            if not self.outbox.add(key, chat_id, text):
+                logger.debug('Сообщение %s уже доставлено или ожидает', key)
+                return
+        with self._cond:
+            full = self._pending >= self.max_size
+            if not full:
+                self._enqueue(
+                    chat_id, (text, time.monotonic(), key), left=False
+                )
+                self._cond.notify()
+        if full:
+            self.dropped += 1
+            if self.outbox is not None:
+                self.outbox.release(key)
+            logger.error('Очередь отправки переполнена, сообщение '
+                         'в чат %s отложено', chat_id)
+
+    def depth(self):
+        """Количество сообщений, ожидающих отправки."""
+        return self._pending
+
+    def stats(self):
+        """Глубина очереди, счётчики и задержка отправки в секундах."""
+        return {
+            'depth': self._pending,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'retries': self.retries,
+            'redelivered': self.redelivered,
+            'latency_avg': self.latency_total / self.sent if self.sent else 0,
+            'latency_max': self.latency_max,
+        }
+
+    def start(self):
+        """Запускает поток отправки."""
+        self._thread = threading.Thread(
+            target=self._run, name='telegram-outbound', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Отправляет оставшиеся сообщения и останавливает поток.
+
+        Возвращает количество сообщений, не отправленных за `timeout`,
+        включая отправляемое в этот момент. Пока `alive()`, поток ещё
+        может обращаться к `outbox`.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            return self._pending + self._sending
+
+    def alive(self):
+        """Работает ли поток отправки."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _enqueue(self, chat_id, item, left):
+        messages = self._chats.get(chat_id)
+        if messages is None:
+            messages = self._chats[chat_id] = deque()
+            now = time.monotonic()
+            heapq.heappush(
+                self._ready,
+                (now + self._bucket(chat_id, now).wait_time(now),
+                 next(self._counter), chat_id)
+            )
+        if left:
+            messages.appendleft(item)
+        else:
+            messages.append(item)
+        self._pending += 1
+
+    def _bucket(self, chat_id, now):
+        if chat_id not in self._buckets:
+            if len(self._buckets) > max(1000, 2 * len(self._chats)):
+                self._prune(now)
+            self._buckets[chat_id] = TokenBucket(
+                self.chat_rate, self.chat_burst, now
+            )
+        return self._buckets[chat_id]
+
+    def _prune(self, now):
+        for chat_id, bucket in list(self._buckets.items()):
+            if chat_id not in self._chats and bucket.full(now):
+                del self._buckets[chat_id]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping and not self._pending:
+                    return
+                item = self._next_item()
+            if item is not None:
+                try:
+                    self._send(*item)
+                finally:
+                    with self._cond:
+                        self._sending -= 1
+            self._maybe_redeliver()
+
+    def _maybe_redeliver(self):
+        """Раз в `retry_interval` продлевает аренду и берёт отложенные."""
+        now = time.monotonic()
+        if self.outbox is None or self._stopping or now < self._retry_at:
+            return
+        self._retry_at = now + self.retry_interval
+        self.outbox.renew()
+        free = self.max_size - self._pending
+        if free <= 0:
+            return
+        rows = self.outbox.due(min(self.retry_batch, free))
+        if not rows:
+            return
+        with self._cond:
+            for key, chat_id, text in rows:
+                self._enqueue(chat_id, (text, now, key), left=False)
+        self.redelivered += len(rows)
+        logger.info('Повторная отправка сообщений: %s', len(rows))
+
+    def _next_item(self):
+        """Следующее сообщение, которое можно отправить сейчас, или None."""
+        if not self._ready:
+            self._cond.wait(
+                None if self.outbox is None else self.retry_interval
+            )
+            return None
+
+        now = time.monotonic()
+        ready_at, _, chat_id = self._ready[0]
+        wait = max(
+            ready_at - now,
+            self._paused_until - now,
+            self._global.wait_time(now),
+        )
+        if wait > 0:
+            self._cond.wait(wait)
+            return None
+
+        heapq.heappop(self._ready)
+        bucket = self._bucket(chat_id, now)
+        bucket.take(now)
+        self._global.take(now)
+        messages = self._chats[chat_id]
+        text, enqueued, key = messages.popleft()
+        if messages:
+            heapq.heappush(
+                self._ready,
+                (now + bucket.wait_time(now), next(self._counter), chat_id)
+            )
+        else:
+            del self._chats[chat_id]
+        self._pending -= 1
+        self._sending += 1
+        return chat_id, text, enqueued, key
+
+    def _send(self, chat_id, text, enqueued, key):
+        try:
+            with TELEGRAM_LATENCY.time():
+                self.bot.send_message(chat_id=chat_id, text=text)
+        except telegram.error.RetryAfter as error:
+            ERRORS.inc(label=type(error).__name__)
+            logger.warning('Telegram просит подождать %s с', error.retry_after)
+            with self._cond:
+                self.retries += 1
+                self._paused_until = time.monotonic() + error.retry_after
+                self._enqueue(chat_id, (text, enqueued, key), left=True)
+            return
+        except Exception as error:
+            self._failed(chat_id, key, error)
+            return
+
+        if self.outbox is not None:
+            self.outbox.delivered(key)
+        latency = time.monotonic() - enqueued
+        MESSAGES_SENT.inc()
+        self.sent += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        logger.info('Сообщение в Telegram успешно отправлено')
+
+    def _failed(self, chat_id, key, error):
+        ERRORS.inc(label=type(error).__name__)
+        self.failed += 1
+        logger.error('Не удалось отправить сообщение в чат %s: %s',
+                     chat_id, error)
+        if self.outbox is None:
+            return
+        delay = self.outbox.failed(
+            key, permanent=isinstance(error, PERMANENT_ERRORS)
+        )
+        if delay is not None:
+            logger.info('Повтор отправки в чат %s через %s с', chat_id, delay)
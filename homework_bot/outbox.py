@@ -0,0 +1,314 @@
+"""Надёжная очередь уведомлений на диске с повторами отправки.
+
+Просмотр и повторная отправка из командной строки:
+    python -m homework_bot.outbox state.db list [--dead]
+    python -m homework_bot.outbox state.db replay [--dead]
+    python -m homework_bot.outbox state.db purge
+"""
+import argparse
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    chat_id NOT NULL,
+    text TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created REAL NOT NULL,
+    owner TEXT,
+    leased_until REAL NOT NULL DEFAULT 0,
+    dead INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (dead, next_attempt);
+CREATE TABLE IF NOT EXISTS delivered (
+    key TEXT PRIMARY KEY,
+    delivered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS delivered_at ON delivered (delivered_at);
+"""
+# Столбцы, которых нет в базах, созданных до появления сроков аренды.
+COLUMNS = {
+    'owner': 'owner TEXT',
+    'leased_until': 'leased_until REAL NOT NULL DEFAULT 0',
+}
+
+
+def notification_key(account_key, homework):
+    """Ключ идемпотентности уведомления о статусе работы."""
+    source = '\0'.join((
+        account_key,
+        str(homework.get('homework_name')),
+        str(homework.get('status')),
+        str(homework.get('date_updated')),
+    ))
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+class Outbox:
+    """Уведомления, записанные на диск до отправки в Telegram.
+
+    Сообщение добавляется до постановки в очередь отправки и удаляется
+    после подтверждения от Telegram, поэтому не теряется ни при ошибке
+    отправки, ни при падении процесса. Пока сообщение стоит в очереди
+    в памяти, оно «арендовано» владельцем `owner` на `lease_timeout`
+    секунд и не выдаётся повторно. Владелец продлевает аренду `renew()`;
+    аренда упавшего или перезапущенного воркера истекает, и сообщения
+    забирает `due()` любого другого процесса. `recover()` при запуске
+    снимает всю аренду сразу.
+    Неудачные отправки повторяются с экспоненциальной задержкой, после
+    `max_attempts` попыток сообщение помечается «мёртвым» и ждёт ручного
+    `replay`. Ключи доставленных
+    сообщений хранятся, чтобы повтор не отправил сообщение второй раз.
+    Размер на диске ограничен `max_pending` сообщениями и `max_delivered`
+    ключами: при переполнении вытесняются самые старые записи.
+    """
+
+    def __init__(self, path, max_pending=10_000, max_delivered=100_000,
+                 max_attempts=10, base_delay=5, max_delay=60 * 60,
+                 lease_timeout=5 * 60, owner=None, clock=time.time):
+        """Открывает или создаёт очередь в базе `path`."""
+        self.max_pending = max_pending
+        self.max_delivered = max_delivered
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_timeout = lease_timeout
+        self.owner = owner or uuid.uuid4().hex
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        self._size = self._count('SELECT COUNT(*) FROM outbox')
+        self._delivered = self._count('SELECT COUNT(*) FROM delivered')
+
+    def __len__(self):
+        """Количество сообщений на диске, включая «мёртвые»."""
+        return self._size
+
+    def add(self, key, chat_id, text):
+        """Записывает сообщение; False, если оно уже доставлено или ждёт."""
+        with self._lock, self._db:
+            if self._db.execute(
+                'SELECT 1 FROM delivered WHERE key = ?', (key,)
+            ).fetchone():
+                return False
+            now = self.clock()
+            added = self._db.execute(
+                'INSERT OR IGNORE INTO outbox (key, chat_id, text, '
+                'next_attempt, created, owner, leased_until) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, chat_id, text, now, now, self.owner,
+                 now + self.lease_timeout),
+            ).rowcount
+            self._size += added
+            if self._size > self.max_pending:
+                self._evict(self._size - self.max_pending)
+        return bool(added)
+
+    def recover(self):
+        """Снимает аренду, оставшуюся от прошлого запуска.
+
+        Вызывается при запуске до начала отправки, в том числе до запуска
+        воркеров, чтобы не ждать истечения аренды. Возвращает количество
+        сообщений к повторной отправке.
+        """
+        with self._lock, self._db:
+            return self._db.execute(
+                'UPDATE outbox SET leased_until = 0 '
+                'WHERE leased_until > 0 AND dead = 0'
+            ).rowcount
+
+    def renew(self):
+        """Продлевает аренду сообщений этого владельца; их количество."""
+        with self._lock, self._db:
+            return self._db.execute(
+                'UPDATE outbox SET leased_until = ? '
+                'WHERE owner = ? AND leased_until > 0',
+                (self.clock() + self.lease_timeout, self.owner),
+            ).rowcount
+
+    def release(self, key):
+        """Возвращает сообщение, не попавшее в очередь, к повторам."""
+        with self._lock, self._db:
+            self._db.execute(
+                'UPDATE outbox SET leased_until = 0 WHERE key = ?', (key,)
+            )
+
+    def delivered(self, key):
+        """Отмечает сообщение доставленным."""
+        with self._lock, self._db:
+            self._size -= self._db.execute(
+                'DELETE FROM outbox WHERE key = ?', (key,)
+            ).rowcount
+            self._delivered += self._db.execute(
+                'INSERT OR IGNORE INTO delivered VALUES (?, ?)',
+                (key, self.clock()),
+            ).rowcount
+            if self._delivered > self.max_delivered * 1.1:
+                self._delivered -= self._db.execute(
+                    'DELETE FROM delivered WHERE key IN (SELECT key '
+                    'FROM delivered ORDER BY delivered_at LIMIT ?)',
+                    (self._delivered - self.max_delivered,),
+                ).rowcount
+
+    def failed(self, key, permanent=False):
+        """Неудачная попытка: откладывает повтор или хоронит сообщение.
+
+        Возвращает задержку до следующей попытки или None.
+        """
+        with self._lock, self._db:
+            row = self._db.execute(
+                'SELECT attempts FROM outbox WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = row[0] + 1
+            if permanent or attempts >= self.max_attempts:
+                self._db.execute(
+                    'UPDATE outbox SET attempts = ?, leased_until = 0, '
+                    'dead = 1 '
+                    'WHERE key = ?',
+                    (attempts, key),
+                )
+                logger.error('Сообщение %s не доставлено после %s попыток',
+                             key, attempts)
+                return None
+            delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+            self._db.execute(
+                'UPDATE outbox SET attempts = ?, next_attempt = ?, '
+                'leased_until = 0 WHERE key = ?',
+                (attempts, self.clock() + delay, key),
+            )
+        return delay
+
+    def due(self, limit):
+        """Арендует до `limit` сообщений для повтора: (ключ, чат, текст).
+
+        Выдаются свободные сообщения и сообщения с истёкшей арендой.
+        """
+        with self._lock, self._db:
+            # Воркеры делят один файл: выборка и аренда в одной
+            # транзакции с блокировкой на запись.
+            self._db.execute('BEGIN IMMEDIATE')
+            now = self.clock()
+            rows = self._db.execute(
+                'SELECT key, chat_id, text FROM outbox '
+                'WHERE dead = 0 AND next_attempt <= ? AND leased_until <= ? '
+                'ORDER BY next_attempt LIMIT ?',
+                (now, now, limit),
+            ).fetchall()
+            self._db.executemany(
+                'UPDATE outbox SET owner = ?, leased_until = ? WHERE key = ?',
+                (
+                    (self.owner, now + self.lease_timeout, row[0])
+                    for row in rows
+                ),
+            )
+        return rows
+
+    def stats(self):
+        """Количество ожидающих и «мёртвых» сообщений."""
+        with self._lock:
+            dead = self._db.execute(
+                'SELECT COUNT(*) FROM outbox WHERE dead = 1'
+            ).fetchone()[0]
+        return {'pending': self._size - dead, 'dead': dead}
+
+    def rows(self, dead=False):
+        """Сообщения для просмотра: (ключ, чат, попытки, срок, текст)."""
+        with self._lock:
+            return self._db.execute(
+                'SELECT key, chat_id, attempts, next_attempt, text '
+                'FROM outbox WHERE dead = ? ORDER BY created',
+                (int(dead),),
+            ).fetchall()
+
+    def replay(self, dead=False):
+        """Назначает повтор ожидающих (или «мёртвых») сообщений сейчас."""
+        with self._lock, self._db:
+            return self._db.execute(
+                'UPDATE outbox SET attempts = 0, next_attempt = 0, dead = 0 '
+                'WHERE dead = ? AND leased_until <= ?',
+                (int(dead), self.clock()),
+            ).rowcount
+
+    def purge(self):
+        """Удаляет «мёртвые» сообщения."""
+        with self._lock, self._db:
+            removed = self._db.execute(
+                'DELETE FROM outbox WHERE dead = 1'
+            ).rowcount
+            self._size -= removed
+        return removed
+
+    def close(self):
+        """Закрывает базу."""
+        self._db.close()
+
+    def _migrate(self):
+        """Добавляет столбцы аренды в базу, созданную прежней версией."""
+        columns = {
+            row[1] for row in self._db.execute('PRAGMA table_info(outbox)')
+        }
+        with self._db:
+            for name, definition in COLUMNS.items():
+                if name not in columns:
+                    self._db.execute(
+                        f'ALTER TABLE outbox ADD COLUMN {definition}'
+                    )
+
+    def _count(self, query):
+        return self._db.execute(query).fetchone()[0]
+
+    def _evict(self, count):
+        """Удаляет `count` самых старых сообщений, сначала «мёртвые»."""
+        removed = self._db.execute(
+            'DELETE FROM outbox WHERE key IN (SELECT key FROM outbox '
+            'ORDER BY dead DESC, created LIMIT ?)',
+            (count,),
+        ).rowcount
+        self._size -= removed
+        logger.error('Очередь уведомлений переполнена, удалено: %s', removed)
+
+
+def main(argv=None):
+    """Просмотр, повтор и очистка очереди уведомлений."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('db', help='файл STATE_DB')
+    parser.add_argument('command', choices=('list', 'replay', 'purge'))
+    parser.add_argument('--dead', action='store_true',
+                        help='«мёртвые» сообщения вместо ожидающих')
+    args = parser.parse_args(argv)
+
+    outbox = Outbox(args.db)
+    try:
+        if args.command == 'list':
+            for key, chat_id, attempts, next_attempt, text in outbox.rows(
+                args.dead
+            ):
+                when = time.strftime(
+                    '%Y-%m-%d %H:%M:%S', time.localtime(next_attempt)
+                )
+                print(f'{key} chat={chat_id} attempts={attempts} '
+                      f'next={when} {text!r}')
+        elif args.command == 'replay':
+            print(f'Назначено к отправке: {outbox.replay(args.dead)}')
+        else:
+            print(f'Удалено: {outbox.purge()}')
+    finally:
+        outbox.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Цикл опроса одного аккаунта."""
+import logging
+import time
+
+from .accounts import intern_status
+from .breaker import CircuitOpenError
+from .metrics import ERRORS, ITEM_ERRORS, REFETCHES
+from .outbox import notification_key
+from .scheduler import CHANGED, ERROR, IDLE, SUSPENDED
+
+logger = logging.getLogger(__name__)
+
+
+class Poller:
+    """Запрос к API, проверка ответа и уведомления для одного аккаунта.
+
+    Логика запроса, проверки и разбора передаётся функциями из `homework`,
+    чтобы движок переиспользовал их без изменений. Если тело ответа не
+    изменилось с прошлого опроса, разбор и проверка пропускаются.
+    Первичная загрузка всей истории (`from_date == 0`) читается потоково
+    через `stream`, чтобы не держать весь ответ в памяти. Пока цепь
+    к API разомкнута, опрос откладывается без уведомления пользователя.
+    Уведомления об ошибках проходят через дедупликатор `errors`.
+    """
+
+    def __init__(self, fetch, stream, decode, check, parse, notify, store,
+                 index, cache, homework_cache, errors, retry_time):
+        """Цикл опроса из переданных функций и хранилищ."""
+        self.fetch = fetch
+        self.stream = stream
+        self.decode = decode
+        self.check = check
+        self.parse = parse
+        self.notify = notify
+        self.store = store
+        self.index = index
+        self.cache = cache
+        self.homework_cache = homework_cache
+        self.errors = errors
+        self.retry_time = retry_time
+
+    def __call__(self, account):
+        """Один цикл опроса аккаунта; возвращает его результат."""
+        try:
+            if account.from_date == 0:
+                outcome, current_date = self.backfill(account)
+            else:
+                outcome, current_date = self.poll(account)
+
+        except CircuitOpenError:
+            return SUSPENDED
+
+        except Exception as error:
+            logger.error(error)
+            ERRORS.inc(label=type(error).__name__)
+            # Курсор не сдвинулся: следующий опрос запросит то же окно.
+            REFETCHES.inc()
+            message = self.errors.report(account.key, error)
+            if message is not None:
+                self.notify(account.chat_id, message)
+            return ERROR
+
+        account.from_date = current_date or int(time.time() - self.retry_time)
+        self.store.save_cursor(account.key, account.from_date)
+        for message in self.errors.resolved(account.key):
+            self.notify(account.chat_id, message)
+        return outcome
+
+    def poll(self, account):
+        """Обычный опрос с проверкой отпечатка ответа."""
+        body = self.fetch(account.token, account.from_date)
+        digest = self.cache.fingerprint(body)
+        if self.cache.hit(account, digest):
+            return IDLE, self.cache.current_date(body)
+
+        response = self.decode(body)
+        outcome = self.process(account, self.check(response))
+        account.fingerprint = digest
+        return outcome, response.get('current_date')
+
+    def backfill(self, account):
+        """Загрузка всей истории с потоковым разбором работ."""
+        homeworks = self.stream(account.token, account.from_date)
+        outcome = self.process(account, homeworks)
+        return outcome, homeworks.current_date
+
+    def process(self, account, homeworks):
+        """Отправляет уведомления об изменившихся работах.
+
+        Работы разбираются за один проход; ошибка в одной работе
+        не мешает остальным и не задерживает курсор, иначе тот же ответ
+        запрашивался бы снова и снова.
+        """
+        outcome = IDLE
+        failures = []
+        for position, work in enumerate(homeworks):
+            try:
+                if self.process_item(account, work, position):
+                    outcome = CHANGED
+            except Exception as error:
+                failures.append(error)
+        if failures:
+            self.report_failures(account, failures)
+        return outcome
+
+    def process_item(self, account, work, position):
+        """Уведомление об одной работе; True, если её статус изменился."""
+        message = self.parse(work)
+        if position == 0:
+            account.status = intern_status(work['status'])
+        if not self.index.changed(account.key, work):
+            return False
+        self.notify(
+            account.chat_id, message,
+            key=notification_key(account.key, work),
+        )
+        self.index.update(account.key, work)
+        self.homework_cache.update(account, work)
+        return True
+
+    def report_failures(self, account, failures):
+        """Учитывает работы, которые не удалось разобрать."""
+        logger.error('Не удалось обработать работ: %s, первая ошибка: %s',
+                     len(failures), failures[0])
+        for error in failures:
+            ITEM_ERRORS.inc(label=type(error).__name__)
+            message = self.errors.report(account.key, error)
+            if message is not None:
+                self.notify(account.chat_id, message)
@@ -0,0 +1,162 @@
+"""Профилирование циклов опроса, включаемое без перезапуска."""
+import collections
+import glob
+import logging
+import os
+import signal
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SIGNAL = signal.SIGUSR1
+PROFILE_SUFFIX = '.prof'
+SNAPSHOT_SUFFIX = '.tracemalloc'
+
+
+class Profiler:
+    """Профили cProfile и снимки tracemalloc для движка опроса.
+
+    Пока профилирование выключено, движок вызывает опрос напрямую:
+    `enable()` подменяет `engine.poll` обёрткой, а `disable()` возвращает
+    исходную функцию, поэтому выключенный профилировщик ничего не стоит.
+    Во включённом состоянии профилируется не больше одного цикла
+    одновременно - выборка из параллельных опросов, - и профиль каждого
+    выбранного цикла сохраняется в `directory`. Раз в `snapshot_interval`
+    секунд туда же пишется снимок памяти tracemalloc. Каждого вида файлов
+    хранится не больше `keep`, старые удаляются.
+    """
+
+    def __init__(self, engine, directory, keep=100, snapshot_interval=60,
+                 frames=10, clock=time.monotonic):
+        """Выключенный профилировщик движка `engine`."""
+        self.engine = engine
+        self.directory = directory
+        self.keep = keep
+        self.snapshot_interval = snapshot_interval
+        self.frames = frames
+        self.clock = clock
+        self.enabled = False
+        self.profiles = 0
+        self.snapshots = 0
+        self._poll = None
+        self._started_tracing = False
+        self._next_snapshot = None
+        self._sampling = threading.Lock()
+        self._lock = threading.Lock()
+        self._files = {}
+
+    def install(self, signum=SIGNAL):
+        """Переключение по сигналу; вызывать из главного потока."""
+        signal.signal(signum, lambda signum, frame: self.toggle())
+
+    def toggle(self):
+        """Включает или выключает профилирование; возвращает состояние."""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def enable(self):
+        """Начинает профилировать циклы опроса."""
+        import tracemalloc
+
+        if self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(self.frames)
+        self._next_snapshot = self.clock() + self.snapshot_interval
+        self._poll = self.engine.poll
+        self.engine.poll = self._profiled
+        self.enabled = True
+        logger.info('Профилирование включено, файлы в %s', self.directory)
+
+    def disable(self):
+        """Прекращает профилирование и снимает итоговый снимок памяти."""
+        import tracemalloc
+
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.engine.poll = self._poll
+        self.snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+        logger.info('Профилирование выключено: профилей %s, снимков %s',
+                    self.profiles, self.snapshots)
+
+    def snapshot(self):
+        """Сохраняет снимок памяти tracemalloc."""
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            return
+        self._next_snapshot = self.clock() + self.snapshot_interval
+        path = self._path('snapshot', SNAPSHOT_SUFFIX)
+        try:
+            tracemalloc.take_snapshot().dump(path)
+        except OSError as error:
+            logger.error('Не удалось сохранить снимок памяти: %s', error)
+            return
+        self._retain(SNAPSHOT_SUFFIX, path)
+        self.snapshots += 1
+
+    def state(self):
+        """Состояние для управляющей команды."""
+        return {'enabled': self.enabled, 'directory': self.directory,
+                'profiles': self.profiles, 'snapshots': self.snapshots}
+
+    def _profiled(self, account):
+        """Опрос, профилируемый, если сейчас не профилируется другой."""
+        import cProfile
+
+        poll = self._poll
+        if not self._sampling.acquire(blocking=False):
+            return poll(account)
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return poll(account)
+            finally:
+                profile.disable()
+                self._dump(profile, account)
+        finally:
+            self._sampling.release()
+
+    def _dump(self, profile, account):
+        path = self._path(f'cycle-{account.key[:8]}', PROFILE_SUFFIX)
+        try:
+            profile.dump_stats(path)
+        except OSError as error:
+            logger.error('Не удалось сохранить профиль: %s', error)
+            return
+        self._retain(PROFILE_SUFFIX, path)
+        self.profiles += 1
+        if self.clock() >= self._next_snapshot:
+            self.snapshot()
+
+    def _path(self, name, suffix):
+        return os.path.join(
+            self.directory, f'{time.time_ns()}-{name}{suffix}'
+        )
+
+    def _retain(self, suffix, path):
+        """Запоминает файл и удаляет лишние старые файлы того же вида."""
+        with self._lock:
+            files = self._files.get(suffix)
+            if files is None:
+                files = self._files[suffix] = collections.deque(sorted(
+                    glob.glob(os.path.join(self.directory, f'*{suffix}'))
+                ))
+            else:
+                files.append(path)
+            while len(files) > self.keep:
+                oldest = files.popleft()
+                try:
+                    os.remove(oldest)
+                except FileNotFoundError:
+                    pass
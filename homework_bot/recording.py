@@ -0,0 +1,329 @@
+"""Запись и воспроизведение обмена с API практикума и Telegram.
+
+Запись - сжатый gzip файл, по строке JSON на событие:
+    ["c", t, аккаунт, chat_id]                  аккаунт в записи
+    ["a", t, аккаунт, from_date, код, тело]     ответ API практикума
+    ["t", t, chat_id, текст]                    сообщение в Telegram
+`t` - секунды от начала записи, аккаунт - `Account.key`, а не токен.
+"""
+import codecs
+import gzip
+import json
+import tempfile
+import threading
+import time
+
+from .accounts import Account
+
+ACCOUNT = 'c'
+ANSWER = 'a'
+MESSAGE = 't'
+EMPTY_ANSWER = '{"homeworks": [], "current_date": 0}'
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def token_from_headers(headers):
+    """Токен из заголовка Authorization: OAuth <токен>."""
+    return headers['Authorization'].split(' ', 1)[-1]
+
+
+def response_body(response):
+    """Тело ответа; у тестовых ответов без `content` - из `json()`."""
+    content = getattr(response, 'content', None)
+    if content is None:
+        return json.dumps(response.json(), ensure_ascii=False)
+    if isinstance(content, bytes):
+        return content.decode('utf-8', errors='replace')
+    return content
+
+
+class Recorder:
+    """Потокобезопасная запись событий в файл."""
+
+    def __init__(self, path, clock=time.monotonic):
+        """Открывает файл записи `path`."""
+        self.clock = clock
+        self.started = clock()
+        self.events = 0
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def offset(self):
+        """Секунды от начала записи."""
+        return round(self.clock() - self.started, 6)
+
+    def write(self, kind, *fields):
+        """Записывает событие с текущим смещением по времени."""
+        line = self._dumps([kind, self.offset(), *fields])
+        with self._lock:
+            self._file.write(line + '\n')
+            self.events += 1
+
+    def write_stream(self, kind, offset, fields, body):
+        """Записывает событие, последнее поле которого читается из `body`.
+
+        `body` - двоичный файл с телом ответа; оно переносится в запись
+        частями и целиком в памяти не держится.
+        """
+        head = self._dumps([kind, offset, *fields])[:-1] + ',"'
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        with self._lock:
+            self._file.write(head)
+            while True:
+                chunk = body.read(COPY_CHUNK_SIZE)
+                self._file.write(
+                    self._dumps(decoder.decode(chunk, final=not chunk))[1:-1]
+                )
+                if not chunk:
+                    break
+            self._file.write('"]\n')
+            self.events += 1
+
+    @staticmethod
+    def _dumps(value):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+    def accounts(self, accounts):
+        """Записывает аккаунты, чтобы при воспроизведении знать их чаты."""
+        for account in accounts:
+            self.write(ACCOUNT, account.key, account.chat_id)
+
+    def close(self):
+        """Дописывает и закрывает файл."""
+        with self._lock:
+            self._file.close()
+
+
+class RecordingClient:
+    """HTTP-клиент, записывающий ответы API практикума.
+
+    Оборачивает `HttpClient`, модуль `requests` или тестовый
+    `requests.get`; остальные атрибуты берутся у обёрнутого клиента.
+    """
+
+    def __init__(self, client, recorder):
+        """Обёртка над клиентом `client`."""
+        self.client = client
+        self.recorder = recorder
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """GET-запрос с записью ответа.
+
+        Потоковый ответ записывается по мере чтения (см. `RecordedStream`).
+        """
+        response = self.client.get(
+            url=url, headers=headers, params=params, **kwargs
+        )
+        fields = (
+            Account(token_from_headers(headers), None).key,
+            (params or {}).get('from_date'),
+            response.status_code,
+        )
+        if kwargs.get('stream'):
+            return RecordedStream(response, self.recorder, fields)
+        self.recorder.write(ANSWER, *fields, response_body(response))
+        return response
+
+    def __getattr__(self, name):
+        """Остальные атрибуты берутся у клиента."""
+        return getattr(self.client, name)
+
+
+class RecordedStream:
+    """Потоковый ответ, тело которого записывается по мере чтения.
+
+    Прочитанные части копируются во временный файл и переносятся в запись,
+    когда ответ дочитан или закрыт, поэтому в памяти тело не копится.
+    Остальные атрибуты берутся у ответа.
+    """
+
+    def __init__(self, response, recorder, fields):
+        """Обёртка над ответом `response` с полями события `fields`."""
+        self.response = response
+        self.recorder = recorder
+        self.fields = fields
+        self.offset = recorder.offset()
+        self._body = tempfile.TemporaryFile()
+        self._recorded = False
+
+    def iter_content(self, chunk_size):
+        """Тело ответа частями, с копированием в запись."""
+        for chunk in self.response.iter_content(chunk_size):
+            self._body.write(chunk)
+            yield chunk
+        self._record()
+
+    def close(self):
+        """Записывает прочитанное тело и закрывает ответ."""
+        try:
+            self._record()
+        finally:
+            self.response.close()
+
+    def _record(self):
+        if self._recorded:
+            return
+        self._recorded = True
+        with self._body:
+            self._body.seek(0)
+            self.recorder.write_stream(
+                ANSWER, self.offset, self.fields, self._body
+            )
+
+    def __getattr__(self, name):
+        """Остальные атрибуты берутся у ответа."""
+        return getattr(self.response, name)
+
+
+class RecordingBot:
+    """Бот Telegram, записывающий отправленные сообщения."""
+
+    def __init__(self, bot, recorder):
+        """Обёртка над ботом `bot`."""
+        self.bot = bot
+        self.recorder = recorder
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Записывает вызов и отправляет сообщение."""
+        self.recorder.write(MESSAGE, chat_id, text)
+        return self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+
+    def __getattr__(self, name):
+        """Остальные атрибуты берутся у бота."""
+        return getattr(self.bot, name)
+
+
+def read_recording(path):
+    """События записи по порядку."""
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            yield json.loads(line)
+
+
+class ReplayResponse:
+    """Записанный ответ API с интерфейсом `requests.Response`."""
+
+    def __init__(self, status_code, body):
+        """Ответ с кодом `status_code` и телом `body`."""
+        self.status_code = status_code
+        self.content = body.encode()
+
+    def json(self):
+        """Тело ответа, разобранное из JSON."""
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size):
+        """Тело ответа частями по `chunk_size` байт."""
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        """Закрывать нечего: тело ответа уже в памяти."""
+
+
+class ReplayClient:
+    """Локальная замена API практикума, отдающая записанные ответы.
+
+    Ответы выдаются по очереди для каждого аккаунта; токеном аккаунта
+    при воспроизведении служит его ключ из записи.
+    """
+
+    def __init__(self):
+        """Клиент без записанных ответов."""
+        self.answers = {}
+        self.requests = 0
+
+    def push(self, key, status_code, body):
+        """Ставит ответ в очередь аккаунта."""
+        self.answers.setdefault(key, []).append(
+            ReplayResponse(status_code, body)
+        )
+
+    def get(self, url=None, headers=None, params=None, **kwargs):
+        """Следующий записанный ответ аккаунта или пустой ответ."""
+        self.requests += 1
+        answers = self.answers.get(token_from_headers(headers))
+        if not answers:
+            return ReplayResponse(200, EMPTY_ANSWER)
+        return answers.pop(0)
+
+    def stats(self):
+        """Статистика в том же формате, что у HttpClient."""
+        return {'requests': self.requests, 'new_connections': 0,
+                'reused_connections': self.requests}
+
+
+class ReplayBot:
+    """Локальная замена Telegram: собирает отправленные сообщения."""
+
+    def __init__(self):
+        """Бот без отправленных сообщений."""
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Запоминает сообщение вместо отправки."""
+        with self._lock:
+            self.sent.append((chat_id, text))
+
+
+class Replayer:
+    """Воспроизводит запись через `poll(account)` в масштабе `speed`.
+
+    Каждый записанный ответ API ставится в `client`, после чего
+    аккаунт опрашивается в тот же момент записи, ускоренный в `speed`
+    раз; `speed=0` - без пауз, для замера пропускной способности.
+    """
+
+    def __init__(self, events, client, poll, speed=1,
+                 clock=time.monotonic, sleep=time.sleep):
+        """Воспроизведение событий `events` через `poll`."""
+        self.events = events
+        self.client = client
+        self.poll = poll
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        self.accounts = {}
+        self.recorded_messages = []
+
+    def run(self):
+        """Воспроизводит запись; возвращает статистику."""
+        started = self.clock()
+        polls = 0
+        for kind, offset, *fields in self.events:
+            if kind == ACCOUNT:
+                key, chat_id = fields
+                self.accounts[key] = Account(key, chat_id)
+            elif kind == MESSAGE:
+                self.recorded_messages.append(tuple(fields))
+            elif kind == ANSWER:
+                self._wait(started, offset)
+                key, from_date, status_code, body = fields
+                account = self.account(key, from_date)
+                self.client.push(account.token, status_code, body)
+                self.poll(account)
+                polls += 1
+        elapsed = self.clock() - started
+        return {
+            'polls': polls,
+            'elapsed': elapsed,
+            'polls_per_second': polls / elapsed if elapsed else 0,
+            'recorded_messages': len(self.recorded_messages),
+        }
+
+    def account(self, key, from_date):
+        """Аккаунт записи; неизвестные добавляются без чата."""
+        account = self.accounts.get(key)
+        if account is None:
+            account = self.accounts[key] = Account(key, None)
+        if account.from_date is None:
+            account.from_date = from_date
+        return account
+
+    def _wait(self, started, offset):
+        if not self.speed:
+            return
+        delay = started + offset / self.speed - self.clock()
+        if delay > 0:
+            self.sleep(delay)
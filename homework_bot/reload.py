@@ -0,0 +1,123 @@
+"""Перечитывание файла аккаунтов без перезапуска бота."""
+import logging
+import os
+import threading
+import time
+
+from .accounts import load_accounts
+from .metrics import RELOAD_LATENCY, RELOADS
+
+logger = logging.getLogger(__name__)
+
+
+def diff_accounts(current, loaded):
+    """Изменения относительно `current` ({ключ: аккаунт}).
+
+    Возвращает (добавленные, удалённые, изменённые); изменённые - пары
+    (текущий аккаунт, новый чат из файла). Аккаунт
+    определяется токеном, поэтому новый токен - это удаление и добавление.
+    """
+    loaded = {account.key: account for account in loaded}
+    added = [
+        account for key, account in loaded.items() if key not in current
+    ]
+    removed = [
+        account for key, account in current.items() if key not in loaded
+    ]
+    updated = [
+        (current[key], account.chat_id) for key, account in loaded.items()
+        if key in current and current[key].chat_id != account.chat_id
+    ]
+    return added, removed, updated
+
+
+class AccountsWatcher:
+    """Следит за файлом аккаунтов и применяет изменения на лету.
+
+    Файл проверяется раз в `interval` секунд по времени изменения, размеру
+    и inode, поэтому замечается и запись на месте, и атомарная подмена
+    через rename. Изменения передаются в `apply(added, removed, updated)`
+    разницей со списком прошлой загрузки: аккаунты, которых правка не
+    коснулась, остаются теми же объектами со своими курсорами и опросами.
+    Новый чат записывается в сам аккаунт, а `updated` - пары (аккаунт,
+    прежний чат). К вызову `apply` `accounts` уже содержит новый список.
+    Файл с ошибкой не применяется, и бот работает со старым списком.
+    Задержка от записи файла до применения попадает в гистограмму
+    `accounts_reload_latency_seconds`.
+    """
+
+    def __init__(self, path, accounts, apply, interval=1, clock=time.time):
+        """Наблюдатель за `path` со списком `accounts`."""
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self.clock = clock
+        self.accounts = {account.key: account for account in accounts}
+        self._signature = self._stat()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запускает проверку файла в фоновом потоке."""
+        self._thread = threading.Thread(
+            target=self._run, name='accounts-watcher', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает проверку файла."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self):
+        """Перечитывает файл, если он изменился; True, если были правки."""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            loaded = load_accounts(self.path)
+        except (OSError, ValueError, TypeError, KeyError) as error:
+            logger.error('Файл аккаунтов не применён: %s', error)
+            return False
+
+        added, removed, changed = diff_accounts(self.accounts, loaded)
+        if not (added or removed or changed):
+            return False
+        for account in removed:
+            del self.accounts[account.key]
+        for account in added:
+            self.accounts[account.key] = account
+        updated = []
+        for account, chat_id in changed:
+            updated.append((account, account.chat_id))
+            account.chat_id = chat_id
+        self.apply(added, removed, updated)
+
+        RELOADS.inc()
+        latency = None
+        if signature is not None:
+            latency = max(self.clock() - signature[0] / 1e9, 0)
+            RELOAD_LATENCY.observe(latency)
+        logger.info(
+            'Аккаунты перечитаны: добавлено %s, удалено %s, изменено %s, '
+            'задержка %s с', len(added), len(removed), len(updated),
+            latency if latency is None else round(latency, 3),
+        )
+        return True
+
+    def _stat(self):
+        """Отпечаток файла: (mtime в нс, размер, inode) или None."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as error:
+                logger.error('Ошибка применения файла аккаунтов: %s', error)
@@ -0,0 +1,79 @@
+"""Политики выбора интервала между опросами аккаунта."""
+import random
+
+CHANGED = 'changed'
+IDLE = 'idle'
+ERROR = 'error'
+# Опрос не выполнен из-за разомкнутой цепи; интервал не меняется.
+SUSPENDED = 'suspended'
+
+
+class FixedPolicy:
+    """Опрос с постоянным интервалом, как в исходном `time.sleep`."""
+
+    def __init__(self, interval, rng=None):
+        """Политика с базовым интервалом `interval`."""
+        self.interval = interval
+        self.rng = rng or random.Random()
+
+    def initial_delay(self, position, total):
+        """Задержка первого опроса: аккаунты равномерно по интервалу."""
+        return self.interval * position / total
+
+    def next_delay(self, account, outcome):
+        """Задержка до следующего опроса после результата `outcome`."""
+        return self.interval
+
+
+class AdaptivePolicy(FixedPolicy):
+    """Интервал зависит от состояния аккаунта.
+
+    - работа на ревью: опрос раз в `reviewing_interval`;
+    - ошибки: экспоненциальная задержка от `backoff_base` до `backoff_max`;
+    - после `idle_after` опросов без изменений: раз в `idle_interval`.
+
+    Ко всем задержкам добавляется случайный разброс `jitter`, чтобы опросы
+    аккаунтов не собирались в пачки.
+    """
+
+    def __init__(self, interval, reviewing_interval=None, idle_interval=None,
+                 idle_after=6, backoff_base=60, backoff_max=3600,
+                 jitter=0.1, rng=None):
+        """Интервалы по умолчанию выводятся из `interval`."""
+        super().__init__(interval, rng)
+        self.reviewing_interval = reviewing_interval or interval / 5
+        self.idle_interval = idle_interval or interval * 3
+        self.idle_after = idle_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+
+    def next_delay(self, account, outcome):
+        """Задержка до следующего опроса после результата `outcome`."""
+        if outcome == ERROR:
+            account.failures += 1
+            delay = min(
+                self.backoff_max,
+                self.backoff_base * 2 ** (account.failures - 1)
+            )
+            return self.rng.uniform(delay / 2, delay)
+
+        account.failures = 0
+        if outcome == CHANGED:
+            account.idle = 0
+        else:
+            account.idle += 1
+
+        if account.status == 'reviewing':
+            delay = self.reviewing_interval
+        elif account.idle >= self.idle_after:
+            delay = self.idle_interval
+        else:
+            delay = self.interval
+        return delay * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+POLICIES = {
+    'fixed': FixedPolicy,
+    'adaptive': AdaptivePolicy,
+}
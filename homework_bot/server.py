@@ -0,0 +1,83 @@
+"""Встроенный HTTP-сервер для служебных эндпоинтов."""
+import logging
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddedServer:
+    """HTTP-сервер в фоновом потоке с маршрутами (метод, путь) -> функция.
+
+    Функция маршрута получает тело запроса и возвращает кортеж
+    (код ответа, Content-Type, тело ответа в байтах).
+    """
+
+    def __init__(self, host='0.0.0.0', port=0):
+        """Сервер без маршрутов; запускается `start()`."""
+        self.routes = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        """Порт, на котором слушает сервер."""
+        return self.httpd.server_port
+
+    def alive(self):
+        """Работает ли поток сервера."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def route(self, method, path, func):
+        """Регистрирует обработчик для метода и пути."""
+        self.routes[(method, path)] = func
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name='embedded-server',
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info('HTTP-сервер слушает порт %s', self.port)
+
+    def stop(self):
+        """Останавливает сервер."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                self._dispatch('GET')
+
+            def do_POST(self):  # noqa: N802
+                self._dispatch('POST')
+
+            def _dispatch(self, method):
+                func = server.routes.get((method, self.path.split('?')[0]))
+                if func is None:
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                try:
+                    status, content_type, payload = func(body)
+                except Exception as error:
+                    logger.error('Ошибка обработки %s: %s', self.path, error)
+                    self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR)
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        return Handler
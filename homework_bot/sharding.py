@@ -0,0 +1,387 @@
+"""Распределение аккаунтов по процессам-воркерам."""
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REPLICAS = 100
+# Перезапуск упавшего воркера: пауза удваивается с каждым падением вскоре
+# после запуска, а после CRASH_LOOP таких падений подряд пишется ошибка.
+RESTART_DELAY = 1
+MAX_RESTART_DELAY = 300
+CRASH_LOOP = 5
+
+
+class HashRing:
+    """Консистентное хэширование ключей по узлам.
+
+    У каждого узла `replicas` точек на кольце, поэтому при добавлении или
+    удалении узла переезжает примерно 1/N ключей.
+    """
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        """Кольцо с узлами `nodes`."""
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        self.nodes = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def add(self, node):
+        """Добавляет узел на кольцо."""
+        for replica in range(self.replicas):
+            point = self._hash(f'{node}#{replica}')
+            bisect.insort(self._points, point)
+            self._owners[point] = node
+        self.nodes.append(node)
+
+    def remove(self, node):
+        """Убирает узел с кольца."""
+        for replica in range(self.replicas):
+            point = self._hash(f'{node}#{replica}')
+            self._points.remove(point)
+            del self._owners[point]
+        self.nodes.remove(node)
+
+    def node_for(self, key):
+        """Узел, которому принадлежит ключ."""
+        index = bisect.bisect(self._points, self._hash(key))
+        return self._owners[self._points[index % len(self._points)]]
+
+    def assign(self, items, key=str):
+        """Раскладывает элементы по узлам: {узел: [элементы]}."""
+        shards = {node: [] for node in self.nodes}
+        for item in items:
+            shards[self.node_for(key(item))].append(item)
+        return shards
+
+
+def report_status(worker_id, reports, interval, status):
+    """Фоновый поток воркера: сразу и раз в `interval` отправляет отчёт.
+
+    `status()` возвращает словарь показателей воркера; по числу опросов
+    `polls` главный процесс считает его скорость.
+    """
+    def run():
+        while True:
+            try:
+                reports.put((worker_id, status(), time.monotonic()))
+            except Exception as error:
+                logger.error('Ошибка отчёта воркера: %s', error)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name='worker-report', daemon=True).start()
+
+
+def receive_changes(control, engine, apply):
+    """Фоновый поток воркера: применяет изменения его доли аккаунтов.
+
+    Главный процесс присылает в `control` тройки (новые аккаунты, ключи
+    убранных, пары (ключ, новый чат)). Они переводятся в аккаунты движка
+    и передаются в `apply(added, removed, updated)` так же, как изменения
+    от `AccountsWatcher`: новый чат записывается в аккаунт, а `updated` -
+    пары (аккаунт, прежний чат).
+    """
+    def run():
+        while True:
+            added, removed, updated = control.get()
+            try:
+                current = {account.key: account
+                           for account in engine.accounts()}
+                changed = []
+                for key, chat_id in updated:
+                    account = current.get(key)
+                    if account is not None:
+                        changed.append((account, account.chat_id))
+                        account.chat_id = chat_id
+                apply(
+                    added,
+                    [current[key] for key in removed if key in current],
+                    changed,
+                )
+            except Exception as error:
+                logger.error('Ошибка применения изменений аккаунтов: %s',
+                             error)
+
+    threading.Thread(target=run, name='account-changes', daemon=True).start()
+
+
+class Supervisor:
+    """Запускает воркеры, раздаёт им аккаунты и следит за их работой.
+
+    `target(worker_id, accounts, reports, control)` выполняется в отдельном
+    процессе и опрашивает переданную ему долю аккаунтов. Изменения доли
+    приходят воркеру в очередь `control` (см. `receive_changes`), поэтому
+    при перечитывании аккаунтов и смене числа воркеров работающие воркеры
+    не перезапускаются. Воркер, не остановившийся за `stop_timeout`
+    секунд, завершается принудительно. Упавший воркер перезапускается
+    через `restart_delay` секунд; если он снова падает, не проработав
+    `max_restart_delay` секунд, пауза удваивается до `max_restart_delay`.
+    """
+
+    def __init__(self, accounts, workers, target, report_interval=60,
+                 stop_timeout=10, restart_delay=RESTART_DELAY,
+                 max_restart_delay=MAX_RESTART_DELAY):
+        """Распределение `accounts` по `workers` воркерам."""
+        self.accounts = list(accounts)
+        self.target = target
+        self.report_interval = report_interval
+        self.stop_timeout = stop_timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.ring = HashRing(range(workers))
+        self.reports = multiprocessing.Queue()
+        self.shards = {}
+        self.controls = {}
+        # Доля каждого воркера {ключ: чат}: аккаунты меняются на месте при
+        # перечитывании файла, поэтому сравнивать приходится со снимком.
+        self._owned = {}
+        self.processes = {}
+        self.throughput = {}
+        # Последний отчёт каждого воркера - словарь из `report_status`.
+        self.statuses = {}
+        self._last_reports = {}
+        self._started = {}
+        # Падения вскоре после запуска подряд и время перезапуска.
+        self._crashes = {}
+        self._restart_at = {}
+
+    def start(self):
+        """Запускает по процессу на каждый узел кольца."""
+        self.shards = self._assign()
+        for worker_id, accounts in self.shards.items():
+            self._spawn(worker_id, accounts)
+
+    def resize(self, workers):
+        """Меняет число воркеров; остальные получают изменения своей доли.
+
+        Возвращает количество аккаунтов, сменивших воркер.
+        """
+        for worker_id in range(len(self.ring.nodes), workers):
+            self.ring.add(worker_id)
+        for worker_id in range(workers, len(self.ring.nodes)):
+            self.ring.remove(worker_id)
+
+        moved = self._reshard()
+        logger.info('Воркеров: %s, переехало аккаунтов: %s', workers, moved)
+        return moved
+
+    def reload(self, accounts):
+        """Заменяет список аккаунтов и сообщает воркерам изменения их доли.
+
+        Возвращает количество добавленных или изменённых аккаунтов.
+        """
+        self.accounts = list(accounts)
+        return self._reshard()
+
+    def _reshard(self):
+        """Раздаёт аккаунты заново и сообщает воркерам изменения их доли.
+
+        Запускаются и останавливаются только воркеры, появившиеся на
+        кольце или убранные с него.
+        """
+        shards = self._assign()
+        moved = 0
+        for worker_id in set(self.shards) | set(shards):
+            if worker_id not in shards:
+                self._terminate(worker_id)
+            elif worker_id not in self.processes:
+                self._spawn(worker_id, shards[worker_id])
+                moved += len(shards[worker_id])
+            else:
+                moved += self._send_changes(worker_id, shards[worker_id])
+        self.shards = shards
+        return moved
+
+    def _send_changes(self, worker_id, accounts):
+        """Отправляет воркеру разницу с его долей; число новых и изменённых."""
+        owned = self._owned[worker_id]
+        share = {account.key: account for account in accounts}
+        added = [
+            account for key, account in share.items() if key not in owned
+        ]
+        removed = [key for key in owned if key not in share]
+        updated = [
+            (key, account.chat_id) for key, account in share.items()
+            if key in owned and owned[key] != account.chat_id
+        ]
+        if added or removed or updated:
+            self.controls[worker_id].put((added, removed, updated))
+            self._owned[worker_id] = {
+                key: account.chat_id for key, account in share.items()
+            }
+            logger.info(
+                'Воркер %s: добавлено %s, убрано %s, изменено %s',
+                worker_id, len(added), len(removed), len(updated),
+            )
+        return len(added) + len(updated)
+
+    def monitor(self, timeout):
+        """Собирает отчёты воркеров и перезапускает упавшие процессы.
+
+        Упавший воркер перезапускается, когда истечёт его пауза.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                report = self.reports.get(timeout=remaining)
+            except queue.Empty:
+                break
+            self._account_report(*report)
+
+        now = time.monotonic()
+        for worker_id, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            if worker_id not in self._restart_at:
+                self._schedule_restart(worker_id, process.exitcode, now)
+            if now >= self._restart_at[worker_id]:
+                del self._restart_at[worker_id]
+                self._spawn(worker_id, self.shards[worker_id])
+
+    def _schedule_restart(self, worker_id, exitcode, now):
+        """Назначает перезапуск упавшего воркера с нарастающей паузой."""
+        if now - self._started[worker_id] < self.max_restart_delay:
+            crashes = self._crashes.get(worker_id, 0) + 1
+        else:
+            crashes = 1
+        self._crashes[worker_id] = crashes
+        delay = min(
+            self.restart_delay * 2 ** (crashes - 1), self.max_restart_delay
+        )
+        self._restart_at[worker_id] = now + delay
+        if crashes >= CRASH_LOOP:
+            logger.error(
+                'Воркер %s падает сразу после запуска %s раз подряд '
+                '(код %s), перезапуск через %.1f с - проверьте настройки '
+                'и базу состояния', worker_id, crashes, exitcode, delay,
+            )
+        else:
+            logger.error('Воркер %s завершился с кодом %s, перезапуск '
+                         'через %.1f с', worker_id, exitcode, delay)
+
+    def report_ages(self):
+        """Сколько секунд назад отчитался каждый запущенный воркер.
+
+        До первого отчёта - сколько секунд воркер работает.
+        """
+        now = time.monotonic()
+        return {
+            worker_id: now - self._last_reports[worker_id][1]
+            if worker_id in self._last_reports
+            else now - self._started[worker_id]
+            for worker_id in self.processes
+        }
+
+    def alive(self):
+        """Все ли процессы воркеров работают."""
+        return all(p.is_alive() for p in self.processes.values())
+
+    def send_signal(self, signum):
+        """Пересылает сигнал всем запущенным воркерам."""
+        for process in self.processes.values():
+            if process.pid is not None:
+                os.kill(process.pid, signum)
+
+    def stop(self, timeout=None):
+        """Останавливает все воркеры за общий срок `timeout` секунд.
+
+        Воркеры получают SIGTERM одновременно; не завершившиеся к сроку
+        завершаются принудительно.
+        """
+        processes = list(self.processes.values())
+        self.processes.clear()
+        self.throughput.clear()
+        self.statuses.clear()
+        self._restart_at.clear()
+        for worker_id in list(self.controls):
+            self._close_control(worker_id)
+        for process in processes:
+            process.terminate()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for process in processes:
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+            process.join(timeout)
+            if process.is_alive():
+                logger.error('Воркер %s не остановился вовремя', process.name)
+                process.kill()
+                process.join()
+
+    def _assign(self):
+        return self.ring.assign(self.accounts, key=lambda a: a.key)
+
+    def _account_report(self, worker_id, status, reported_at):
+        if worker_id not in self.processes:
+            return
+        polls = status['polls']
+        last = self._last_reports.get(worker_id)
+        self._last_reports[worker_id] = (polls, reported_at)
+        self.statuses[worker_id] = status
+        if last is None or reported_at <= last[1]:
+            return
+        rate = (polls - last[0]) / (reported_at - last[1])
+        self.throughput[worker_id] = rate
+        logger.info('Воркер %s: %.2f опросов/с', worker_id, rate)
+
+    def _spawn(self, worker_id, accounts):
+        self._close_control(worker_id)
+        control = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=self.target,
+            args=(worker_id, accounts, self.reports, control),
+            name=f'worker-{worker_id}',
+        )
+        process.start()
+        self.processes[worker_id] = process
+        self.controls[worker_id] = control
+        self._owned[worker_id] = {
+            account.key: account.chat_id for account in accounts
+        }
+        self._last_reports.pop(worker_id, None)
+        self.statuses.pop(worker_id, None)
+        self._started[worker_id] = time.monotonic()
+        logger.info('Воркер %s запущен, аккаунтов: %s',
+                    worker_id, len(accounts))
+
+    def _terminate(self, worker_id):
+        process = self.processes.pop(worker_id, None)
+        self.throughput.pop(worker_id, None)
+        self._owned.pop(worker_id, None)
+        self._last_reports.pop(worker_id, None)
+        self.statuses.pop(worker_id, None)
+        self._started.pop(worker_id, None)
+        self._crashes.pop(worker_id, None)
+        self._restart_at.pop(worker_id, None)
+        self._close_control(worker_id)
+        if process is None:
+            return
+        process.terminate()
+        process.join(self.stop_timeout)
+        if process.is_alive():
+            logger.error('Воркер %s не остановился вовремя', process.name)
+            process.kill()
+            process.join()
+        logger.info('Воркер %s остановлен', worker_id)
+
+    def _close_control(self, worker_id):
+        """Закрывает очередь изменений воркера, не дожидаясь её чтения."""
+        control = self.controls.pop(worker_id, None)
+        if control is not None:
+            control.cancel_join_thread()
+            control.close()
@@ -0,0 +1,66 @@
+"""Корректная остановка бота по сигналу с общим сроком."""
+import signal
+import threading
+import time
+
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Shutdown:
+    """Запрос остановки и срок `timeout` секунд на её выполнение.
+
+    После `install()` SIGTERM и SIGINT вызывают `request()`: запоминается
+    время, срабатывают колбэки `on_request` (например, остановка движка
+    опроса), и с этого момента `remaining()` отсчитывает время, которое
+    осталось на отправку очереди и сохранение состояния. Колбэки
+    выполняются прямо в обработчике сигнала, поэтому должны быть
+    короткими и не брать блокировок. Повторный сигнал завершает процесс
+    без ожидания.
+    """
+
+    def __init__(self, timeout, clock=time.monotonic):
+        """Остановка со сроком `timeout` секунд."""
+        self.timeout = timeout
+        self.clock = clock
+        self.requested = threading.Event()
+        self.reason = None
+        self.requested_at = None
+        self._callbacks = []
+
+    def install(self, signals=SIGNALS):
+        """Подписывается на сигналы; вызывать из главного потока."""
+        for signum in signals:
+            signal.signal(signum, self._handle)
+
+    def on_request(self, callback):
+        """Регистрирует колбэк; если остановка уже запрошена - вызывает."""
+        self._callbacks.append(callback)
+        if self.requested_at is not None:
+            callback()
+
+    def request(self, reason='stop'):
+        """Запрашивает остановку; повторные вызовы ничего не делают."""
+        if self.requested_at is not None:
+            return
+        self.reason = reason
+        self.requested_at = self.clock()
+        self.requested.set()
+        for callback in list(self._callbacks):
+            callback()
+
+    def remaining(self):
+        """Сколько секунд осталось до истечения срока остановки."""
+        if self.requested_at is None:
+            return self.timeout
+        return max(self.requested_at + self.timeout - self.clock(), 0)
+
+    def elapsed(self):
+        """Сколько секунд прошло с запроса остановки."""
+        if self.requested_at is None:
+            return 0
+        return self.clock() - self.requested_at
+
+    def _handle(self, signum, frame):
+        for other in SIGNALS:
+            signal.signal(other, signal.SIG_DFL)
+        self.request(signal.Signals(signum).name)
@@ -0,0 +1,70 @@
+"""Индекс последних известных статусов домашних работ."""
+import threading
+from collections import OrderedDict
+
+from .accounts import intern_status
+
+FINISHED_STATUSES = frozenset({'approved'})
+
+
+class StatusIndex:
+    """Ограниченный по размеру индекс (аккаунт, работа) -> статус.
+
+    Хранит статус и `date_updated` каждой работы и отвечает, изменилось ли
+    что-нибудь с прошлого уведомления. При переполнении первыми вытесняются
+    давно не встречавшиеся завершённые работы, затем остальные. Вытесненные
+    записи при следующем обращении подгружаются из `store`. Индекс общий
+    для потоков опроса, поэтому словари меняются под блокировкой.
+    """
+
+    def __init__(self, store, max_size=100_000):
+        """Индекс поверх хранилища состояния `store`."""
+        self.store = store
+        self.max_size = max_size
+        self._active = OrderedDict()
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Количество работ в памяти."""
+        return len(self._active) + len(self._finished)
+
+    def changed(self, account, homework):
+        """Отличается ли работа от последней отправленной версии."""
+        key = (account, homework['homework_name'])
+        known = self._get(key)
+        if known is None:
+            known = self.store.get_status(*key)
+            if known is not None:
+                self._put(key, known)
+        return known != (homework['status'], homework.get('date_updated'))
+
+    def update(self, account, homework):
+        """Запоминает отправленную версию работы."""
+        key = (account, homework['homework_name'])
+        value = (
+            intern_status(homework['status']), homework.get('date_updated')
+        )
+        self._put(key, value)
+        self.store.save_status(*key, *value)
+
+    def _get(self, key):
+        with self._lock:
+            for entries in (self._active, self._finished):
+                value = entries.get(key)
+                if value is not None:
+                    entries.move_to_end(key)
+                    return value
+        return None
+
+    def _put(self, key, value):
+        with self._lock:
+            self._active.pop(key, None)
+            self._finished.pop(key, None)
+            if value[0] in FINISHED_STATUSES:
+                self._finished[key] = value
+            else:
+                self._active[key] = value
+            while len(self) > self.max_size:
+                entries = self._finished or self._active
+                entries.popitem(last=False)
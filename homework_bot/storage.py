@@ -0,0 +1,180 @@
+"""Хранилище курсоров, отправленных статусов и истории их изменений."""
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SIZE = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    account TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    account TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date_updated TEXT,
+    PRIMARY KEY (account, homework)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date_updated TEXT
+);
+CREATE INDEX IF NOT EXISTS history_account ON history (account, id);
+"""
+
+
+class StateStore:
+    """SQLite-хранилище состояния в режиме WAL с пакетной записью.
+
+    Изменения копятся в памяти (повторные записи одного ключа схлопываются)
+    и сбрасываются одной транзакцией раз в `flush_interval` секунд или при
+    накоплении `batch_size` изменений. С `synchronous=NORMAL` в режиме WAL
+    fsync выполняется только при чекпоинте, а не на каждый коммит.
+    История изменений статусов хранится по `history_size` последних
+    записей на аккаунт; база общая для воркеров, поэтому историю видит
+    и главный процесс, отвечающий на /history.
+    """
+
+    def __init__(self, path, flush_interval=5, batch_size=1000,
+                 history_size=HISTORY_SIZE):
+        """Открывает или создаёт базу `path`."""
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._cursors = {}
+        self._statuses = {}
+        self._history = []
+        self._flushed_at = time.monotonic()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def load_cursors(self):
+        """Все сохранённые курсоры: {аккаунт: from_date}."""
+        with self._lock:
+            rows = self._db.execute('SELECT account, from_date FROM cursors')
+            cursors = dict(rows.fetchall())
+            cursors.update(self._cursors)
+        return cursors
+
+    def get_status(self, account, homework):
+        """Последние отправленные (статус, date_updated) работы или None."""
+        with self._lock:
+            status = self._statuses.get((account, homework))
+            if status is not None:
+                return status
+            row = self._db.execute(
+                'SELECT status, date_updated FROM statuses '
+                'WHERE account = ? AND homework = ?',
+                (account, homework),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def load_statuses(self, account):
+        """Все работы аккаунта: список (работа, статус, date_updated)."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT homework, status, date_updated FROM statuses '
+                'WHERE account = ?',
+                (account,),
+            )
+            statuses = {row[0]: row[1:] for row in rows.fetchall()}
+            for (key, homework), value in self._statuses.items():
+                if key == account:
+                    statuses[homework] = value
+        return [(name,) + tuple(value) for name, value in statuses.items()]
+
+    def load_history(self, account):
+        """Последние изменения статусов аккаунта, от старых к новым."""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT homework, status, date_updated FROM history '
+                'WHERE account = ? ORDER BY id DESC LIMIT ?',
+                (account, self.history_size),
+            ).fetchall()
+            history = [tuple(row) for row in reversed(rows)]
+            history.extend(
+                entry[1:] for entry in self._history if entry[0] == account
+            )
+        return history[-self.history_size:]
+
+    def save_cursor(self, account, from_date):
+        """Запоминает курсор аккаунта до ближайшего сброса."""
+        with self._lock:
+            self._cursors[account] = from_date
+        self._maybe_flush()
+
+    def save_status(self, account, homework, status, date_updated=None):
+        """Запоминает отправленный статус работы до ближайшего сброса."""
+        with self._lock:
+            self._statuses[(account, homework)] = (status, date_updated)
+        self._maybe_flush()
+
+    def save_history(self, account, homework, status, date_updated=None):
+        """Добавляет изменение статуса в историю аккаунта."""
+        with self._lock:
+            self._history.append((account, homework, status, date_updated))
+        self._maybe_flush()
+
+    def pending(self):
+        """Количество изменений, ещё не записанных на диск."""
+        return len(self._cursors) + len(self._statuses) + len(self._history)
+
+    def _maybe_flush(self):
+        if (
+            self.pending() >= self.batch_size
+            or time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._lock:
+            cursors, self._cursors = self._cursors, {}
+            statuses, self._statuses = self._statuses, {}
+            history, self._history = self._history, []
+            self._flushed_at = time.monotonic()
+            if not cursors and not statuses and not history:
+                return
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                    cursors.items(),
+                )
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?)',
+                    (key + value for key, value in statuses.items()),
+                )
+                self._db.executemany(
+                    'INSERT INTO history (account, homework, status, '
+                    'date_updated) VALUES (?, ?, ?, ?)',
+                    history,
+                )
+                self._db.executemany(
+                    'DELETE FROM history WHERE account = ? AND id NOT IN '
+                    '(SELECT id FROM history WHERE account = ? '
+                    'ORDER BY id DESC LIMIT ?)',
+                    (
+                        (account, account, self.history_size)
+                        for account in {entry[0] for entry in history}
+                    ),
+                )
+        logger.debug(
+            'Состояние сохранено: курсоров %s, статусов %s, истории %s',
+            len(cursors), len(statuses), len(history),
+        )
+
+    def close(self):
+        """Сбрасывает изменения и закрывает базу."""
+        self.flush()
+        self._db.close()
@@ -0,0 +1,120 @@
+"""Потоковый разбор ответа API практикума."""
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+
+
+class HomeworkStream:
+    """Итератор по работам из `homeworks`, разбираемым по мере чтения.
+
+    Тело ответа читается частями из `chunks`, в памяти держится только
+    текущий фрагмент и одна работа. Проверки совпадают с `check_response`:
+    ответ - словарь, ключ `homeworks` есть и содержит список.
+    `current_date` доступна после того, как итерация завершилась.
+    """
+
+    def __init__(self, chunks, close=None):
+        """Разбор ответа, прочитанного кусками `chunks`."""
+        self.current_date = None
+        self._chunks = iter(chunks)
+        self._close = close
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        """Работы по мере чтения; в конце ответ закрывается."""
+        try:
+            yield from self._parse()
+        finally:
+            if self._close is not None:
+                self._close()
+
+    def _parse(self):
+        if self._peek() != '{':
+            raise TypeError('Неверный тип ответа')
+        self._pos += 1
+        found = False
+
+        if self._peek() == '}':
+            self._pos += 1
+        else:
+            while True:
+                key = self._value()
+                self._consume(':')
+                if key == 'homeworks':
+                    found = True
+                    yield from self._array()
+                else:
+                    value = self._value()
+                    if key == 'current_date':
+                        self.current_date = value
+                if self._consume(',}') == '}':
+                    break
+
+        if not found:
+            raise KeyError('Отсутствие ожидаемых ключей')
+
+    def _array(self):
+        if self._peek() != '[':
+            raise TypeError('Неверный тип данных')
+        self._pos += 1
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._consume(',]') == ']':
+                return
+
+    def _peek(self):
+        """Следующий значимый символ без его чтения ('' в конце тела)."""
+        while True:
+            while (
+                self._pos < len(self._buffer)
+                and self._buffer[self._pos] in WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._load():
+                return ''
+
+    def _consume(self, expected):
+        char = self._peek()
+        if not char or char not in expected:
+            raise ValueError('Не удалось преобразовать данные JSON')
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Следующее JSON-значение целиком."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # Число в конце фрагмента может продолжиться в следующем.
+            if end is not None and (end < len(self._buffer) or self._eof):
+                self._pos = end
+                return value
+            if not self._load():
+                raise ValueError('Не удалось преобразовать данные JSON')
+
+    def _load(self):
+        """Дочитывает следующий фрагмент; False, если тело закончилось."""
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._text.decode(b'', final=True)
+        else:
+            text = self._text.decode(chunk)
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
@@ -0,0 +1,59 @@
+"""Приём обновлений Telegram через вебхук вместо long polling."""
+import hashlib
+import json
+import logging
+from http import HTTPStatus
+
+import telegram
+
+from .server import EmbeddedServer
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_path(token):
+    """Секретный путь вебхука, который знает только Telegram."""
+    return '/telegram/' + hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+class WebhookReceiver:
+    """Встроенный сервер, в который Telegram отправляет обновления.
+
+    Обновления обрабатываются диспетчером прямо в потоке запроса, без
+    отдельного потока опроса getUpdates.
+    """
+
+    def __init__(self, bot, dispatcher, path, host='0.0.0.0', port=8443):
+        """Приёмник обновлений для `dispatcher` по пути `path`."""
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.path = path
+        self.server = EmbeddedServer(host, port)
+        self.server.route('POST', path, self.handle)
+        self.received = 0
+
+    def handle(self, body):
+        """Разбирает и обрабатывает одно обновление."""
+        try:
+            data = json.loads(body)
+        except json.decoder.JSONDecodeError:
+            return HTTPStatus.BAD_REQUEST, 'text/plain', b'bad json'
+
+        update = telegram.Update.de_json(data, self.bot)
+        self.received += 1
+        self.dispatcher.process_update(update)
+        return HTTPStatus.OK, 'text/plain', b'ok'
+
+    def start(self, url):
+        """Запускает сервер и регистрирует вебхук `url` в Telegram."""
+        self.server.start()
+        self.bot.set_webhook(url=url.rstrip('/') + self.path)
+        logger.info('Вебхук Telegram зарегистрирован')
+
+    def stop(self):
+        """Снимает вебхук и останавливает сервер."""
+        try:
+            self.bot.delete_webhook()
+        except telegram.TelegramError as error:
+            logger.error('Не удалось снять вебхук: %s', error)
+        self.server.stop()
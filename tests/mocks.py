@@ -0,0 +1,270 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from homework_bot.dedup import ErrorDeduplicator
+from homework_bot.fingerprint import ResponseCache
+from homework_bot.homework_cache import HomeworkCache
+from homework_bot.poller import Poller
+from homework_bot.status_index import StatusIndex
+
+
+class MockResponseGET:
+
+    def __init__(self, url, params=None, random_timestamp=None,
+                 current_timestamp=None, http_status=HTTPStatus.OK, **kwargs):
+        assert (
+            url.startswith(
+                'https://practicum.yandex.ru/api/user_api/homework_statuses'
+            )
+        ), (
+            'Проверьте, что вы делаете запрос на правильный '
+            'ресурс API для запроса статуса домашней работы'
+        )
+        assert 'headers' in kwargs, (
+            'Проверьте, что вы передали заголовки `headers` для запроса '
+            'статуса домашней работы'
+        )
+        assert 'Authorization' in kwargs['headers'], (
+            'Проверьте, что в параметры `headers` для запроса статуса '
+            'домашней работы добавили Authorization'
+        )
+        assert kwargs['headers']['Authorization'].startswith('OAuth '), (
+            'Проверьте, что в параметрах `headers` для запроса статуса '
+            'домашней работы Authorization начинается с OAuth'
+        )
+        assert params is not None, (
+            'Проверьте, что передали параметры `params` для запроса '
+            'статуса домашней работы'
+        )
+        assert 'from_date' in params, (
+            'Проверьте, что в параметрах `params` для запроса статуса '
+            'домашней работы передали `from_date`'
+        )
+        assert params['from_date'] == current_timestamp, (
+            'Проверьте, что в параметрах `params` для запроса статуса '
+            'домашней работы `from_date` передаете timestamp'
+        )
+        self.random_timestamp = random_timestamp
+        self.status_code = http_status
+
+    def json(self):
+        data = {
+            "homeworks": [],
+            "current_date": self.random_timestamp
+        }
+        return data
+
+
+class MockTelegramBot:
+
+    def __init__(self, token=None, random_timestamp=None, **kwargs):
+        assert token is not None, (
+            'Проверьте, что вы передали токен бота Telegram'
+        )
+        self.random_timestamp = random_timestamp
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        assert chat_id is not None, (
+            'Проверьте, что вы передали chat_id= при отправке '
+            'сообщения ботом Telegram'
+        )
+        assert text is not None, (
+            'Проверьте, что вы передали text= при отправке '
+            'сообщения ботом Telegram'
+        )
+        return self.random_timestamp
+
+
+class FakeApi(ThreadingHTTPServer):
+    """API практикума и Bot API Telegram в одном локальном сервере.
+
+    GET отвечает `answer`, POST - методам Bot API. Отправленные через
+    sendMessage сообщения собираются в `messages`; с `reject_messages`
+    sendMessage отвечает ошибкой 400.
+    """
+
+    daemon_threads = True
+    bot_user = {'id': 1, 'is_bot': True, 'first_name': 'bot',
+                'username': 'fake_bot'}
+
+    def __init__(self, answer=None, send_delay=0, updates_delay=1,
+                 reject_messages=False):
+        super().__init__(('127.0.0.1', 0), FakeApiHandler)
+        self.answer = answer or {'homeworks': [], 'current_date': 0}
+        self.send_delay = send_delay
+        # Пауза вместо долгого опроса getUpdates.
+        self.updates_delay = updates_delay
+        self.reject_messages = reject_messages
+        self.first_request = threading.Event()
+        self.first_request_at = None
+        self.first_message = threading.Event()
+        self.messages = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if not self.server.first_request.is_set():
+            self.server.first_request_at = time.perf_counter()
+            self.server.first_request.set()
+        self._reply(self.server.answer)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        method = self.path.rsplit('/', 1)[-1]
+        result = True
+        if method == 'getMe':
+            result = self.server.bot_user
+        elif method == 'getUpdates':
+            time.sleep(self.server.updates_delay)
+            result = []
+        elif method == 'sendMessage':
+            if self.server.reject_messages:
+                self._reply({'ok': False, 'error_code': 400,
+                             'description': 'Bad Request: chat not found'},
+                            status=400)
+                return
+            time.sleep(self.server.send_delay)
+            result = self._message(body)
+        self._reply({'ok': True, 'result': result})
+
+    def _message(self, body):
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            data = json.loads(body)
+        else:
+            data = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        self.server.messages.append((str(data['chat_id']), data['text']))
+        self.server.first_message.set()
+        return {
+            'message_id': len(self.server.messages), 'date': 0,
+            'chat': {'id': int(data['chat_id']), 'type': 'private'},
+            'text': data['text'],
+        }
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:
+            # Процесс бота уже завершён.
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    @property
+    def content(self):
+        return json.dumps(self.data).encode()
+
+    def iter_content(self, chunk_size):
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def make_poller(sent, store):
+    import homework
+
+    return Poller(
+        fetch=homework.fetch_homework_statuses,
+        stream=homework.stream_homework_statuses,
+        decode=homework.decode_response,
+        check=homework.check_response,
+        parse=homework.parse_status,
+        notify=lambda chat_id, text, key=None: sent.append((chat_id, text)),
+        store=store,
+        index=StatusIndex(store),
+        cache=ResponseCache(),
+        homework_cache=HomeworkCache(store),
+        errors=ErrorDeduplicator(),
+        retry_time=homework.RETRY_TIME,
+    )
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHUTDOWN_TIMEOUT = 10
+
+
+def start_bot(server, workdir, **extra_env):
+    accounts = os.path.join(workdir, 'accounts.json')
+    with open(accounts, 'w', encoding='utf-8') as file:
+        json.dump([{'token': 'token', 'chat_id': 1}], file)
+    env = dict(os.environ)
+    env.pop('TELEGRAM_CHAT_ID', None)
+    env.update({
+        'TOKEN_TELEGRAM': '123456:token',
+        'PRACTICUM_ENDPOINT': server.url,
+        'TELEGRAM_API_URL': f'{server.url}bot',
+        'ACCOUNTS_FILE': accounts,
+        'STATE_DB': os.path.join(workdir, 'state.db'),
+        'METRICS_PORT': '0',
+        'SHUTDOWN_TIMEOUT': str(SHUTDOWN_TIMEOUT),
+        'LOG_LEVEL': 'WARNING',
+        **extra_env,
+    })
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'homework.py')],
+        cwd=workdir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+
+
+def processes_in(workdir):
+    """Идентификаторы процессов, запущенных в каталоге `workdir`."""
+    pids = []
+    for pid in os.listdir('/proc'):
+        try:
+            if pid.isdigit() and os.readlink(f'/proc/{pid}/cwd') == workdir:
+                pids.append(int(pid))
+        except OSError:
+            pass
+    return pids
+
+
+def terminate(process):
+    """Отправляет SIGTERM и возвращает время до выхода процесса."""
+    started = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(SHUTDOWN_TIMEOUT * 2)
+    finally:
+        process.kill()
+    return time.perf_counter() - started
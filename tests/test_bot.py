@@ -4,73 +4,7 @@ from http import HTTPStatus
 import requests
 import telegram
 import utils
-
-
-class MockResponseGET:
-
-    def __init__(self, url, params=None, random_timestamp=None,
-                 current_timestamp=None, http_status=HTTPStatus.OK, **kwargs):
-        assert (
-            url.startswith(
-                'https://practicum.yandex.ru/api/user_api/homework_statuses'
-            )
-        ), (
-            'Проверьте, что вы делаете запрос на правильный '
-            'ресурс API для запроса статуса домашней работы'
-        )
-        assert 'headers' in kwargs, (
-            'Проверьте, что вы передали заголовки `headers` для запроса '
-            'статуса домашней работы'
-        )
-        assert 'Authorization' in kwargs['headers'], (
-            'Проверьте, что в параметры `headers` для запроса статуса '
-            'домашней работы добавили Authorization'
-        )
-        assert kwargs['headers']['Authorization'].startswith('OAuth '), (
-            'Проверьте, что в параметрах `headers` для запроса статуса '
-            'домашней работы Authorization начинается с OAuth'
-        )
-        assert params is not None, (
-            'Проверьте, что передали параметры `params` для запроса '
-            'статуса домашней работы'
-        )
-        assert 'from_date' in params, (
-            'Проверьте, что в параметрах `params` для запроса статуса '
-            'домашней работы передали `from_date`'
-        )
-        assert params['from_date'] == current_timestamp, (
-            'Проверьте, что в параметрах `params` для запроса статуса '
-            'домашней работы `from_date` передаете timestamp'
-        )
-        self.random_timestamp = random_timestamp
-        self.status_code = http_status
-
-    def json(self):
-        data = {
-            "homeworks": [],
-            "current_date": self.random_timestamp
-        }
-        return data
-
-
-class MockTelegramBot:
-
-    def __init__(self, token=None, random_timestamp=None, **kwargs):
-        assert token is not None, (
-            'Проверьте, что вы передали токен бота Telegram'
-        )
-        self.random_timestamp = random_timestamp
-
-    def send_message(self, chat_id=None, text=None, **kwargs):
-        assert chat_id is not None, (
-            'Проверьте, что вы передали chat_id= при отправке '
-            'сообщения ботом Telegram'
-        )
-        assert text is not None, (
-            'Проверьте, что вы передали text= при отправке '
-            'сообщения ботом Telegram'
-        )
-        return self.random_timestamp
+from mocks import MockResponseGET, MockTelegramBot
 
 
 class TestHomework:
@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+import requests
+from mocks import make_poller
+
+from homework_bot.accounts import Account
+from homework_bot.breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                  CircuitOpenError)
+from homework_bot.engine import PollingEngine
+from homework_bot.scheduler import SUSPENDED, FixedPolicy
+from homework_bot.storage import StateStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class MockResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.content = b'{"homeworks": [], "current_date": 1}'
+
+    def close(self):
+        pass
+
+
+def fail(breaker):
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError('500')
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3, clock=Clock())
+        for _ in range(2):
+            fail(breaker)
+        assert breaker.state == CLOSED
+        fail(breaker)
+        assert breaker.state == OPEN, (
+            'Цепь должна размыкаться после порога сбоев подряд'
+        )
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, clock=Clock())
+        fail(breaker)
+        with breaker.guard():
+            pass
+        fail(breaker)
+        assert breaker.state == CLOSED, (
+            'Порог считается по сбоям подряд'
+        )
+
+    def test_half_open_probe_closes(self):
+        clock = Clock()
+        breaker = CircuitBreaker(
+            failure_threshold=1, recovery_timeout=30, clock=clock
+        )
+        fail(breaker)
+        assert breaker.retry_after() == 30
+        clock.now = 30
+        assert breaker.retry_after() == 0
+
+        assert breaker.acquire() is True
+        assert breaker.state == HALF_OPEN
+        assert breaker.retry_after() is None
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()
+        breaker.record_success(probe=True)
+        assert breaker.state == CLOSED, 'Успешная проба замыкает цепь'
+
+    def test_failed_probe_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker(
+            failure_threshold=1, recovery_timeout=30, clock=clock
+        )
+        fail(breaker)
+        clock.now = 30
+        fail(breaker)
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == 30, (
+            'После неудачной пробы цепь снова размыкается на полный интервал'
+        )
+
+    def test_ignored_errors_do_not_open(self):
+        breaker = CircuitBreaker(
+            failure_threshold=1, is_failure=lambda error: False
+        )
+        fail(breaker)
+        assert breaker.state == CLOSED
+
+    def test_states(self):
+        breaker = CircuitBreaker()
+        assert breaker.states() == {CLOSED: 1, HALF_OPEN: 0, OPEN: 0}
+
+
+class TestPracticumBreaker:
+
+    def test_server_errors_stop_requests(self, monkeypatch):
+        import homework
+
+        calls = []
+
+        def get(*args, **kwargs):
+            calls.append(kwargs)
+            return MockResponse(500)
+
+        monkeypatch.setattr(requests, 'get', get)
+        monkeypatch.setattr(homework, 'circuit_breaker', CircuitBreaker(
+            failure_threshold=2, is_failure=homework.is_upstream_failure
+        ))
+        sent = []
+        poller = make_poller(sent, StateStore(':memory:'))
+        account = Account('token', 42, from_date=100)
+
+        for _ in range(5):
+            poller(account)
+        assert len(calls) == 2, (
+            'После размыкания цепи запросы к API не должны отправляться'
+        )
+        assert poller(account) == SUSPENDED
+        assert len(sent) == 1, (
+            'Отложенный из-за цепи опрос не должен уведомлять пользователя'
+        )
+
+    def test_client_errors_do_not_open(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse(401)
+        )
+        breaker = CircuitBreaker(
+            failure_threshold=1, is_failure=homework.is_upstream_failure
+        )
+        monkeypatch.setattr(homework, 'circuit_breaker', breaker)
+        with pytest.raises(requests.RequestException):
+            homework.send_api_request('token', 100)
+        assert breaker.state == CLOSED, (
+            'Ошибка авторизации одного аккаунта не должна размыкать цепь'
+        )
+
+
+class TestEngineSuspension:
+
+    def test_open_circuit_suspends_polling(self):
+        clock = Clock()
+        breaker = CircuitBreaker(
+            failure_threshold=1, recovery_timeout=1000, clock=clock
+        )
+        fail(breaker)
+        polled = []
+        engine = PollingEngine(
+            polled.append, FixedPolicy(0.01), breaker=breaker
+        )
+        for i in range(10):
+            engine.add_account(Account(f'token{i}', i))
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.2, engine.stop)
+            await engine.run()
+
+        asyncio.run(run())
+        assert polled == [], (
+            'Пока цепь разомкнута, аккаунты не должны опрашиваться'
+        )
+        assert len(engine) == 10
@@ -0,0 +1,100 @@
+import threading
+
+from homework_bot.dedup import ErrorDeduplicator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestErrorDeduplicator:
+
+    def test_repeats_are_suppressed_within_window(self):
+        errors = ErrorDeduplicator(window=3600, clock=Clock())
+        assert errors.report('a', ValueError('boom')) == 'boom'
+        for _ in range(56):
+            assert errors.report('a', ValueError('boom')) is None, (
+                'Повтор ошибки в пределах окна не должен отправляться'
+            )
+
+    def test_summary_after_window(self):
+        clock = Clock()
+        errors = ErrorDeduplicator(window=3600, clock=clock)
+        for _ in range(57):
+            errors.report('a', ValueError('boom'))
+        clock.now = 3600
+        message = errors.report('a', ValueError('boom'))
+        assert '57 раз' in message and '60 мин' in message, (
+            'После окна должна отправляться сводка с числом повторов'
+        )
+        assert errors.report('a', ValueError('boom')) is None
+
+    def test_rate_limit_is_per_error_class(self):
+        errors = ErrorDeduplicator(clock=Clock())
+        assert errors.report('a', ValueError('500')) == '500'
+        assert errors.report('a', ValueError('502')) is None
+        assert errors.report('a', KeyError('homeworks')) is not None, (
+            'Ошибки разных классов ограничиваются отдельно'
+        )
+        assert errors.report('b', ValueError('500')) == '500', (
+            'Ошибки разных аккаунтов ограничиваются отдельно'
+        )
+
+    def test_success_does_not_reset_window(self):
+        clock = Clock()
+        errors = ErrorDeduplicator(window=3600, clock=clock)
+        errors.report('a', ValueError('boom'))
+        for _ in range(10):
+            assert errors.resolved('a') == []
+            assert errors.report('a', ValueError('boom')) is None, (
+                'Мигающая ошибка не должна отправляться после каждого успеха'
+            )
+
+    def test_resolved_sends_pending_summary(self):
+        clock = Clock()
+        errors = ErrorDeduplicator(window=60, clock=clock)
+        errors.report('a', ValueError('boom'))
+        errors.report('a', ValueError('boom'))
+        clock.now = 60
+        assert errors.resolved('a') == [
+            'Ошибка «boom» повторилась 1 раз за последние 1 мин.'
+        ]
+        assert len(errors) == 0, 'Истёкшие записи должны удаляться'
+        assert errors.report('a', ValueError('boom')) == 'boom'
+
+    def test_size_is_bounded(self):
+        errors = ErrorDeduplicator(max_size=100, clock=Clock())
+        for i in range(1000):
+            errors.report(f'account{i}', ValueError('boom'))
+        assert len(errors) == 100, (
+            'Число хранимых аккаунтов должно быть ограничено'
+        )
+
+    def test_shared_between_threads(self):
+        errors = ErrorDeduplicator(window=0, max_size=20)
+        failures = []
+
+        def work(thread):
+            try:
+                for i in range(2000):
+                    key = f'account{(thread + i) % 50}'
+                    errors.report(key, ValueError('boom'))
+                    errors.resolved(key)
+            except Exception as error:
+                failures.append(error)
+
+        threads = [
+            threading.Thread(target=work, args=(i,)) for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert failures == [], (
+            'Дедупликатор должен работать из нескольких потоков'
+        )
+        assert len(errors) <= 20
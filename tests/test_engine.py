@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+from homework_bot.accounts import Account, intern_status, load_accounts
+from homework_bot.engine import PollingEngine
+from homework_bot.scheduler import FixedPolicy
+
+
+class TestPollingEngine:
+
+    def test_polls_every_account(self):
+        accounts = [Account(f'token{i}', i) for i in range(500)]
+        polled = []
+        lock = threading.Lock()
+
+        def poll(account):
+            with lock:
+                polled.append(account.token)
+                if len(polled) == len(accounts):
+                    engine.stop()
+
+        engine = PollingEngine(poll, FixedPolicy(60), concurrency=16)
+        for account in accounts:
+            engine.add_account(account)
+
+        asyncio.run(asyncio.wait_for(engine.run(), 10))
+        assert sorted(polled) == sorted(a.token for a in accounts), (
+            'Проверьте, что движок опрашивает каждый аккаунт'
+        )
+
+    def test_concurrency_is_bounded(self):
+        accounts = [Account(f'token{i}', i) for i in range(40)]
+        active = []
+        peak = []
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def poll(account):
+            with lock:
+                active.append(account)
+                peak.append(len(active))
+            done.wait(0.01)
+            with lock:
+                active.remove(account)
+
+        engine = PollingEngine(poll, FixedPolicy(60), concurrency=4)
+        for account in accounts:
+            engine.add_account(account)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.5, engine.stop)
+            await engine.run()
+
+        asyncio.run(run())
+        assert len(peak) == len(accounts)
+        assert max(peak) <= 4, (
+            'Проверьте, что число одновременных опросов ограничено'
+        )
+
+    def test_poll_error_reschedules_account(self):
+        calls = []
+
+        def poll(account):
+            calls.append(account)
+            raise ValueError('boom')
+
+        engine = PollingEngine(poll, FixedPolicy(0.01), concurrency=1)
+        engine.add_account(Account('token', 1))
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.2, engine.stop)
+            await engine.run()
+
+        asyncio.run(run())
+        assert len(calls) > 1, (
+            'Проверьте, что после ошибки аккаунт снова ставится в очередь'
+        )
+
+
+class TestAccounts:
+
+    def test_load_accounts(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text(
+            '[{"token": "a", "chat_id": 1}, '
+            '{"token": "b", "chat_id": 2, "from_date": 100}]'
+        )
+        accounts = load_accounts(path)
+        assert [a.token for a in accounts] == ['a', 'b']
+        assert accounts[1].from_date == 100
+
+    def test_account_has_no_dict(self):
+        assert not hasattr(Account('a', 1), '__dict__'), (
+            'Аккаунт должен использовать __slots__'
+        )
+
+    def test_account_key_is_shared(self):
+        account = Account('a', 1)
+        assert account.key is account.key, (
+            'Ключ аккаунта должен вычисляться один раз'
+        )
+
+    def test_statuses_are_interned(self):
+        import homework
+
+        decoded = json.loads('{"status": "approved"}')['status']
+        known = next(s for s in homework.HOMEWORK_STATUSES if s == decoded)
+        assert intern_status(decoded) is known, (
+            'Статус должен ссылаться на ключ HOMEWORK_STATUSES'
+        )
+        assert intern_status(None) is None
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from mocks import FakeApi, start_bot, terminate
+
+from homework_bot.accounts import Account
+from homework_bot.engine import PollingEngine
+from homework_bot.health import Health, percentiles
+from homework_bot.scheduler import IDLE, FixedPolicy
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def metrics_text(port):
+    try:
+        with urllib.request.urlopen(
+            f'http://127.0.0.1:{port}/metrics', timeout=5
+        ) as response:
+            return response.read().decode()
+    except OSError:
+        return ''
+
+
+class TestPercentiles:
+
+    def test_nearest_rank(self):
+        result = percentiles(range(1, 101))
+        assert result == {'p50': 50, 'p90': 90, 'p99': 99, 'max': 100}
+
+    def test_empty(self):
+        assert percentiles([])['p99'] == 0
+
+
+class TestHealth:
+
+    def test_status_codes(self):
+        health = Health()
+        alive = [True]
+        health.live('loop', lambda: alive[0])
+        health.ready('lag', lambda: False)
+        health.detail('depth', lambda: 3)
+
+        status, _, body = health.healthz()
+        assert status == 200
+        assert json.loads(body) == {
+            'status': 'ok', 'checks': {'loop': True}, 'depth': 3
+        }
+        status, _, body = health.readyz()
+        assert status == 503, 'Проваленная проверка готовности - код 503'
+        assert json.loads(body)['checks'] == {'loop': True, 'lag': False}
+
+        alive[0] = False
+        assert health.healthz()[0] == 503
+
+    def test_failing_check_is_a_failure(self):
+        health = Health()
+        health.live('broken', lambda: 1 / 0)
+        health.detail('broken_detail', lambda: 1 / 0)
+        status, _, body = health.healthz()
+        assert status == 503
+        assert json.loads(body)['broken_detail'] is None
+
+
+class TestEngineHealth:
+
+    def test_lag_and_stuck_polls(self):
+        started = threading.Event()
+        release = threading.Event()
+        polled = []
+
+        def poll(account):
+            polled.append(account)
+            if account.token == 'slow':
+                started.set()
+                release.wait(5)
+            return IDLE
+
+        engine = PollingEngine(poll, FixedPolicy(60), concurrency=1)
+        engine.add_account(Account('slow', 1))
+        engine.add_account(Account('waiting', 2))
+        report = {}
+
+        async def run():
+            task = asyncio.ensure_future(engine.run())
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, started.wait, 5)
+            await asyncio.sleep(0.2)
+            report['running'] = engine.running
+            report['longest'] = engine.longest_poll()
+            report['lags'] = engine.lags()
+            release.set()
+            await asyncio.sleep(0.1)
+            engine.stop()
+            await task
+
+        asyncio.run(run())
+        assert report['running']
+        assert report['longest'] >= 0.2, (
+            'Длительность зависшего опроса должна быть видна'
+        )
+        assert len(report['lags']) == 2
+        assert min(report['lags']) >= 0.2, (
+            'Ожидающий в очереди аккаунт должен считаться опаздывающим'
+        )
+        assert engine.last_success is not None
+        assert not engine.running
+
+
+class TestEndpoints:
+
+    def test_bot_reports_health(self, tmp_path):
+        port = free_port()
+        with FakeApi() as server:
+            process = start_bot(
+                server, str(tmp_path), METRICS_PORT=str(port)
+            )
+            try:
+                assert server.first_request.wait(30), 'Бот не начал опрос'
+                deadline = time.monotonic() + 10
+                while True:
+                    status, body = get(f'http://127.0.0.1:{port}/readyz')
+                    if status == 200 or time.monotonic() > deadline:
+                        break
+                    time.sleep(0.1)
+                health_status, health = get(f'http://127.0.0.1:{port}/healthz')
+            finally:
+                terminate(process)
+
+        assert status == 200, body
+        assert body['checks'] == {
+            'telegram': True, 'engine': True, 'polls_not_stuck': True,
+            'recent_success': True, 'poll_lag': True, 'outbound_queue': True,
+        }
+        assert body['last_success_age'] < 30
+        assert set(body['poll_lag']) == {'p50', 'p90', 'p99', 'max'}
+        assert body['outbound_depth'] == 0
+        assert body['accounts'] == 1
+        assert health_status == 200
+        assert set(health['checks']) == {
+            'telegram', 'engine', 'polls_not_stuck'
+        }, '/healthz проверяет только живость'
+
+    def test_workers_serve_own_metrics(self, tmp_path):
+        port = free_port()
+        worker_ports = [port + 1, port + 2]
+        with FakeApi() as server:
+            process = start_bot(
+                server, str(tmp_path), METRICS_PORT=str(port), WORKERS='2'
+            )
+            try:
+                assert server.first_request.wait(30), 'Бот не начал опрос'
+                deadline = time.monotonic() + 10
+                while True:
+                    polled = [
+                        'homework_bot_poll_cycle_seconds_count 1' in text
+                        for text in map(metrics_text, worker_ports)
+                    ]
+                    if any(polled) or time.monotonic() > deadline:
+                        break
+                    time.sleep(0.1)
+                main = metrics_text(port)
+                profile = get(f'http://127.0.0.1:{worker_ports[0]}/profile')
+            finally:
+                terminate(process)
+
+        assert any(polled), 'Воркер должен отдавать свои метрики опроса'
+        assert 'poll_cycle_seconds' not in main, (
+            'Главный процесс не опрашивает и не отдаёт метрики опроса'
+        )
+        assert 'worker_polls_per_second' in main
+        assert profile[0] == 200, 'Воркер отдаёт /profile'
+
+    def test_workers_report_readiness(self, tmp_path):
+        port = free_port()
+        with FakeApi() as server:
+            process = start_bot(
+                server, str(tmp_path), METRICS_PORT=str(port), WORKERS='2',
+                REPORT_INTERVAL='0.5',
+            )
+            try:
+                assert server.first_request.wait(30), 'Бот не начал опрос'
+                deadline = time.monotonic() + 10
+                while True:
+                    status, body = get(f'http://127.0.0.1:{port}/readyz')
+                    if status == 200 or time.monotonic() > deadline:
+                        break
+                    time.sleep(0.1)
+            finally:
+                terminate(process)
+
+        assert status == 200, body
+        assert body['checks'] == {
+            'telegram': True, 'workers': True, 'worker_reports': True,
+            'recent_success': True, 'poll_lag': True, 'outbound_queue': True,
+        }
+        assert body['outbound_depth'] == 0
+        assert set(body['poll_lag_p99']) == {'0', '1'}
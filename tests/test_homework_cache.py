@@ -0,0 +1,104 @@
+import queue
+
+import requests
+import telegram
+from telegram.ext import Dispatcher
+
+from homework_bot.accounts import Account
+from homework_bot.homework_cache import HomeworkCache
+from homework_bot.status_index import StatusIndex
+from homework_bot.storage import StateStore
+
+
+def command_update(bot, text, chat_id=42, command=True):
+    message = {
+        'message_id': 1,
+        'date': 1600000000,
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'S'},
+        'text': text,
+    }
+    if command:
+        message['entities'] = [
+            {'type': 'bot_command', 'offset': 0, 'length': len(text)}
+        ]
+    return telegram.Update.de_json(
+        {'update_id': 1, 'message': message}, bot
+    )
+
+
+class TestHomeworkCache:
+
+    def filled_cache(self):
+        store = StateStore(':memory:', history_size=2)
+        index = StatusIndex(store)
+        cache = HomeworkCache(store)
+        account = Account('token', '42')
+        cache.register(account)
+        for name, status in [('hw1', 'reviewing'), ('hw1', 'approved'),
+                             ('hw2', 'rejected')]:
+            work = {'homework_name': name, 'status': status}
+            index.update(account.key, work)
+            cache.update(account, work)
+        return cache
+
+    def test_statuses_and_history(self):
+        cache = self.filled_cache()
+        assert cache.statuses(42) == [
+            ('hw1', 'approved', None), ('hw2', 'rejected', None)
+        ], 'id чата из Telegram приходит числом, из .env - строкой'
+        assert cache.history(42) == [
+            ('hw1', 'approved', None), ('hw2', 'rejected', None)
+        ], 'История должна быть ограничена по длине'
+        assert cache.statuses(7) == []
+        assert cache.history(7) == []
+
+    def test_commands_do_not_call_practicum(self, monkeypatch):
+        import homework
+
+        def forbidden(*args, **kwargs):
+            raise AssertionError('Команды не должны запрашивать API')
+
+        monkeypatch.setattr(requests, 'get', forbidden)
+        replies = []
+        monkeypatch.setattr(
+            telegram.Bot, 'send_message',
+            lambda self, chat_id, text, **kwargs: replies.append(text),
+        )
+        monkeypatch.setattr(telegram.Bot, 'username', 'homework_bot')
+        bot = telegram.Bot(token='1234:abcdefg')
+        dispatcher = Dispatcher(bot, queue.Queue(), workers=0)
+        homework.add_handlers(dispatcher, self.filled_cache())
+
+        for command in ('/status', '/history'):
+            dispatcher.process_update(command_update(bot, command))
+
+        assert len(replies) == 2
+        assert replies[0] == (
+            '"hw1": ' + homework.HOMEWORK_STATUSES['approved'] + '\n'
+            '"hw2": ' + homework.HOMEWORK_STATUSES['rejected']
+        )
+        assert 'hw2' in replies[1]
+
+    def test_echo_replies_to_sender_chat(self, monkeypatch):
+        import homework
+
+        sent = []
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1')
+        monkeypatch.setattr(
+            telegram.Bot, 'send_message',
+            lambda self, chat_id, text, **kwargs: sent.append(
+                (chat_id, text)
+            ),
+        )
+        bot = telegram.Bot(token='1234:abcdefg')
+        dispatcher = Dispatcher(bot, queue.Queue(), workers=0)
+        homework.add_handlers(dispatcher, self.filled_cache())
+
+        dispatcher.process_update(
+            command_update(bot, 'привет', chat_id=7, command=False)
+        )
+
+        assert sent == [(7, 'привет')], (
+            'Эхо должно уходить в чат отправителя, а не в TELEGRAM_CHAT_ID'
+        )
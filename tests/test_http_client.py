@@ -0,0 +1,96 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from homework_bot.http_client import HttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0
+    status = 200
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b'{"homeworks": [], "current_date": 1}'
+        try:
+            self.send_response(self.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except BrokenPipeError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+    Handler.delay = 0
+    Handler.status = 200
+
+
+class TestHttpClient:
+
+    def test_connections_are_reused(self, server):
+        client = HttpClient(pool_size=2)
+        for _ in range(5):
+            response = client.get(server)
+            assert response.json()['current_date'] == 1
+        stats = client.stats()
+        client.close()
+        assert stats['requests'] == 5
+        assert stats['new_connections'] == 1, (
+            'Проверьте, что keep-alive соединение переиспользуется'
+        )
+        assert stats['reused_connections'] == 4
+
+    def test_without_keep_alive_opens_new_connections(self, server):
+        client = HttpClient(keep_alive=False)
+        for _ in range(3):
+            client.get(server)
+        stats = client.stats()
+        client.close()
+        assert stats['new_connections'] == 3
+
+    def test_read_timeout(self, server):
+        Handler.delay = 0.5
+        client = HttpClient(read_timeout=0.1)
+        with pytest.raises(requests.Timeout):
+            client.get(server)
+        client.close()
+
+    def test_error_response_returns_connection_to_pool(
+        self, server, monkeypatch
+    ):
+        import homework
+
+        Handler.status = 401
+        client = HttpClient(pool_size=1, read_timeout=1)
+        monkeypatch.setattr(homework, 'http_client', client)
+        monkeypatch.setattr(homework, 'ENDPOINT', server)
+        done = threading.Event()
+
+        def poll():
+            for _ in range(3):
+                with pytest.raises(requests.RequestException):
+                    homework.stream_homework_statuses('tok', 0)
+            done.set()
+
+        threading.Thread(target=poll, daemon=True).start()
+        assert done.wait(5), (
+            'Потоковый ответ с ошибкой должен закрываться, иначе '
+            'соединение не возвращается в пул'
+        )
+        client.close()
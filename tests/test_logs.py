@@ -0,0 +1,74 @@
+import io
+import json
+import logging
+import threading
+
+from homework_bot.logs import JsonFormatter
+
+
+class Tracked:
+    """Объект, который запоминает, в каком потоке его форматировали."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return 'tracked'
+
+
+def make_logger(name, **kwargs):
+    import homework
+
+    listener = homework.init_logger(name, **kwargs)
+    logging.getLogger(name).propagate = False
+    stream = io.StringIO()
+    if listener is not None:
+        listener.handlers[0].setStream(stream)
+    else:
+        logging.getLogger(name).handlers[0].setStream(stream)
+    return logging.getLogger(name), listener, stream
+
+
+class TestLogging:
+
+    def test_disabled_level_is_not_formatted(self):
+        logger, _, _ = make_logger('test_lazy', level=logging.INFO)
+        tracked = Tracked()
+        logger.debug('value: %s', tracked)
+        assert tracked.threads == [], (
+            'Сообщения отключённого уровня не должны форматироваться'
+        )
+
+    def test_queue_mode_formats_in_listener_thread(self):
+        logger, listener, stream = make_logger('test_queue', use_queue=True)
+        tracked = Tracked()
+        logger.info('value: %s', tracked)
+        listener.stop()
+        assert 'value: tracked' in stream.getvalue()
+        assert tracked.threads
+        assert threading.current_thread().name not in tracked.threads, (
+            'В режиме очереди форматирование выполняет поток слушателя'
+        )
+
+    def test_json_format(self):
+        logger, listener, stream = make_logger(
+            'test_json', json_format=True, use_queue=True
+        )
+        logger.warning('Статус %s', 'approved')
+        listener.stop()
+        record = json.loads(stream.getvalue().splitlines()[-1])
+        assert record['msg'] == 'Статус approved'
+        assert record['level'] == 'WARNING'
+        assert record['logger'] == 'test_json'
+
+    def test_json_formatter_includes_exception(self):
+        try:
+            raise KeyError('boom')
+        except KeyError:
+            record = logging.LogRecord(
+                'name', logging.ERROR, __file__, 1, 'msg', None,
+                exc_info=__import__('sys').exc_info(),
+            )
+        data = json.loads(JsonFormatter().format(record))
+        assert 'KeyError' in data['exc']
@@ -0,0 +1,80 @@
+import urllib.request
+from http import HTTPStatus
+
+from homework_bot.metrics import Counter, Histogram, Registry
+from homework_bot.server import EmbeddedServer
+
+
+class TestMetrics:
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency', 'doc', buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value)
+        samples = histogram.samples()
+        assert samples == [
+            'homework_bot_latency_bucket{le="0.1"} 1',
+            'homework_bot_latency_bucket{le="1"} 3',
+            'homework_bot_latency_bucket{le="+Inf"} 4',
+            'homework_bot_latency_sum 6.05',
+            'homework_bot_latency_count 4',
+        ]
+
+    def test_histogram_timer(self):
+        histogram = Histogram('latency', 'doc')
+        with histogram.time():
+            pass
+        assert histogram.count() == 1
+
+    def test_counter_labels(self):
+        counter = Counter('errors_total', 'doc', label='type')
+        counter.inc(label='KeyError')
+        counter.inc(label='KeyError')
+        counter.inc(label='TypeError')
+        assert counter.samples() == [
+            'homework_bot_errors_total{type="KeyError"} 2',
+            'homework_bot_errors_total{type="TypeError"} 1',
+        ]
+
+    def test_registry_render(self):
+        registry = Registry()
+        registry.register(Counter('sent_total', 'Отправлено.'))
+        registry.gauge('depth', 'Глубина.', lambda: 7)
+        text = registry.render()
+        assert '# TYPE homework_bot_sent_total counter' in text
+        assert 'homework_bot_sent_total 0' in text
+        assert 'homework_bot_depth 7' in text
+
+    def test_computed_counter_type(self):
+        registry = Registry()
+        registry.counter('hits_total', 'Попадания.', lambda: 5)
+        text = registry.render()
+        assert '# TYPE homework_bot_hits_total counter' in text, (
+            'Накопительные значения должны экспортироваться счётчиком'
+        )
+        assert 'homework_bot_hits_total 5' in text
+
+
+class TestEmbeddedServer:
+
+    def test_metrics_endpoint(self):
+        registry = Registry()
+        registry.gauge('depth', 'Глубина.', lambda: 3)
+        server = EmbeddedServer(host='127.0.0.1')
+        server.route('GET', '/metrics', lambda body: (
+            HTTPStatus.OK, 'text/plain', registry.render().encode()
+        ))
+        server.start()
+        try:
+            url = f'http://127.0.0.1:{server.port}/metrics'
+            with urllib.request.urlopen(url) as response:
+                assert response.status == 200
+                assert b'homework_bot_depth 3' in response.read()
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{server.port}/x')
+            except urllib.error.HTTPError as error:
+                assert error.code == 404
+            else:
+                assert False, 'Неизвестный путь должен отвечать 404'
+        finally:
+            server.stop()
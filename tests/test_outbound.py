@@ -0,0 +1,92 @@
+import threading
+import time
+
+import telegram
+
+from homework_bot.outbound import OutboundQueue, TokenBucket
+
+
+class RateLimitedBot:
+    """Бот, запоминающий время отправок; с `retry_after` - RetryAfter."""
+
+    def __init__(self, retry_after=None):
+        self.sent = []
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.retry_after is not None:
+            retry_after, self.retry_after = self.retry_after, None
+            raise telegram.error.RetryAfter(retry_after)
+        with self.lock:
+            self.sent.append((time.monotonic(), chat_id, text))
+
+
+class TestTokenBucket:
+
+    def test_rate(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0)
+        assert bucket.wait_time(0) == 0
+        bucket.take(0)
+        bucket.take(0)
+        assert bucket.wait_time(0) == 0.5
+        assert bucket.wait_time(0.5) == 0
+
+
+class TestOutboundQueue:
+
+    def test_put_does_not_block(self):
+        queue = OutboundQueue(RateLimitedBot())
+        started = time.monotonic()
+        for i in range(1000):
+            queue.put(i % 10, 'text')
+        assert time.monotonic() - started < 0.5
+        assert queue.depth() == 1000
+
+    def test_all_messages_are_delivered_in_order(self):
+        bot = RateLimitedBot()
+        queue = OutboundQueue(bot, global_rate=1000, chat_rate=1000,
+                              chat_burst=1000)
+        queue.start()
+        for i in range(100):
+            queue.put(i % 3, str(i))
+        assert queue.stop(timeout=5) == 0
+        assert len(bot.sent) == 100
+        for chat_id in range(3):
+            texts = [int(text) for _, chat, text in bot.sent
+                     if chat == chat_id]
+            assert texts == sorted(texts), (
+                'Сообщения одного чата должны уходить по порядку'
+            )
+        assert queue.stats()['sent'] == 100
+
+    def test_per_chat_limit(self):
+        bot = RateLimitedBot()
+        queue = OutboundQueue(bot, global_rate=1000, chat_rate=20,
+                              chat_burst=1)
+        queue.start()
+        for _ in range(5):
+            queue.put(1, 'slow')
+        queue.put(2, 'fast')
+        queue.stop(timeout=5)
+        slow = [sent_at for sent_at, chat, _ in bot.sent if chat == 1]
+        fast = [sent_at for sent_at, chat, _ in bot.sent if chat == 2]
+        assert slow[-1] - slow[0] >= 4 / 20 * 0.9, (
+            'Проверьте ограничение скорости отправки в один чат'
+        )
+        assert fast[0] < slow[-1], (
+            'Лимит одного чата не должен задерживать другие'
+        )
+
+    def test_retry_after_is_honored(self):
+        bot = RateLimitedBot(retry_after=0.2)
+        queue = OutboundQueue(bot)
+        queue.start()
+        started = time.monotonic()
+        queue.put(1, 'text')
+        queue.stop(timeout=5)
+        assert len(bot.sent) == 1, (
+            'Сообщение после RetryAfter должно быть отправлено повторно'
+        )
+        assert bot.sent[0][0] - started >= 0.2
+        assert queue.stats()['retries'] == 1
@@ -0,0 +1,249 @@
+import sqlite3
+import threading
+import time
+
+import telegram
+
+from homework_bot.outbound import OutboundQueue
+from homework_bot.outbox import Outbox, main, notification_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyBot:
+    """Бот, который первые `failures` отправок завершает ошибкой `error`."""
+
+    def __init__(self, failures=0, error=telegram.error.NetworkError):
+        self.failures = failures
+        self.error = error
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise self.error('boom')
+        self.sent.append((chat_id, text))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestOutbox:
+
+    def test_delivered_key_is_not_added_again(self, tmp_path):
+        outbox = Outbox(tmp_path / 'state.db')
+        assert outbox.add('key', 1, 'text')
+        assert not outbox.add('key', 1, 'text'), (
+            'Ожидающее сообщение не должно добавляться второй раз'
+        )
+        outbox.delivered('key')
+        assert not outbox.add('key', 1, 'text'), (
+            'Доставленное сообщение не должно добавляться второй раз'
+        )
+        assert len(outbox) == 0
+
+    def test_exponential_backoff_and_dead_letters(self, tmp_path):
+        clock = Clock()
+        outbox = Outbox(
+            tmp_path / 'state.db', max_attempts=4, base_delay=5, clock=clock
+        )
+        outbox.add('key', 1, 'text')
+        delays = [outbox.failed('key') for _ in range(4)]
+        assert delays == [5, 10, 20, None], (
+            'Задержка повтора должна расти экспоненциально'
+        )
+        assert outbox.stats() == {'pending': 0, 'dead': 1}
+
+        assert outbox.replay(dead=True) == 1
+        assert outbox.due(10) == [('key', 1, 'text')], (
+            'replay --dead должен вернуть сообщение к отправке'
+        )
+
+    def test_due_respects_schedule_and_lease(self, tmp_path):
+        clock = Clock()
+        outbox = Outbox(tmp_path / 'state.db', base_delay=5, clock=clock)
+        outbox.add('key', 1, 'text')
+        assert outbox.due(10) == [], (
+            'Сообщение в очереди в памяти не должно выдаваться повторно'
+        )
+        outbox.failed('key')
+        assert outbox.due(10) == []
+        clock.now += 5
+        assert outbox.due(10) == [('key', 1, 'text')]
+        assert outbox.due(10) == [], 'Выданное сообщение арендуется'
+
+    def test_recover_after_restart(self, tmp_path):
+        Outbox(tmp_path / 'state.db').add('key', 1, 'text')
+        outbox = Outbox(tmp_path / 'state.db')
+        assert outbox.recover() == 1
+        assert outbox.due(10) == [('key', 1, 'text')]
+
+    def test_expired_lease_is_reclaimed(self, tmp_path):
+        clock = Clock()
+        crashed = Outbox(tmp_path / 'state.db', lease_timeout=300,
+                         owner='crashed', clock=clock)
+        alive = Outbox(tmp_path / 'state.db', lease_timeout=300,
+                       owner='alive', clock=clock)
+        crashed.add('key', 1, 'text')
+        clock.now += 299
+        assert alive.due(10) == [], 'Действующая аренда не снимается'
+        clock.now += 1
+        assert alive.due(10) == [('key', 1, 'text')], (
+            'Сообщения упавшего воркера должны отправляться без перезапуска'
+        )
+        assert crashed.renew() == 0, (
+            'Забранное сообщение не должно продлеваться прежним владельцем'
+        )
+
+    def test_renewed_lease_is_kept(self, tmp_path):
+        clock = Clock()
+        owner = Outbox(tmp_path / 'state.db', lease_timeout=300, clock=clock)
+        other = Outbox(tmp_path / 'state.db', lease_timeout=300, clock=clock)
+        owner.add('key', 1, 'text')
+        for _ in range(3):
+            clock.now += 200
+            assert owner.renew() == 1
+        assert other.due(10) == [], (
+            'Продлённая аренда не должна забираться другим процессом'
+        )
+
+    def test_database_without_lease_columns(self, tmp_path):
+        db = sqlite3.connect(tmp_path / 'state.db')
+        db.execute(
+            'CREATE TABLE outbox (key TEXT PRIMARY KEY, chat_id NOT NULL, '
+            'text TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+            'next_attempt REAL NOT NULL, created REAL NOT NULL, '
+            'leased INTEGER NOT NULL DEFAULT 1, '
+            'dead INTEGER NOT NULL DEFAULT 0)'
+        )
+        db.execute("INSERT INTO outbox (key, chat_id, text, next_attempt, "
+                   "created) VALUES ('old', 1, 'text', 0, 0)")
+        db.commit()
+        db.close()
+        outbox = Outbox(tmp_path / 'state.db')
+        assert outbox.due(10) == [('old', 1, 'text')], (
+            'База прежней версии должна дополняться столбцами аренды'
+        )
+        outbox.add('new', 1, 'text')
+        assert len(outbox) == 2
+
+    def test_disk_use_is_bounded(self, tmp_path):
+        clock = Clock()
+        outbox = Outbox(
+            tmp_path / 'state.db', max_pending=10, max_delivered=100,
+            clock=clock,
+        )
+        for i in range(50):
+            clock.now += 1
+            outbox.add(f'key{i}', 1, 'text')
+        assert len(outbox) == 10, 'Число сообщений должно быть ограничено'
+        assert outbox.recover() == 10
+        assert [row[0] for row in outbox.due(1)] == ['key40'], (
+            'Вытесняться должны самые старые сообщения'
+        )
+
+        for i in range(500):
+            outbox.delivered(f'sent{i}')
+        count = outbox._db.execute('SELECT COUNT(*) FROM delivered')
+        assert count.fetchone()[0] <= 110, (
+            'Число ключей доставленных сообщений должно быть ограничено'
+        )
+
+    def test_notification_key(self):
+        work = {'homework_name': 'hw', 'status': 'approved',
+                'date_updated': '2022-01-01T10:00:00Z'}
+        assert notification_key('a', work) == notification_key('a', work)
+        assert notification_key('a', work) != notification_key('b', work)
+        assert notification_key('a', work) != notification_key(
+            'a', dict(work, status='rejected')
+        )
+
+    def test_cli(self, tmp_path, capsys):
+        outbox = Outbox(tmp_path / 'state.db', max_attempts=1)
+        outbox.add('key', 1, 'text')
+        outbox.failed('key')
+        main([str(tmp_path / 'state.db'), 'list', '--dead'])
+        assert 'key chat=1 attempts=1' in capsys.readouterr().out
+        main([str(tmp_path / 'state.db'), 'replay', '--dead'])
+        assert Outbox(tmp_path / 'state.db').stats()['pending'] == 1
+
+
+class TestOutboundWithOutbox:
+
+    def make_queue(self, bot, outbox):
+        queue = OutboundQueue(
+            bot, chat_burst=100, outbox=outbox, retry_interval=0.05
+        )
+        queue.start()
+        return queue
+
+    def test_failed_send_is_retried_once_delivered(self, tmp_path):
+        bot = FlakyBot(failures=2)
+        outbox = Outbox(tmp_path / 'state.db', base_delay=0.01)
+        queue = self.make_queue(bot, outbox)
+        queue.put(1, 'status', key='key')
+        assert wait_for(lambda: bot.sent), 'Сообщение должно быть дослано'
+        queue.put(1, 'status', key='key')
+        time.sleep(0.2)
+        queue.stop(5)
+        assert bot.sent == [(1, 'status')], (
+            'Повтор не должен дублировать доставленное сообщение'
+        )
+        assert len(outbox) == 0
+
+    def test_permanent_error_is_not_retried(self, tmp_path):
+        bot = FlakyBot(failures=1, error=telegram.error.BadRequest)
+        outbox = Outbox(tmp_path / 'state.db', base_delay=0.01)
+        queue = self.make_queue(bot, outbox)
+        queue.put(1, 'status')
+        time.sleep(0.2)
+        queue.stop(5)
+        assert bot.sent == []
+        assert outbox.stats() == {'pending': 0, 'dead': 1}
+
+    def test_unsent_messages_survive_restart(self, tmp_path):
+        outbox = Outbox(tmp_path / 'state.db', base_delay=60)
+        queue = self.make_queue(FlakyBot(failures=10), outbox)
+        for i in range(3):
+            queue.put(i, f'status{i}')
+        queue.stop(5)
+
+        outbox = Outbox(tmp_path / 'state.db')
+        outbox.recover()
+        outbox.replay()
+        bot = FlakyBot()
+        queue = self.make_queue(bot, outbox)
+        assert wait_for(lambda: len(bot.sent) == 3), (
+            'Недоставленные сообщения должны отправляться после перезапуска'
+        )
+        queue.stop(5)
+
+    def test_stop_counts_message_being_sent(self, tmp_path):
+        release = threading.Event()
+        bot = FlakyBot()
+        send = bot.send_message
+        bot.send_message = lambda **kwargs: release.wait(5) and send(**kwargs)
+        outbox = Outbox(tmp_path / 'state.db')
+        queue = self.make_queue(bot, outbox)
+        queue.put(1, 'status', key='key')
+        assert wait_for(lambda: queue.depth() == 0)
+        assert queue.stop(0.1) == 1, (
+            'Отправляемое сообщение считается неотправленным'
+        )
+        assert queue.alive()
+        release.set()
+        assert wait_for(lambda: not queue.alive())
+        assert bot.sent == [(1, 'status')]
+        assert len(outbox) == 0, (
+            'Доставка, завершившаяся после stop, отмечается в outbox'
+        )
@@ -0,0 +1,254 @@
+import threading
+
+import requests
+from mocks import MockResponse, make_poller
+
+from homework_bot.accounts import Account
+from homework_bot.fingerprint import ResponseCache
+from homework_bot.metrics import ITEM_ERRORS, REFETCHES
+from homework_bot.scheduler import CHANGED, ERROR, IDLE
+from homework_bot.status_index import StatusIndex
+from homework_bot.storage import StateStore
+
+
+class TestPoller:
+
+    def test_status_is_sent_once(self, monkeypatch):
+        data = {
+            'homeworks': [{
+                'homework_name': 'hw1',
+                'status': 'reviewing',
+                'date_updated': '2022-01-01T10:00:00Z',
+            }],
+            'current_date': 200,
+        }
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse(data)
+        )
+        sent = []
+        store = StateStore(':memory:')
+        poller = make_poller(sent, store)
+        account = Account('token', 42, from_date=100)
+
+        assert poller(account) == CHANGED
+        assert poller(account) == IDLE
+        assert len(sent) == 1, (
+            'Проверьте, что неизменившийся статус не отправляется повторно'
+        )
+        assert account.status == 'reviewing'
+        assert account.from_date == 200
+        assert store.load_cursors() == {account.key: 200}
+
+        data['homeworks'][0]['status'] = 'approved'
+        poller(account)
+        assert len(sent) == 2
+        assert sent[-1][0] == 42
+
+    def test_error_is_sent_once(self, monkeypatch):
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse({})
+        )
+        sent = []
+        poller = make_poller(sent, StateStore(':memory:'))
+        account = Account('token', 42, from_date=100)
+
+        assert poller(account) == ERROR
+        poller(account)
+        assert len(sent) == 1, (
+            'Проверьте, что одинаковая ошибка отправляется один раз'
+        )
+        assert account.from_date == 100
+
+    def test_bad_item_does_not_block_batch(self, monkeypatch):
+        data = {
+            'homeworks': [
+                {'homework_name': 'hw1', 'status': 'approved'},
+                {'homework_name': 'hw2', 'status': 'unknown'},
+                {'status': 'approved'},
+                {'homework_name': 'hw4', 'status': 'rejected'},
+            ],
+            'current_date': 200,
+        }
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse(data)
+        )
+        sent = []
+        poller = make_poller(sent, StateStore(':memory:'))
+        account = Account('token', 42, from_date=100)
+        item_errors = ITEM_ERRORS.value('KeyError')
+        refetches = REFETCHES.value()
+
+        assert poller(account) == CHANGED
+        texts = [text for _, text in sent]
+        assert sum('hw1' in text or 'hw4' in text for text in texts) == 2, (
+            'Проверьте, что исправные работы отправляются, даже если '
+            'другие работы ответа не удалось разобрать'
+        )
+        assert len(sent) == 3, (
+            'Проверьте, что ошибки одного класса отправляются одним сообщением'
+        )
+        assert account.from_date == 200, (
+            'Проверьте, что курсор сдвигается несмотря на ошибки в работах'
+        )
+        assert ITEM_ERRORS.value('KeyError') - item_errors == 2
+
+        poller(account)
+        assert len(sent) == 3
+        assert REFETCHES.value() == refetches, (
+            'Ошибки в отдельных работах не должны вызывать повторный запрос'
+        )
+
+    def test_failed_poll_counts_refetch(self, monkeypatch):
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse({})
+        )
+        poller = make_poller([], StateStore(':memory:'))
+        refetches = REFETCHES.value()
+        poller(Account('token', 42, from_date=100))
+        assert REFETCHES.value() - refetches == 1
+
+    def test_flapping_error_is_not_resent(self, monkeypatch):
+        answers = iter([{}, {'homeworks': [], 'current_date': 200}] * 5)
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: MockResponse(next(answers)),
+        )
+        sent = []
+        poller = make_poller(sent, StateStore(':memory:'))
+        account = Account('token', 42, from_date=100)
+
+        for _ in range(10):
+            poller(account)
+        assert len(sent) == 1, (
+            'Проверьте, что ошибка, чередующаяся с успехом, '
+            'отправляется один раз'
+        )
+
+    def test_unchanged_body_is_not_parsed(self, monkeypatch):
+        data = {
+            'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+            'current_date': 200,
+        }
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse(data)
+        )
+        sent = []
+        poller = make_poller(sent, StateStore(':memory:'))
+        checked = []
+        check = poller.check
+        poller.check = lambda response: checked.append(1) or check(response)
+        account = Account('token', 42, from_date=100)
+
+        poller(account)
+        data['current_date'] = 300
+        poller(account)
+        assert len(checked) == 1, (
+            'Неизменившийся ответ не должен проверяться повторно'
+        )
+        assert account.from_date == 300
+        assert poller.cache.stats() == {'hits': 1, 'misses': 1}
+
+        data['homeworks'][0]['status'] = 'rejected'
+        poller(account)
+        assert len(checked) == 2
+        assert len(sent) == 2
+
+    def test_backfill_is_streamed(self, monkeypatch):
+        data = {
+            'homeworks': [
+                {'homework_name': f'hw{i}', 'status': 'approved'}
+                for i in range(3)
+            ],
+            'current_date': 500,
+        }
+        params = []
+
+        def mock_get(*args, **kwargs):
+            params.append((kwargs['params'], kwargs.get('stream')))
+            return MockResponse(data)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        sent = []
+        poller = make_poller(sent, StateStore(':memory:'))
+        account = Account('token', 42, from_date=0)
+
+        assert poller(account) == CHANGED
+        assert params == [({'from_date': 0}, True)], (
+            'Первичная загрузка должна запрашивать всю историю потоково'
+        )
+        assert len(sent) == 3
+        assert account.from_date == 500
+
+
+class TestResponseCache:
+
+    def test_fingerprint_ignores_current_date(self):
+        first = b'{"homeworks": [], "current_date": 1000}'
+        second = b'{"homeworks": [], "current_date": 2000}'
+        other = b'{"homeworks": [{}], "current_date": 1000}'
+        cache = ResponseCache()
+        assert cache.fingerprint(first) == cache.fingerprint(second)
+        assert cache.fingerprint(first) != cache.fingerprint(other)
+        assert cache.current_date(second) == 2000
+
+
+class TestStatusIndex:
+
+    def homework(self, name, status, date='2022-01-01T10:00:00Z'):
+        return {'homework_name': name, 'status': status, 'date_updated': date}
+
+    def test_detects_transitions(self):
+        index = StatusIndex(StateStore(':memory:'))
+        work = self.homework('hw', 'rejected')
+        assert index.changed('acc', work)
+        index.update('acc', work)
+        assert not index.changed('acc', work)
+        assert index.changed('acc', self.homework('hw', 'reviewing'))
+        assert index.changed(
+            'acc', self.homework('hw', 'rejected', '2022-01-02T10:00:00Z')
+        ), 'Повторное отклонение с новой датой - это новое событие'
+
+    def test_finished_works_are_evicted_first(self):
+        index = StatusIndex(StateStore(':memory:'), max_size=3)
+        index.update('acc', self.homework('done', 'approved'))
+        index.update('acc', self.homework('a', 'reviewing'))
+        index.update('acc', self.homework('b', 'reviewing'))
+        index.update('acc', self.homework('c', 'rejected'))
+        assert len(index) == 3
+        assert index._get(('acc', 'done')) is None
+        assert index._get(('acc', 'a')) is not None
+
+    def test_evicted_entry_is_loaded_from_store(self):
+        store = StateStore(':memory:')
+        index = StatusIndex(store, max_size=1)
+        first = self.homework('a', 'reviewing')
+        index.update('acc', first)
+        index.update('acc', self.homework('b', 'reviewing'))
+        assert not index.changed('acc', first), (
+            'Вытесненная запись должна подгружаться из хранилища'
+        )
+
+    def test_shared_between_threads(self):
+        index = StatusIndex(StateStore(':memory:'), max_size=50)
+        errors = []
+
+        def work(thread):
+            try:
+                for i in range(2000):
+                    homework = self.homework(
+                        f'hw{i % 200}', ('approved', 'reviewing')[i % 2]
+                    )
+                    index.changed(f'acc{thread}', homework)
+                    index.update(f'acc{thread}', homework)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [
+            threading.Thread(target=work, args=(i,)) for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == [], 'Индекс должен работать из нескольких потоков'
+        assert len(index) <= 50
@@ -0,0 +1,154 @@
+import json
+import os
+import pstats
+import signal
+import threading
+import tracemalloc
+
+from homework_bot.accounts import Account
+from homework_bot.profiling import (
+    PROFILE_SUFFIX,
+    SIGNAL,
+    SNAPSHOT_SUFFIX,
+    Profiler,
+)
+
+
+class Engine:
+
+    def __init__(self, poll):
+        self.poll = poll
+
+
+def poll(account):
+    return sum(range(1000))
+
+
+def files(directory, suffix):
+    return sorted(f for f in os.listdir(directory) if f.endswith(suffix))
+
+
+class TestProfiler:
+
+    def test_disabled_profiler_leaves_poll_untouched(self, tmp_path):
+        engine = Engine(poll)
+        profiler = Profiler(engine, str(tmp_path / 'profiles'))
+        assert engine.poll is poll, (
+            'Выключенный профилировщик не должен оборачивать опрос'
+        )
+        profiler.enable()
+        assert engine.poll is not poll
+        profiler.disable()
+        assert engine.poll is poll, (
+            'После выключения движок должен вызывать опрос напрямую'
+        )
+        assert not tracemalloc.is_tracing()
+
+    def test_cycle_profiles_are_dumped(self, tmp_path):
+        engine = Engine(poll)
+        profiler = Profiler(engine, str(tmp_path))
+        profiler.enable()
+        try:
+            assert engine.poll(Account('token', 1)) == sum(range(1000))
+        finally:
+            profiler.disable()
+        profiles = files(tmp_path, PROFILE_SUFFIX)
+        assert len(profiles) == 1, 'Профиль цикла должен сохраняться'
+        stats = pstats.Stats(str(tmp_path / profiles[0]))
+        assert any(name == 'poll' for _, _, name in stats.stats), (
+            'В профиле должна быть функция опроса'
+        )
+        assert len(files(tmp_path, SNAPSHOT_SUFFIX)) == 1, (
+            'При выключении должен сохраняться снимок памяти'
+        )
+
+    def test_snapshots_follow_interval(self, tmp_path):
+        now = [0]
+        engine = Engine(poll)
+        profiler = Profiler(
+            engine, str(tmp_path), snapshot_interval=60,
+            clock=lambda: now[0],
+        )
+        profiler.enable()
+        try:
+            for _ in range(3):
+                engine.poll(Account('token', 1))
+                now[0] += 40
+        finally:
+            tracemalloc.stop()
+        assert profiler.snapshots == 1, (
+            'Снимок памяти должен сниматься раз в snapshot_interval'
+        )
+
+    def test_retention_is_bounded(self, tmp_path):
+        engine = Engine(poll)
+        for number in range(2):
+            (tmp_path / f'0{number}-old{PROFILE_SUFFIX}').write_bytes(b'')
+        profiler = Profiler(engine, str(tmp_path), keep=3)
+        profiler.enable()
+        try:
+            for _ in range(5):
+                engine.poll(Account('token', 1))
+        finally:
+            profiler.disable()
+        profiles = files(tmp_path, PROFILE_SUFFIX)
+        assert len(profiles) == 3, 'Должно храниться не больше keep профилей'
+        assert not any('old' in name for name in profiles), (
+            'Удаляться должны самые старые профили'
+        )
+
+    def test_one_cycle_is_profiled_at_a_time(self, tmp_path):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_poll(account):
+            if account.token == 'first':
+                started.set()
+                release.wait(5)
+
+        engine = Engine(slow_poll)
+        profiler = Profiler(engine, str(tmp_path))
+        profiler.enable()
+        thread = threading.Thread(
+            target=engine.poll, args=(Account('first', 1),)
+        )
+        thread.start()
+        started.wait(5)
+        engine.poll(Account('second', 1))
+        release.set()
+        thread.join()
+        profiler.disable()
+        assert profiler.profiles == 1, (
+            'Параллельные циклы не должны профилироваться одновременно'
+        )
+
+    def test_signal_toggles_profiling(self, tmp_path):
+        previous = signal.getsignal(SIGNAL)
+        engine = Engine(poll)
+        profiler = Profiler(engine, str(tmp_path))
+        try:
+            profiler.install()
+            os.kill(os.getpid(), SIGNAL)
+            assert profiler.enabled, 'Сигнал должен включать профилирование'
+            os.kill(os.getpid(), SIGNAL)
+            assert not profiler.enabled, (
+                'Повторный сигнал должен выключать профилирование'
+            )
+        finally:
+            signal.signal(SIGNAL, previous)
+            profiler.disable()
+
+    def test_control_command(self, tmp_path):
+        import homework
+
+        profiler = Profiler(Engine(poll), str(tmp_path))
+        status, _, body = homework.profile_command(profiler, b'on')
+        assert status == 200 and json.loads(body)['enabled']
+        status, _, body = homework.profile_command(profiler, b'status')
+        assert json.loads(body)['enabled']
+        status, _, body = homework.profile_command(profiler, b'')
+        assert not json.loads(body)['enabled'], (
+            'Пустая команда должна переключать профилирование'
+        )
+        status, _, _ = homework.profile_command(profiler, b'restart')
+        assert status == 400
@@ -0,0 +1,187 @@
+import gzip
+import json
+
+from mocks import MockResponse, make_poller
+
+from benchmarks.replay import replay
+from homework_bot.accounts import Account
+from homework_bot.recording import (ANSWER, MESSAGE, Recorder, RecordingBot,
+                                    RecordingClient, ReplayBot, ReplayClient,
+                                    Replayer, read_recording)
+from homework_bot.storage import StateStore
+
+
+class ScriptedApi:
+
+    def __init__(self, answers, response=MockResponse):
+        self.answers = list(answers)
+        self.response = response
+
+    def get(self, url=None, headers=None, params=None, **kwargs):
+        return self.response(self.answers.pop(0))
+
+
+def homeworks(*statuses):
+    return {
+        'homeworks': [
+            {'homework_name': f'hw{i}.zip', 'status': status,
+             'date_updated': f'2022-02-1{i}T10:00:00Z'}
+            for i, status in enumerate(statuses)
+        ],
+        'current_date': 100,
+    }
+
+
+def record(path, monkeypatch, answers, token='secret'):
+    import homework
+
+    recorder = Recorder(path)
+    account = Account(token, '42', from_date=1)
+    recorder.accounts([account])
+    monkeypatch.setattr(
+        homework, 'http_client',
+        RecordingClient(ScriptedApi(answers), recorder)
+    )
+    bot = RecordingBot(ReplayBot(), recorder)
+    sent = []
+    store = StateStore(':memory:')
+    poller = make_poller(sent, store)
+    poller.notify = lambda chat_id, text, key=None: bot.send_message(
+        chat_id=chat_id, text=text
+    )
+    for _ in answers:
+        poller(account)
+    recorder.close()
+    store.close()
+    return account, bot.bot.sent
+
+
+class TestRecording:
+
+    def test_token_is_not_recorded(self, tmp_path, monkeypatch):
+        path = tmp_path / 'traffic.jsonl.gz'
+        account, _ = record(path, monkeypatch, [homeworks('approved')])
+        with gzip.open(path, 'rt') as file:
+            content = file.read()
+        assert 'secret' not in content, (
+            'Токен аккаунта не должен попадать в запись'
+        )
+        assert account.key in content, (
+            'Аккаунт в записи должен обозначаться ключом'
+        )
+
+    def test_answers_and_messages_are_recorded(self, tmp_path, monkeypatch):
+        path = tmp_path / 'traffic.jsonl.gz'
+        answers = [homeworks('reviewing'), homeworks('approved')]
+        _, sent = record(path, monkeypatch, answers)
+        events = list(read_recording(path))
+        recorded = [e for e in events if e[0] == ANSWER]
+        assert [json.loads(e[-1]) for e in recorded] == answers, (
+            'Ответы API должны записываться целиком и по порядку'
+        )
+        assert recorded[0][3] == 1 and recorded[1][3] == 100, (
+            'Для ответа должен записываться from_date запроса'
+        )
+        assert [tuple(e[2:]) for e in events if e[0] == MESSAGE] == sent, (
+            'Отправленные сообщения должны записываться'
+        )
+
+
+class TestReplay:
+
+    def test_replay_sends_recorded_messages(self, tmp_path, monkeypatch):
+        path = tmp_path / 'traffic.jsonl.gz'
+        answers = [
+            homeworks('reviewing'), homeworks('reviewing'),
+            homeworks('approved', 'rejected'),
+        ]
+        _, sent = record(path, monkeypatch, answers)
+        assert len(sent) == 3
+
+        stats, replayed, recorded = replay(path, speed=0)
+        assert replayed == recorded == sent, (
+            'Воспроизведение должно отправить те же сообщения, что и запись'
+        )
+        assert stats['polls'] == len(answers)
+
+    def test_speed_scales_pauses(self):
+        events = [
+            ['c', 0, 'k', '1'],
+            [ANSWER, 0, 'k', 1, 200, '{}'],
+            [ANSWER, 10, 'k', 1, 200, '{}'],
+            [ANSWER, 30, 'k', 1, 200, '{}'],
+        ]
+        now = [0]
+        sleeps = []
+
+        def sleep(delay):
+            sleeps.append(delay)
+            now[0] += delay
+
+        replayer = Replayer(
+            events, ReplayClient(), lambda account: None, speed=10,
+            clock=lambda: now[0], sleep=sleep,
+        )
+        assert replayer.run()['polls'] == 3
+        assert sleeps == [1, 2], (
+            'Паузы между ответами должны сокращаться в `speed` раз'
+        )
+
+    def test_client_returns_answers_per_account(self):
+        client = ReplayClient()
+        client.push('a', 200, '{"homeworks": [], "current_date": 1}')
+        client.push('b', 500, 'error')
+        headers = {'Authorization': 'OAuth b'}
+        assert client.get(headers=headers).status_code == 500
+        assert client.get(headers=headers).json() == {
+            'homeworks': [], 'current_date': 0
+        }, 'Без записанных ответов должен отдаваться пустой ответ'
+        assert client.get(
+            headers={'Authorization': 'OAuth a'}
+        ).json()['current_date'] == 1
+
+
+class StreamedResponse(MockResponse):
+    """Потоковый ответ, который нельзя прочитать целиком."""
+
+    closed = False
+
+    @property
+    def content(self):
+        raise AssertionError('Потоковый ответ нельзя читать целиком')
+
+    def iter_content(self, chunk_size):
+        body = json.dumps(self.data, ensure_ascii=False).encode()
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class TestRecordedStream:
+
+    def test_streamed_body_is_recorded_by_chunks(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl.gz'
+        answer = {'homeworks': [{'homework_name': 'работа.zip'}] * 100,
+                  'current_date': 100}
+        recorder = Recorder(path)
+        client = RecordingClient(
+            ScriptedApi([answer], StreamedResponse), recorder
+        )
+        response = client.get(
+            'url', headers={'Authorization': 'OAuth secret'},
+            params={'from_date': 0}, stream=True,
+        )
+        body = b''.join(response.iter_content(7))
+        response.close()
+        recorder.close()
+
+        assert json.loads(body) == answer
+        assert response.response.closed
+        events = list(read_recording(path))
+        assert len(events) == 1, 'Ответ записывается один раз'
+        assert events[0][2:5] == [Account('secret', None).key, 0, 200]
+        assert json.loads(events[0][-1]) == answer, (
+            'Тело потокового ответа должно записываться целиком'
+        )
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+from homework_bot.accounts import Account
+from homework_bot.engine import PollingEngine
+from homework_bot.homework_cache import HomeworkCache
+from homework_bot.metrics import RELOAD_LATENCY
+from homework_bot.reload import AccountsWatcher, diff_accounts
+from homework_bot.scheduler import FixedPolicy
+from homework_bot.storage import StateStore
+
+
+def write_accounts(path, accounts):
+    # Запись через rename, как её делают редакторы и системы деплоя.
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as file:
+        json.dump(
+            [{'token': token, 'chat_id': chat} for token, chat in accounts],
+            file,
+        )
+    os.replace(tmp, path)
+
+
+class Recorder:
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, added, removed, updated):
+        self.calls.append((
+            sorted(a.token for a in added),
+            sorted(a.token for a in removed),
+            sorted((a.token, a.chat_id, chat) for a, chat in updated),
+        ))
+
+
+class TestDiff:
+
+    def test_added_removed_updated(self):
+        current = {a.key: a for a in [Account('a', 1), Account('b', 2)]}
+        added, removed, updated = diff_accounts(
+            current, [Account('b', 3), Account('c', 4)]
+        )
+        assert [a.token for a in added] == ['c']
+        assert [a.token for a in removed] == ['a']
+        assert [(a.token, chat) for a, chat in updated] == [('b', 3)]
+
+
+class TestAccountsWatcher:
+
+    def test_changes_are_applied_as_diff(self, tmp_path):
+        path = str(tmp_path / 'accounts.json')
+        write_accounts(path, [('a', 1), ('b', 2)])
+        accounts = [Account('a', 1), Account('b', 2)]
+        apply = Recorder()
+        watcher = AccountsWatcher(path, accounts, apply)
+        assert not watcher.check(), 'Без изменений файла нечего применять'
+
+        write_accounts(path, [('a', 1), ('b', 5), ('c', 3)])
+        assert watcher.check()
+        assert apply.calls == [(['c'], [], [('b', 5, 2)])], (
+            'Должна применяться разница: новый аккаунт и смена чата'
+        )
+        assert watcher.accounts[accounts[0].key] is accounts[0], (
+            'Неизменённые аккаунты должны остаться теми же объектами'
+        )
+        assert accounts[1].chat_id == 5, 'Чат меняется в самом аккаунте'
+
+        write_accounts(path, [('c', 3)])
+        assert watcher.check()
+        assert apply.calls[-1] == ([], ['a', 'b'], [])
+        assert len(watcher.accounts) == 1
+
+    def test_broken_file_keeps_accounts(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        write_accounts(str(path), [('a', 1)])
+        apply = Recorder()
+        watcher = AccountsWatcher(str(path), [Account('a', 1)], apply)
+        path.write_text('[{"token": "b"')
+        assert not watcher.check()
+        assert not apply.calls, 'Файл с ошибкой не должен применяться'
+        assert len(watcher.accounts) == 1
+
+    def test_reload_latency_is_reported(self, tmp_path):
+        path = str(tmp_path / 'accounts.json')
+        write_accounts(path, [('a', 1)])
+        applied = threading.Event()
+        watcher = AccountsWatcher(
+            path, [Account('a', 1)], lambda *diff: applied.set(),
+            interval=0.05,
+        )
+        count = RELOAD_LATENCY.count()
+        watcher.start()
+        try:
+            started = time.monotonic()
+            write_accounts(path, [('a', 1), ('b', 2)])
+            assert applied.wait(5), 'Изменение файла должно примениться'
+            assert time.monotonic() - started < 1
+        finally:
+            watcher.stop()
+        assert RELOAD_LATENCY.count() == count + 1, (
+            'Задержка применения должна попадать в метрику'
+        )
+
+
+class TestEngineReload:
+
+    def test_accounts_change_while_running(self):
+        polled = []
+        in_flight = threading.Event()
+        release = threading.Event()
+        old = Account('old', 1)
+        kept = Account('kept', 2)
+        new = Account('new', 3)
+
+        def poll(account):
+            polled.append(account.token)
+            if account is old:
+                in_flight.set()
+                release.wait(5)
+
+        engine = PollingEngine(poll, FixedPolicy(0.02), concurrency=4)
+        engine.add_account(old)
+        engine.add_account(kept)
+
+        def reload():
+            in_flight.wait(5)
+            assert engine.remove_accounts([old.key]) == 1
+            engine.add_account(new)
+            release.set()
+            time.sleep(0.3)
+            engine.stop()
+
+        thread = threading.Thread(target=reload)
+        thread.start()
+        asyncio.run(asyncio.wait_for(engine.run(), 10))
+        thread.join()
+
+        assert polled.count('old') == 1, (
+            'Убранный аккаунт не должен опрашиваться после текущего опроса'
+        )
+        assert polled.count('kept') > 2, (
+            'Опросы неизменённых аккаунтов не должны прерываться'
+        )
+        assert 'new' in polled, 'Добавленный аккаунт должен опрашиваться'
+        assert old not in engine.accounts()
+
+
+class TestHomeworkCacheRebind:
+
+    def test_unregister_previous_chat(self):
+        cache = HomeworkCache(StateStore(':memory:'))
+        account = Account('token', 1)
+        cache.register(account)
+        cache.update(account, {'homework_name': 'hw', 'status': 'approved'})
+        account.chat_id = 2
+        cache.unregister(account, 1)
+        cache.register(account)
+        assert cache.history(1) == [], (
+            'Прежний чат не должен видеть данные аккаунта'
+        )
+        assert cache._accounts == {'2': account.key}
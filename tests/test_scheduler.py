@@ -0,0 +1,58 @@
+import random
+
+from homework_bot.accounts import Account
+from homework_bot.scheduler import (CHANGED, ERROR, IDLE, AdaptivePolicy,
+                                    FixedPolicy)
+
+
+class TestFixedPolicy:
+
+    def test_constant_interval(self):
+        policy = FixedPolicy(600)
+        account = Account('token', 1)
+        for outcome in (CHANGED, IDLE, ERROR):
+            assert policy.next_delay(account, outcome) == 600
+
+    def test_initial_polls_are_spread(self):
+        policy = FixedPolicy(600)
+        delays = [policy.initial_delay(i, 100) for i in range(100)]
+        assert delays[0] == 0
+        assert max(delays) < 600
+        assert len(set(delays)) == 100, (
+            'Первые опросы аккаунтов не должны совпадать по времени'
+        )
+
+
+class TestAdaptivePolicy:
+
+    def policy(self):
+        return AdaptivePolicy(
+            600, reviewing_interval=60, idle_interval=1800, idle_after=3,
+            backoff_base=10, backoff_max=100, rng=random.Random(0),
+        )
+
+    def test_reviewing_is_polled_more_often(self):
+        policy = self.policy()
+        account = Account('token', 1)
+        account.status = 'reviewing'
+        assert policy.next_delay(account, CHANGED) <= 60 * 1.1
+
+    def test_exponential_backoff_on_errors(self):
+        policy = self.policy()
+        account = Account('token', 1)
+        delays = [policy.next_delay(account, ERROR) for _ in range(6)]
+        for attempt, delay in enumerate(delays):
+            limit = min(100, 10 * 2 ** attempt)
+            assert limit / 2 <= delay <= limit, (
+                'Задержка после ошибок должна расти экспоненциально'
+            )
+        policy.next_delay(account, IDLE)
+        assert account.failures == 0
+
+    def test_idle_accounts_slow_down(self):
+        policy = self.policy()
+        account = Account('token', 1)
+        delays = [policy.next_delay(account, IDLE) for _ in range(4)]
+        assert delays[0] <= 600 * 1.1
+        assert delays[-1] >= 1800 * 0.9
+        assert policy.next_delay(account, CHANGED) <= 600 * 1.1
@@ -0,0 +1,178 @@
+import queue
+import threading
+import time
+
+from homework_bot.accounts import Account
+from homework_bot.sharding import HashRing, Supervisor, receive_changes
+
+
+def fake_worker(worker_id, accounts, reports, control):
+    polls = 0
+    while True:
+        polls += len(accounts)
+        reports.put((worker_id, {'polls': polls}, time.monotonic()))
+        time.sleep(0.05)
+
+
+def idle_worker(worker_id, accounts, reports, control):
+    time.sleep(60)
+
+
+def crashing_worker(worker_id, accounts, reports, control):
+    raise SystemExit(3)
+
+
+class FakeEngine:
+
+    def __init__(self, accounts):
+        self.current = list(accounts)
+
+    def accounts(self):
+        return list(self.current)
+
+
+class TestHashRing:
+
+    def test_keys_are_spread(self):
+        ring = HashRing(range(4))
+        shards = ring.assign(range(10_000))
+        sizes = [len(shard) for shard in shards.values()]
+        assert min(sizes) > 10_000 / 4 * 0.7, (
+            'Ключи должны распределяться по узлам примерно поровну'
+        )
+
+    def test_adding_node_moves_small_share(self):
+        keys = [f'account{i}' for i in range(10_000)]
+        ring = HashRing(range(4))
+        before = {key: ring.node_for(key) for key in keys}
+        ring.add(4)
+        moved = sum(before[key] != ring.node_for(key) for key in keys)
+        assert moved < len(keys) * 0.3, (
+            'При добавлении узла должна переезжать небольшая доля ключей'
+        )
+        assert all(
+            ring.node_for(key) in (before[key], 4) for key in keys
+        ), 'Ключи переезжают только на новый узел'
+
+    def test_removing_node(self):
+        ring = HashRing(range(3))
+        ring.remove(1)
+        assert {ring.node_for(i) for i in range(1000)} == {0, 2}
+
+
+class TestSupervisor:
+
+    def test_workers_report_throughput(self):
+        accounts = [Account(f'token{i}', i) for i in range(30)]
+        supervisor = Supervisor(accounts, 2, fake_worker, report_interval=1)
+        supervisor.start()
+        try:
+            assert sum(len(s) for s in supervisor.shards.values()) == 30
+            deadline = time.monotonic() + 5
+            while len(supervisor.throughput) < 2:
+                assert time.monotonic() < deadline, 'Нет отчётов воркеров'
+                supervisor.monitor(0.2)
+            assert all(rate > 0 for rate in supervisor.throughput.values())
+            assert set(supervisor.statuses) == {0, 1}
+
+            moved = supervisor.resize(3)
+            assert 0 < moved < 30
+            assert len(supervisor.processes) == 3
+        finally:
+            supervisor.stop(timeout=5)
+        assert not supervisor.processes
+
+    def test_worker_without_report_is_in_grace_period(self):
+        supervisor = Supervisor(
+            [Account('token', 1)], 1, idle_worker, report_interval=1
+        )
+        supervisor.start()
+        try:
+            ages = supervisor.report_ages()
+        finally:
+            supervisor.stop(timeout=5)
+        assert 0 <= ages[0] < 1, (
+            'До первого отчёта возраст отчёта считается от запуска воркера'
+        )
+
+    def test_crashing_worker_is_restarted_with_backoff(self, caplog):
+        supervisor = Supervisor(
+            [Account('token', 1)], 1, crashing_worker,
+            restart_delay=0.1, max_restart_delay=0.5,
+        )
+        supervisor.start()
+        pids = set()
+        try:
+            deadline = time.monotonic() + 3
+            while time.monotonic() < deadline:
+                supervisor.monitor(0.05)
+                pids.add(supervisor.processes[0].pid)
+        finally:
+            supervisor.stop(timeout=5)
+        assert 4 <= len(pids) <= 8, (
+            'Упавший воркер перезапускается с нарастающей паузой, '
+            f'а не на каждой проверке: запусков {len(pids)}'
+        )
+        assert 'падает сразу после запуска' in caplog.text, (
+            'Серия падений при запуске должна отмечаться в логе'
+        )
+
+    def test_reload_sends_diff_without_restarts(self):
+        accounts = [Account(f'token{i}', i) for i in range(30)]
+        supervisor = Supervisor(accounts, 3, idle_worker, report_interval=1)
+        supervisor.start()
+        try:
+            pids = {w: p.pid for w, p in supervisor.processes.items()}
+            added = Account('token-new', 100)
+            moved = accounts[0]
+            moved.chat_id = 200
+            removed = accounts[1]
+            changed = supervisor.reload(accounts[:1] + accounts[2:] + [added])
+            assert changed == 2
+            assert {
+                w: p.pid for w, p in supervisor.processes.items()
+            } == pids, 'Перечитывание не должно перезапускать воркеры'
+
+            diffs = {}
+            for worker_id, control in supervisor.controls.items():
+                try:
+                    diffs[worker_id] = control.get(timeout=1)
+                except queue.Empty:
+                    pass
+            expected = {}
+            for account, diff in (
+                (added, ([added.key], [], [])),
+                (moved, ([], [], [(moved.key, 200)])),
+                (removed, ([], [removed.key], [])),
+            ):
+                owner = supervisor.ring.node_for(account.key)
+                old = expected.get(owner, ([], [], []))
+                expected[owner] = tuple(o + d for o, d in zip(old, diff))
+            assert {
+                worker_id: ([a.key for a in new], gone, chats)
+                for worker_id, (new, gone, chats) in diffs.items()
+            } == expected, 'Каждый воркер получает разницу со своей долей'
+        finally:
+            supervisor.stop(timeout=5)
+
+
+class TestReceiveChanges:
+
+    def test_changes_are_applied_to_engine_accounts(self):
+        kept, removed = Account('kept', 1), Account('removed', 2)
+        added = Account('added', 3)
+        control = queue.Queue()
+        applied = []
+        done = threading.Event()
+
+        def apply(*diff):
+            applied.append(diff)
+            done.set()
+
+        receive_changes(control, FakeEngine([kept, removed]), apply)
+        control.put(([added], [removed.key], [(kept.key, 5)]))
+        assert done.wait(5), 'Изменения должны применяться в воркере'
+        assert applied == [([added], [removed], [(kept, 1)])]
+        assert kept.chat_id == 5, (
+            'Чат меняется в аккаунте, который опрашивает движок воркера'
+        )
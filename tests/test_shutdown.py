@@ -0,0 +1,137 @@
+import asyncio
+import os
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+
+import pytest
+from mocks import SHUTDOWN_TIMEOUT, FakeApi, processes_in, start_bot, terminate
+
+from homework_bot.accounts import Account
+from homework_bot.engine import PollingEngine
+from homework_bot.scheduler import FixedPolicy
+from homework_bot.shutdown import Shutdown
+
+CURRENT_DATE = 1_650_000_000
+
+
+def homeworks(count):
+    return {
+        'homeworks': [
+            {
+                'homework_name': f'hw{i}',
+                'status': 'approved',
+                'date_updated': '2022-01-01T10:00:00Z',
+            }
+            for i in range(count)
+        ],
+        'current_date': CURRENT_DATE,
+    }
+
+
+class TestShutdown:
+
+    def test_request_runs_callbacks_once(self):
+        shutdown = Shutdown(10)
+        calls = []
+        shutdown.on_request(lambda: calls.append('engine'))
+        shutdown.request('SIGTERM')
+        shutdown.request('SIGINT')
+        shutdown.on_request(lambda: calls.append('late'))
+        assert calls == ['engine', 'late'], (
+            'Колбэки вызываются один раз, а поздние - сразу'
+        )
+        assert shutdown.reason == 'SIGTERM'
+        assert 0 < shutdown.remaining() <= 10
+
+    def test_signal_requests_shutdown(self):
+        shutdown = Shutdown(10)
+        previous = signal.getsignal(signal.SIGTERM)
+        try:
+            shutdown.install(signals=(signal.SIGTERM,))
+            os.kill(os.getpid(), signal.SIGTERM)
+            assert shutdown.requested.wait(1)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        assert shutdown.reason == 'SIGTERM'
+
+    def test_engine_stop_does_not_wait_past_deadline(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def poll(account):
+            started.set()
+            release.wait(5)
+
+        engine = PollingEngine(poll, FixedPolicy(60))
+        engine.add_account(Account('token', 1))
+
+        async def run():
+            task = asyncio.ensure_future(engine.run())
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, started.wait, 5)
+            engine.stop(timeout=0.2)
+            await task
+
+        begin = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - begin
+        release.set()
+        assert elapsed < 2, (
+            f'Движок должен останавливаться в срок, а не за {elapsed:.2f} с'
+        )
+
+
+class TestGracefulShutdown:
+
+    def test_idle_bot_stops_quickly(self, tmp_path):
+        with FakeApi() as server:
+            process = start_bot(server, str(tmp_path))
+            assert server.first_request.wait(30), 'Бот не начал опрос'
+            latency = terminate(process)
+
+        assert process.returncode == 0, process.stderr.read().decode()
+        assert latency < 3, (
+            'Ожидание следующего опроса должно прерываться сигналом; '
+            f'остановка заняла {latency:.2f} с'
+        )
+
+    def test_pending_messages_and_cursor_are_saved(self, tmp_path):
+        with FakeApi(homeworks(5), send_delay=0.3) as server:
+            process = start_bot(server, str(tmp_path))
+            assert server.first_message.wait(30), 'Бот не начал отправку'
+            latency = terminate(process)
+            messages = list(server.messages)
+
+        assert process.returncode == 0, process.stderr.read().decode()
+        assert latency < SHUTDOWN_TIMEOUT, (
+            f'Остановка заняла {latency:.2f} с, дольше срока'
+        )
+        assert len(messages) == 5, (
+            'Сообщения из очереди должны быть досланы при остановке'
+        )
+        with sqlite3.connect(tmp_path / 'state.db') as db:
+            cursor = db.execute('SELECT * FROM cursors').fetchall()
+        assert [row[1] for row in cursor] == [CURRENT_DATE], (
+            'Курсор должен быть сохранён при остановке'
+        )
+
+    @pytest.mark.parametrize('workers', ['1', '2'])
+    def test_startup_failure_stops_bot(self, tmp_path, workers):
+        with FakeApi(reject_messages=True) as server:
+            process = start_bot(
+                server, str(tmp_path), TELEGRAM_CHAT_ID='1', WORKERS=workers
+            )
+            try:
+                process.wait(SHUTDOWN_TIMEOUT * 2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                pytest.fail('Бот не завершился после ошибки запуска')
+
+        assert process.returncode != 0, 'Ошибка запуска - ненулевой код'
+        assert processes_in(str(tmp_path)) == [], (
+            'После ошибки запуска не должно оставаться воркеров'
+        )
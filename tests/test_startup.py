@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('telegram', 'telegram.ext', 'requests', 'asyncio',
+                 'multiprocessing', 'dotenv')
+
+
+def imported_after(code):
+    """Модули из HEAVY_MODULES, загруженные после выполнения `code`.
+
+    Запросы к API уходят на закрытый локальный порт.
+    """
+    check = (
+        f'{code}\n'
+        'import sys\n'
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', check], cwd=ROOT,
+        env=dict(os.environ, PRACTICUM_ENDPOINT='http://127.0.0.1:9/'),
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip()
+
+
+class TestStartup:
+
+    def test_import_is_light(self):
+        assert imported_after('import homework') == '', (
+            'Импорт homework не должен загружать telegram, requests, '
+            'asyncio, multiprocessing и dotenv'
+        )
+
+    def test_import_has_no_side_effects(self):
+        result = subprocess.run(
+            [sys.executable, '-c', 'import homework, logging; '
+             'print(len(logging.getLogger("homework").handlers))'],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == '0', (
+            'Импорт homework не должен настраивать логгер'
+        )
+        assert result.stderr == '', 'Импорт homework не должен ничего писать'
+
+    def test_heavy_modules_load_on_use(self):
+        loaded = imported_after(
+            'import homework\n'
+            'try:\n'
+            '    homework.send_api_request("token", 0)\n'
+            'except Exception:\n'
+            '    pass'
+        )
+        assert 'requests' in loaded.split(','), (
+            'requests должен загружаться при первом запросе к API'
+        )
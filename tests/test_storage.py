@@ -0,0 +1,64 @@
+import sqlite3
+
+from homework_bot.storage import StateStore
+
+
+class TestStateStore:
+
+    def test_state_survives_restart(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = StateStore(path)
+        store.save_cursor('acc', 100)
+        store.save_status('acc', 'hw1', 'reviewing')
+        store.close()
+
+        store = StateStore(path)
+        assert store.load_cursors() == {'acc': 100}
+        assert store.get_status('acc', 'hw1') == ('reviewing', None)
+        assert store.get_status('acc', 'hw2') is None
+        store.close()
+
+    def test_wal_mode(self, tmp_path):
+        path = tmp_path / 'state.db'
+        StateStore(path).close()
+        mode = sqlite3.connect(path).execute('PRAGMA journal_mode').fetchone()
+        assert mode[0] == 'wal'
+
+    def test_writes_are_batched(self, tmp_path):
+        path = tmp_path / 'state.db'
+        store = StateStore(path, flush_interval=3600, batch_size=3)
+        store.save_cursor('a', 1)
+        store.save_cursor('a', 2)
+        store.save_cursor('b', 1)
+        assert store.pending() == 2, (
+            'Повторные записи одного курсора должны схлопываться'
+        )
+        db = sqlite3.connect(path)
+        assert db.execute('SELECT COUNT(*) FROM cursors').fetchone()[0] == 0
+        store.save_status('a', 'hw', 'approved')
+        assert store.pending() == 0
+        assert db.execute('SELECT COUNT(*) FROM cursors').fetchone()[0] == 2
+        assert store.load_cursors() == {'a': 2, 'b': 1}
+        store.close()
+
+    def test_history_is_shared_and_bounded(self, tmp_path):
+        path = tmp_path / 'state.db'
+        worker = StateStore(path, history_size=2)
+        main = StateStore(path, history_size=2)
+        for homework, status in [('hw1', 'reviewing'), ('hw1', 'approved'),
+                                 ('hw2', 'rejected')]:
+            worker.save_history('acc', homework, status)
+        assert worker.load_history('acc') == [
+            ('hw1', 'approved', None), ('hw2', 'rejected', None)
+        ], 'Несохранённые записи тоже должны попадать в историю'
+        worker.flush()
+        assert main.load_history('acc') == [
+            ('hw1', 'approved', None), ('hw2', 'rejected', None)
+        ], 'История воркера должна быть видна главному процессу'
+        assert main.load_history('other') == []
+        count = sqlite3.connect(path).execute(
+            'SELECT COUNT(*) FROM history'
+        ).fetchone()[0]
+        assert count == 2, 'На диске хранится не больше history_size записей'
+        worker.close()
+        main.close()
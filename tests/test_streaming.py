@@ -0,0 +1,72 @@
+import json
+import tracemalloc
+
+import pytest
+
+from homework_bot.streaming import HomeworkStream
+
+
+def chunked(body, size):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def homework(i):
+    return {
+        'id': i,
+        'homework_name': f'работа_{i}.zip',
+        'status': 'approved',
+        'reviewer_comment': 'Всё нравится' * 10,
+        'date_updated': '2022-02-13T14:40:57Z',
+    }
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 3, 17, 4096])
+    def test_items_across_chunk_boundaries(self, size):
+        data = {
+            'extra': [1, {'nested': True}],
+            'homeworks': [homework(i) for i in range(20)],
+            'current_date': 1234567890,
+        }
+        body = json.dumps(data, ensure_ascii=False).encode()
+        stream = HomeworkStream(chunked(body, size))
+        assert list(stream) == data['homeworks']
+        assert stream.current_date == 1234567890
+
+    @pytest.mark.parametrize('body, error', [
+        (b'[{"homeworks": []}]', TypeError),
+        (b'{"current_date": 1}', KeyError),
+        (b'{"homeworks": {"status": "approved"}}', TypeError),
+        (b'{"homeworks": [{"status": "approved"}', ValueError),
+    ])
+    def test_invalid_responses(self, body, error):
+        with pytest.raises(error):
+            list(HomeworkStream([body]))
+
+    def test_close_is_called(self):
+        closed = []
+        list(HomeworkStream([b'{"homeworks": []}'], close=lambda: closed.append(1)))
+        assert closed == [1]
+
+    def test_memory_does_not_grow_with_history(self):
+        def body(count):
+            yield b'{"homeworks": ['
+            for i in range(count):
+                prefix = b',' if i else b''
+                yield prefix + json.dumps(homework(i)).encode()
+            yield b'], "current_date": 1}'
+
+        def peak(count):
+            tracemalloc.start()
+            for _ in HomeworkStream(body(count)):
+                pass
+            _, result = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return result
+
+        small, large = peak(100), peak(20_000)
+        assert large < small * 2, (
+            'Пиковая память не должна зависеть от размера истории'
+        )
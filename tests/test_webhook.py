@@ -0,0 +1,76 @@
+import json
+import queue
+import urllib.request
+
+import telegram
+from telegram.ext import Dispatcher, Filters, MessageHandler
+
+from homework_bot.webhook import WebhookReceiver, webhook_path
+
+
+def make_update(update_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 1600000000,
+            'chat': {'id': 42, 'type': 'private'},
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'Student'},
+            'text': text,
+        },
+    }
+
+
+def post(url, data):
+    request = urllib.request.Request(
+        url, data=data, headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+class TestWebhookReceiver:
+
+    def test_fake_telegram_posts_updates(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            telegram.Bot, 'set_webhook',
+            lambda self, url=None, **kwargs: calls.append(('set', url)),
+        )
+        monkeypatch.setattr(
+            telegram.Bot, 'delete_webhook',
+            lambda self, **kwargs: calls.append(('delete', None)),
+        )
+        bot = telegram.Bot(token='1234:abcdefg')
+        dispatcher = Dispatcher(bot, queue.Queue(), workers=0)
+        received = []
+        dispatcher.add_handler(MessageHandler(
+            Filters.text,
+            lambda update, context: received.append(update.message.text),
+        ))
+
+        path = webhook_path('1234:abcdefg')
+        receiver = WebhookReceiver(bot, dispatcher, path, host='127.0.0.1',
+                                   port=0)
+        receiver.start('https://bot.example.com/')
+        try:
+            assert calls == [('set', 'https://bot.example.com' + path)]
+            url = f'http://127.0.0.1:{receiver.server.port}{path}'
+            for i, text in enumerate(['привет', '/status']):
+                body = json.dumps(make_update(i, text)).encode()
+                assert post(url, body) == 200
+            assert received == ['привет', '/status'], (
+                'Обновления из вебхука должны попадать в обработчики'
+            )
+            assert post(url, b'not json') == 400
+            wrong = f'http://127.0.0.1:{receiver.server.port}/telegram/x'
+            assert post(wrong, b'{}') == 404, (
+                'Вебхук должен принимать обновления только по секретному пути'
+            )
+        finally:
+            receiver.stop()
+        assert calls[-1] == ('delete', None)